@@ -0,0 +1,303 @@
+import logging
+import socket
+import struct
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONNECT, CONNACK, PUBLISH, PUBACK, PUBREC, PUBREL, PUBCOMP = 1, 2, 3, 4, 5, 6, 7
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK, PINGREQ, PINGRESP, DISCONNECT = 8, 9, 10, 11, 12, 13, 14
+MQTT_V5 = 5
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte, value = value & 0x7F, value >> 7
+        out.append(byte | (0x80 if value else 0))
+        if not value:
+            return bytes(out)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value, shift = 0, 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _string(value: str) -> bytes:
+    raw = value.encode("utf-8")
+    return struct.pack(">H", len(raw)) + raw
+
+
+def _read_string(data: bytes, pos: int) -> Tuple[str, int]:
+    (length,) = struct.unpack_from(">H", data, pos)
+    return data[pos + 2:pos + 2 + length].decode("utf-8"), pos + 2 + length
+
+
+def _packet(kind: int, flags: int, body: bytes) -> bytes:
+    return bytes([(kind << 4) | flags]) + _varint(len(body)) + body
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    """MQTT filter match with + and # wildcards."""
+    p_parts, t_parts = pattern.split("/"), topic.split("/")
+    for i, part in enumerate(p_parts):
+        if part == "#":
+            return True
+        if i >= len(t_parts) or (part != "+" and part != t_parts[i]):
+            return False
+    return len(p_parts) == len(t_parts)
+
+
+class _Session:
+    """One client connection: reader thread, plus a writer thread draining an unbounded outbound queue."""
+
+    def __init__(self, broker: "LoopbackBroker", sock: socket.socket):
+        self.broker = broker
+        self.sock = sock
+        self.version = 4
+        self.client_id = "?"
+        self.subscriptions: Dict[str, int] = {}   # filter → granted QoS
+        self._out = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._next_id = 0
+
+    # ── Outbound ──
+    def send(self, data: bytes):
+        with self._cond:
+            if not self._closed:
+                self._out.append(data)
+                self._cond.notify()
+
+    def backlog(self) -> int:
+        return len(self._out)
+
+    def _writer(self):
+        while True:
+            with self._cond:
+                while not self._out and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                chunk = b"".join(self._out)
+                self._out.clear()
+            try:
+                self.sock.sendall(chunk)
+            except OSError:
+                self.close()
+                return
+
+    def deliver(self, topic: str, qos: int, retain: bool, props: bytes, payload: bytes):
+        body = _string(topic)
+        if qos:
+            self._next_id = self._next_id % 0xFFFF + 1
+            body += struct.pack(">H", self._next_id)
+        if self.version == MQTT_V5:
+            body += _varint(len(props)) + props
+        self.send(_packet(PUBLISH, (qos << 1) | int(retain), body + payload))
+
+    # ── Inbound ──
+    def _recv_exact(self, n: int) -> bytes:
+        buf = bytearray()
+        while len(buf) < n:
+            chunk = self.sock.recv(n - len(buf))
+            if not chunk:
+                raise ConnectionError("closed")
+            buf += chunk
+        return bytes(buf)
+
+    def _read_packet(self) -> Tuple[int, int, bytes]:
+        first = self._recv_exact(1)[0]
+        length, shift = 0, 0
+        while True:
+            byte = self._recv_exact(1)[0]
+            length |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                break
+            shift += 7
+        return first >> 4, first & 0x0F, self._recv_exact(length) if length else b""
+
+    def run(self):
+        threading.Thread(target=self._writer, name="broker-writer", daemon=True).start()
+        try:
+            while not self._closed:
+                kind, flags, body = self._read_packet()
+                if kind == DISCONNECT:
+                    break
+                self._handle(kind, flags, body)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.close()
+
+    def _skip_props(self, body: bytes, pos: int) -> Tuple[bytes, int]:
+        if self.version != MQTT_V5:
+            return b"", pos
+        length, pos = _read_varint(body, pos)
+        return body[pos:pos + length], pos + length
+
+    def _handle(self, kind: int, flags: int, body: bytes):
+        v5 = self.version == MQTT_V5
+        if kind == CONNECT:
+            _, pos = _read_string(body, 0)
+            self.version = body[pos]
+            pos += 4                                   # level, flags, keepalive
+            _, pos = self._skip_props(body, pos)
+            self.client_id, _ = _read_string(body, pos)
+            self.send(_packet(CONNACK, 0, b"\x00\x00\x00" if self.version == MQTT_V5 else b"\x00\x00"))
+        elif kind == PUBLISH:
+            qos, retain = (flags >> 1) & 3, bool(flags & 1)
+            topic, pos = _read_string(body, 0)
+            packet_id = None
+            if qos:
+                (packet_id,) = struct.unpack_from(">H", body, pos)
+                pos += 2
+            props, pos = self._skip_props(body, pos)
+            self.broker.route(topic, qos, retain, props, body[pos:])
+            if qos == 1:
+                self.send(_packet(PUBACK, 0, struct.pack(">H", packet_id)))
+            elif qos == 2:
+                self.send(_packet(PUBREC, 0, struct.pack(">H", packet_id)))
+        elif kind == PUBREL:
+            self.send(_packet(PUBCOMP, 0, body[:2]))
+        elif kind == SUBSCRIBE:
+            (packet_id,) = struct.unpack_from(">H", body, 0)
+            _, pos = self._skip_props(body, 2)
+            granted, filters = [], []
+            while pos < len(body):
+                pattern, pos = _read_string(body, pos)
+                qos = min(body[pos] & 3, 1)             # delivery at QoS 0 or 1
+                pos += 1
+                self.subscriptions[pattern] = qos
+                granted.append(qos)
+                filters.append(pattern)
+            self.send(_packet(SUBACK, 0, struct.pack(">H", packet_id) + (b"\x00" if v5 else b"") + bytes(granted)))
+            self.broker.send_retained(self, filters)
+        elif kind == UNSUBSCRIBE:
+            (packet_id,) = struct.unpack_from(">H", body, 0)
+            _, pos = self._skip_props(body, 2)
+            count = 0
+            while pos < len(body):
+                pattern, pos = _read_string(body, pos)
+                self.subscriptions.pop(pattern, None)
+                count += 1
+            self.send(_packet(UNSUBACK, 0, struct.pack(">H", packet_id) + (b"\x00" + b"\x00" * count if v5 else b"")))
+        elif kind == PINGREQ:
+            self.send(_packet(PINGRESP, 0, b""))
+        # PUBACK / PUBREC / PUBCOMP from subscribers: nothing is redelivered, so nothing to track
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+        self.broker.forget(self)
+
+
+class LoopbackBroker:
+    """
+    Minimal in-process MQTT broker (3.1.1 and 5) for load tests on a dev
+    machine or the board without mosquitto: CONNECT, PUBLISH at QoS 0-2,
+    SUBSCRIBE / UNSUBSCRIBE with + and # wildcards, retained messages, ping.
+    MQTTv5 PUBLISH properties (ContentType) are forwarded unchanged.
+
+    Delivery is at most QoS 1 with nothing redelivered and no persistent
+    sessions. Each subscriber has an unbounded outbound queue, so a slow
+    consumer builds up a backlog (stats()["backlog"]) instead of
+    throttling the publishers.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self._server: Optional[socket.socket] = None
+        self._sessions: List[_Session] = []
+        self._retained: Dict[str, Tuple[int, bytes, bytes]] = {}   # topic → (qos, props, payload)
+        self._lock = threading.Lock()
+        self.received = 0
+        self.delivered = 0
+        self.received_bytes = 0
+
+    def start(self) -> Tuple[str, int]:
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((self.host, self.port))
+        self._server.listen(16)
+        self.port = self._server.getsockname()[1]
+        threading.Thread(target=self._accept, name="broker-accept", daemon=True).start()
+        logger.info(f"Loopback broker on {self.host}:{self.port}")
+        return self.host, self.port
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self._server.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            session = _Session(self, sock)
+            with self._lock:
+                self._sessions.append(session)
+            threading.Thread(target=session.run, name="broker-session", daemon=True).start()
+
+    def route(self, topic: str, qos: int, retain: bool, props: bytes, payload: bytes):
+        with self._lock:
+            self.received += 1
+            self.received_bytes += len(payload)
+            if retain:
+                if payload:
+                    self._retained[topic] = (qos, props, payload)
+                else:
+                    self._retained.pop(topic, None)
+            targets = []
+            for session in self._sessions:
+                granted = [q for pattern, q in session.subscriptions.items() if topic_matches(pattern, topic)]
+                if granted:
+                    targets.append((session, min(qos, max(granted))))
+            self.delivered += len(targets)
+        for session, out_qos in targets:
+            session.deliver(topic, out_qos, False, props, payload)
+
+    def send_retained(self, session: _Session, filters: List[str]):
+        with self._lock:
+            matches = [(topic, msg) for topic, msg in self._retained.items()
+                       if any(topic_matches(pattern, topic) for pattern in filters)]
+        for topic, (qos, props, payload) in matches:
+            session.deliver(topic, min(qos, 1), True, props, payload)
+
+    def forget(self, session: _Session):
+        with self._lock:
+            if session in self._sessions:
+                self._sessions.remove(session)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            sessions = list(self._sessions)
+            return {"clients": len(sessions), "received": self.received, "delivered": self.delivered,
+                    "received_bytes": self.received_bytes, "backlog": sum(s.backlog() for s in sessions)}
+
+    def stop(self):
+        if self._server is not None:
+            try:
+                self._server.shutdown(socket.SHUT_RDWR)   # wakes accept(), so the port is free again
+            except OSError:
+                pass
+            self._server.close()
+        with self._lock:
+            sessions = list(self._sessions)
+        for session in sessions:
+            session.close()
@@ -0,0 +1,148 @@
+import json
+import time
+from typing import List
+
+from benchmarks import mock_hw
+from benchmarks.harness import BenchCase
+from benchmarks.cases_data import SAMPLE_OBC, SAMPLE_EPS, SAMPLE_ADCS, SAMPLE_PAYLOAD
+from benchmarks.codecs import codec_cases
+from benchmarks.i2c import i2c_cases
+from benchmarks.triage import triage_cases
+from benchmarks.series import series_cases
+
+mock_hw.install()
+
+
+def _make_imu():
+    from src.common.imu_qmi8658_ak09918 import IMU
+
+    # Bypass __init__: no sensor bring-up or gyro calibration sleeps
+    imu = IMU.__new__(IMU)
+    imu.bus = mock_hw.FakeSMBus(1, mock_hw.imu_registers())
+    imu.q0, imu.q1, imu.q2, imu.q3 = 1.0, 0.0, 0.0, 0.0
+    imu.exInt = imu.eyInt = imu.ezInt = 0.0
+    imu.gyro_offset = [0, 0, 0]
+    return imu
+
+
+def _make_aggregator():
+    import src.telemetry.aggregator as aggregator_module
+
+    # In-memory database; the MQTT client is created but never connected
+    aggregator_module.DB_PATH = ":memory:"
+    agg = aggregator_module.TelemetryAggregator()
+    agg.sections.update("obc", dict(SAMPLE_OBC))
+    agg.sections.update("eps", dict(SAMPLE_EPS))
+    agg.sections.update("adcs", json.loads(json.dumps(SAMPLE_ADCS)))
+    agg.sections.update("payload", dict(SAMPLE_PAYLOAD))
+    return agg
+
+
+def _setup_update_ahrs():
+    imu = _make_imu()
+    return lambda: imu.update_ahrs(0.01, -0.02, 0.005, 0.01, 0.02, 0.99, 120.0, -40.0, 300.0)
+
+
+def _setup_orientation():
+    imu = _make_imu()
+    return imu.get_orientation_deg
+
+
+def _setup_crc16():
+    from src.common.utils import crc16_ccitt
+    frame = json.dumps(SAMPLE_ADCS).encode("utf-8")
+    return lambda: crc16_ccitt(frame)
+
+
+def _setup_crc8():
+    from src.payload.science import ScienceCollector
+    buf = bytes([0xBE, 0xEF, 0x92])
+    return lambda: ScienceCollector._crc8(buf, 2, buf[2])
+
+
+def _setup_anomaly_observe():
+    from src.common.anomaly import AnomalyDetector
+
+    rules = {"services": {"adcs": {"fields": {"gyro_dps": {"max": 20}, "accel_g": {"z": 8, "min_std": 0.01}}}}}
+    detector = AnomalyDetector("adcs", rules=rules)
+    packet = json.loads(json.dumps(SAMPLE_ADCS))
+    return lambda: detector.observe(packet)
+
+
+def _setup_log_to_db():
+    agg = _make_aggregator()
+    packet = {
+        "timestamp": "2026-03-13T12:00:00Z",
+        "obc_state": "SCIENCE",
+        "eps": SAMPLE_EPS,
+        "adcs": SAMPLE_ADCS,
+        "payload": SAMPLE_PAYLOAD,
+        "system": {
+            "cpu_percent": 12.5, "ram_percent": 41.0, "swap_percent": 0.0,
+            "disk_percent": 37.2, "uptime_seconds": 86400, "cpu_temperature": 48.3,
+        },
+    }
+    return lambda: agg._log_to_db(packet)
+
+
+def _setup_build_packet():
+    agg = _make_aggregator()
+    return agg.build_telemetry_packet
+
+
+_SAMPLE_SYSTEM = {
+    "cpu_percent": 12.5, "ram_percent": 41.0, "swap_percent": 0.0,
+    "disk_percent": 37.2, "uptime_seconds": 86400, "cpu_temperature": 48.3,
+}
+
+
+def _setup_assemble(changed: bool):
+    from src.telemetry.packet import PacketAssembler
+    sections = PacketAssembler()
+    for name, sample in (("obc", SAMPLE_OBC), ("eps", SAMPLE_EPS), ("adcs", SAMPLE_ADCS), ("payload", SAMPLE_PAYLOAD)):
+        sections.update(name, dict(sample))
+    adcs = json.loads(json.dumps(SAMPLE_ADCS))
+
+    def build():
+        if changed:
+            sections.update("adcs", adcs)   # a new ADCS message between packets
+        return sections.build("2026-03-13T12:00:00Z", _SAMPLE_SYSTEM)
+    return build
+
+
+def _setup_json(sample):
+    return lambda: json.dumps(sample)
+
+
+def _setup_json_telemetry():
+    packet = {
+        "timestamp": "2026-03-13T12:00:00Z",
+        "obc_state": "SCIENCE",
+        "eps": SAMPLE_EPS,
+        "adcs": SAMPLE_ADCS,
+        "payload": SAMPLE_PAYLOAD,
+        "system": {"cpu_percent": 12.5, "ram_percent": 41.0, "uptime_seconds": time.time()},
+    }
+    return lambda: json.dumps(packet)
+
+
+CASES: List[BenchCase] = [
+    BenchCase("imu.update_ahrs", _setup_update_ahrs, "Mahony filter step (ADCS, sensor rate)"),
+    BenchCase("imu.get_orientation_deg", _setup_orientation, "Full ADCS sample: mock I2C reads + AHRS + Euler"),
+    BenchCase("utils.crc16_ccitt", _setup_crc16, "CRC-16 over an ADCS status frame"),
+    BenchCase("science._crc8", _setup_crc8, "SHTC3 CRC-8 check"),
+    BenchCase("anomaly.observe_adcs", _setup_anomaly_observe, "Online stats + limit checks of one ADCS sample"),
+    BenchCase("aggregator._log_to_db", _setup_log_to_db, "One telemetry_log INSERT + commit (in-memory DB)"),
+    BenchCase("aggregator.build_telemetry_packet", _setup_build_packet, "Packet assembly incl. system metrics"),
+    BenchCase("packet.assemble_cached", lambda: _setup_assemble(False), "Packet dict + JSON from cached sections (nothing new)"),
+    BenchCase("packet.assemble_adcs_changed", lambda: _setup_assemble(True), "Same, with a new ADCS message to encode"),
+    BenchCase("json.obc_status", lambda: _setup_json(SAMPLE_OBC), "json.dumps of an OBC status packet"),
+    BenchCase("json.eps_status", lambda: _setup_json(SAMPLE_EPS), "json.dumps of an EPS status packet"),
+    BenchCase("json.adcs_status", lambda: _setup_json(SAMPLE_ADCS), "json.dumps of an ADCS status packet"),
+    BenchCase("json.payload_data", lambda: _setup_json(SAMPLE_PAYLOAD), "json.dumps of a science packet"),
+    BenchCase("json.telemetry_packet", _setup_json_telemetry, "json.dumps of a full telemetry packet"),
+    *codec_cases(),
+    *i2c_cases(),
+    *triage_cases(),
+    *series_cases(),
+]
@@ -0,0 +1,14 @@
+# Representative status packets, shaped exactly like the ones the services publish
+SAMPLE_OBC = {"timestamp": 1741863600.0, "status": "SCIENCE"}
+SAMPLE_EPS = {
+    "timestamp": 1741863600.0, "battery": 87.5, "voltage": 4.123, "external_power": True,
+    "discharge_rate_pct_h": 4.12, "voltage_trend_v_h": -0.031, "time_to_empty_sec": 76456,
+}
+SAMPLE_ADCS = {
+    "timestamp": 1741863600.0,
+    "roll": 1.23, "pitch": -0.45, "yaw": 178.9,
+    "imu_temp": 34.5,
+    "accel_g": {"x": 0.01, "y": 0.02, "z": 0.99},
+    "gyro_dps": {"x": 0.1, "y": -0.2, "z": 0.05},
+}
+SAMPLE_PAYLOAD = {"timestamp": 1741863600.0, "temperature": 23.4, "humidity": 45.2, "pressure": 1013.25}
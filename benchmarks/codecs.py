@@ -0,0 +1,76 @@
+import argparse
+import sys
+from typing import List
+
+from benchmarks import mock_hw
+from benchmarks.harness import BenchCase, run_case
+from benchmarks.cases_data import SAMPLE_OBC, SAMPLE_EPS, SAMPLE_ADCS, SAMPLE_PAYLOAD
+
+mock_hw.install()
+
+# Topic key → (representative message, codecs to compare)
+TOPIC_SAMPLES = {
+    "obc_status":   (SAMPLE_OBC,     ("json", "msgpack")),
+    "eps_status":   (SAMPLE_EPS,     ("json", "msgpack", "struct")),
+    "adcs_status":  (SAMPLE_ADCS,    ("json", "msgpack", "struct")),
+    "payload_data": (SAMPLE_PAYLOAD, ("json", "msgpack", "struct")),
+}
+
+
+def _make_codec(topic_key: str, name: str):
+    """Imported lazily so a missing optional package (msgpack) only skips its cases."""
+    from src.common import codec as codec_module
+
+    if name == "msgpack":
+        return codec_module.MsgPackCodec()
+    if name == "struct":
+        return codec_module.StructCodec(topic_key)
+    return codec_module.JsonCodec()
+
+
+def _encode_case(topic_key: str, name: str, sample) -> BenchCase:
+    def setup():
+        codec = _make_codec(topic_key, name)
+        return lambda: codec.encode(sample)
+    return BenchCase(f"codec.{topic_key}.{name}.encode", setup, f"{name} encode of {topic_key}")
+
+
+def _decode_case(topic_key: str, name: str, sample) -> BenchCase:
+    def setup():
+        codec = _make_codec(topic_key, name)
+        encoded = codec.encode(sample)
+        return lambda: codec.decode(encoded)
+    return BenchCase(f"codec.{topic_key}.{name}.decode", setup, f"{name} decode of {topic_key}")
+
+
+def codec_cases() -> List[BenchCase]:
+    cases = []
+    for topic_key, (sample, names) in TOPIC_SAMPLES.items():
+        for name in names:
+            cases.append(_encode_case(topic_key, name, sample))
+            cases.append(_decode_case(topic_key, name, sample))
+    return cases
+
+
+def main(argv=None) -> int:
+    """Per-topic table: encode/decode cost and payload size for every available codec."""
+    parser = argparse.ArgumentParser(description="Encode/decode cost and payload size per topic and codec")
+    parser.add_argument("--min-time", type=float, default=0.5)
+    args = parser.parse_args(argv)
+
+    print(f"{'topic':14} {'codec':8} {'bytes':>6} {'enc us':>8} {'dec us':>8}")
+    for topic_key, (sample, names) in TOPIC_SAMPLES.items():
+        for name in names:
+            try:
+                size = len(_make_codec(topic_key, name).encode(sample))
+            except Exception as e:
+                print(f"{topic_key:14} {name:8} SKIPPED ({type(e).__name__}: {e})")
+                continue
+            enc = run_case(_encode_case(topic_key, name, sample), min_time=args.min_time)
+            dec = run_case(_decode_case(topic_key, name, sample), min_time=args.min_time)
+            print(f"{topic_key:14} {name:8} {size:>6} {enc.us_per_call:>8.2f} {dec.us_per_call:>8.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
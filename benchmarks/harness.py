@@ -0,0 +1,112 @@
+import gc
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional
+
+
+@dataclass
+class BenchCase:
+    """A single hot path to measure. `setup` returns the zero-argument callable to time."""
+    name: str
+    setup: Callable[[], Callable[[], object]]
+    description: str = ""
+
+
+@dataclass
+class BenchResult:
+    name: str
+    ops_per_sec: float
+    us_per_call: float
+    alloc_bytes_per_call: float   # transient allocation peak of a single call
+    retained_bytes: int           # memory still held after all timed calls (leak indicator)
+    peak_kib: float               # tracemalloc peak over the allocation run
+    iterations: int
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _time_calls(fn: Callable[[], object], min_time: float) -> (int, float):
+    """Runs fn in growing batches until at least min_time seconds were spent."""
+    batch = 1
+    total_calls = 0
+    total_time = 0.0
+    while total_time < min_time:
+        start = time.perf_counter()
+        for _ in range(batch):
+            fn()
+        total_time += time.perf_counter() - start
+        total_calls += batch
+        if total_time < min_time / 10:
+            batch *= 2
+    return total_calls, total_time
+
+
+def _measure_memory(fn: Callable[[], object], calls: int) -> (float, int, float):
+    """Returns (average per-call allocation peak in bytes, retained bytes, overall peak KiB)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base_current, _ = tracemalloc.get_traced_memory()
+        per_call_peaks = 0
+        overall_peak = 0
+        for _ in range(calls):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+            per_call_peaks += peak - before
+            overall_peak = max(overall_peak, peak - base_current)
+        gc.collect()
+        end_current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return per_call_peaks / calls, end_current - base_current, overall_peak / 1024
+
+
+def run_case(case: BenchCase, min_time: float = 1.0, memory_calls: int = 200) -> BenchResult:
+    fn = case.setup()
+    fn()  # warm-up: first-call imports and caches should not count
+    calls, elapsed = _time_calls(fn, min_time)
+    mem_calls = max(1, min(memory_calls, calls))
+    alloc_per_call, retained, peak_kib = _measure_memory(fn, mem_calls)
+    return BenchResult(
+        name=case.name,
+        ops_per_sec=round(calls / elapsed, 2),
+        us_per_call=round(elapsed / calls * 1e6, 3),
+        alloc_bytes_per_call=round(alloc_per_call, 1),
+        retained_bytes=retained,
+        peak_kib=round(peak_kib, 2),
+        iterations=calls,
+    )
+
+
+def compare(current: Dict[str, Dict], baseline: Dict[str, Dict], threshold_pct: float) -> List[str]:
+    """
+    Compares results against a baseline.
+    Returns a list of human-readable regressions (empty when within threshold).
+    """
+    regressions = []
+    factor = threshold_pct / 100.0
+    for name, result in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result["ops_per_sec"] < base["ops_per_sec"] * (1 - factor):
+            regressions.append(
+                f"{name}: ops/s {result['ops_per_sec']:.1f} < baseline {base['ops_per_sec']:.1f} "
+                f"(-{(1 - result['ops_per_sec'] / base['ops_per_sec']) * 100:.1f}%)"
+            )
+        base_alloc: Optional[float] = base.get("alloc_bytes_per_call")
+        # Ignore tiny absolute values: a few bytes of jitter is not a regression
+        if base_alloc and base_alloc > 64 and result["alloc_bytes_per_call"] > base_alloc * (1 + factor):
+            regressions.append(
+                f"{name}: alloc/call {result['alloc_bytes_per_call']:.0f} B > baseline {base_alloc:.0f} B"
+            )
+        base_peak: Optional[float] = base.get("peak_kib")
+        if base_peak and base_peak > 1 and result["peak_kib"] > base_peak * (1 + factor):
+            regressions.append(
+                f"{name}: peak {result['peak_kib']:.1f} KiB > baseline {base_peak:.1f} KiB"
+            )
+    return regressions
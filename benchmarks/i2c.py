@@ -0,0 +1,127 @@
+import argparse
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks import mock_hw
+from benchmarks.harness import BenchCase
+
+mock_hw.install()
+
+QMI8658, QMI_AX_L = 0x6B, 0x35
+MAX17048, REG_VCELL = 0x36, 0x02
+LPS22HB, LPS_PRESS_OUT_XL = 0x5C, 0x28
+
+
+def start_arbiter(op_latency_sec: float = 0.0):
+    """Arbiter + socket server on a SimulatedI2CBus; returns (arbiter, server, socket_path)."""
+    from src.common.i2c_bus import SimulatedI2CBus
+    from src.i2c.arbiter import I2CArbiter
+    from src.i2c.server import I2CSocketServer
+
+    tmpdir = tempfile.TemporaryDirectory(prefix="cubesat-i2c-")
+    socket_path = Path(tmpdir.name) / "i2c.sock"
+    arbiter = I2CArbiter(SimulatedI2CBus(op_latency_sec=op_latency_sec))
+    arbiter.start()
+    server = I2CSocketServer(arbiter, str(socket_path))
+    server.start()
+    weakref.finalize(server, tmpdir.cleanup)   # the socket directory lives as long as the server (or the process)
+    return arbiter, server, str(socket_path)
+
+
+def _setup_direct_read():
+    from src.common.i2c_bus import SimulatedI2CBus
+    bus = SimulatedI2CBus()
+    return lambda: bus.read_i2c_block_data(QMI8658, QMI_AX_L, 12)
+
+
+def _setup_arbiter_read():
+    from src.common.i2c_client import I2CClient
+    _, _, socket_path = start_arbiter()
+    client = I2CClient("adcs", socket_path)
+    return lambda: client.read_i2c_block_data(QMI8658, QMI_AX_L, 12)
+
+
+def i2c_cases() -> List[BenchCase]:
+    return [
+        BenchCase("i2c.direct.block_read", _setup_direct_read, "12-byte IMU block read on the simulated bus"),
+        BenchCase("i2c.arbiter.block_read", _setup_arbiter_read,
+                  "Same read through I2CClient → Unix socket → arbiter (round-trip overhead)"),
+    ]
+
+
+def _client_loop(service: str, socket_path: str, ops, period_sec: float,
+                 stop: threading.Event, latencies: Dict[str, List[float]], errors: Dict[str, int]):
+    from src.common.i2c_client import I2CClient
+    client = I2CClient(service, socket_path)
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            client.transaction(ops)
+        except OSError:
+            errors[service] += 1
+        latencies[service].append(time.perf_counter() - start)
+        if period_sec:
+            stop.wait(period_sec)
+    client.close()
+
+
+def main(argv=None) -> int:
+    """
+    Contention check: ADCS, EPS and payload clients hammer one simulated bus
+    through the arbiter. ADCS (priority 0) must see the lowest latency.
+    """
+    parser = argparse.ArgumentParser(description="I2C arbiter contention on a simulated bus")
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--op-latency-ms", type=float, default=0.3, help="simulated bus time per op")
+    args = parser.parse_args(argv)
+
+    arbiter, server, socket_path = start_arbiter(args.op_latency_ms / 1000)
+    loads = {
+        # service: (ops per transaction, pause between transactions)
+        "adcs":    ([["rblk", QMI8658, QMI_AX_L, 12]], 0.0),
+        "eps":     ([["rblk", MAX17048, REG_VCELL, 2]], 0.0),
+        "payload": ([["rb", LPS22HB, LPS_PRESS_OUT_XL + i, None] for i in range(3)], 0.0),
+    }
+    latencies = {service: [] for service in loads}
+    errors = {service: 0 for service in loads}
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=_client_loop, args=(service, socket_path, ops, period, stop, latencies, errors))
+        for service, (ops, period) in loads.items()
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(args.duration)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    print(f"{'service':8} {'txns':>7} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    p50 = {}
+    for service, values in latencies.items():
+        values.sort()
+        p50[service] = statistics.median(values)
+        p99 = values[int(len(values) * 0.99) - 1]
+        print(f"{service:8} {len(values):>7} {p50[service] * 1000:>8.2f} {p99 * 1000:>8.2f} {errors[service]:>6}")
+
+    snapshot = arbiter.snapshot()
+    print(f"bus utilization {snapshot['utilization_pct']}%, batches {snapshot['batches']}, "
+          f"max queue depth {snapshot['max_queue_depth']}")
+    for addr, stats in snapshot["devices"].items():
+        print(f"  {addr}: {stats}")
+
+    server.stop()
+    arbiter.stop()
+    ok = not any(errors.values()) and p50["adcs"] <= min(p50["eps"], p50["payload"])
+    print("OK" if ok else "FAIL: ADCS is not served first or transactions failed")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
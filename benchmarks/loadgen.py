@@ -0,0 +1,264 @@
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks import mock_hw
+from benchmarks.cases_data import SAMPLE_ADCS, SAMPLE_EPS, SAMPLE_OBC, SAMPLE_PAYLOAD
+
+mock_hw.install()
+
+ROOT = Path(__file__).resolve().parent.parent
+
+from src.common import codec, get_mqtt_client
+from src.common.config import TOPICS, build_publish_policy
+from src.common.system_metrics import _ServiceProcess
+
+SENT_PROPERTY = "loadgen_sent"
+# The load reaches the broker as generated: no config topic rules, nothing coalesced or dropped
+LOAD_POLICY = build_publish_policy({"offline_queue": 1_000_000})
+# Message of each topic one spacecraft-equivalent publishes (rates: --adcs-hz etc.)
+SAMPLES = {"obc_status": SAMPLE_OBC, "eps_status": SAMPLE_EPS, "adcs_status": SAMPLE_ADCS, "payload_data": SAMPLE_PAYLOAD}
+
+
+def _percentiles(values: List[float], scale: float) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    values = sorted(values)
+    pick = lambda q: round(values[min(len(values) - 1, int(q * len(values)))] * scale, 1)
+    return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": round(values[-1] * scale, 1)}
+
+
+# ── Target: the real aggregator with a timed on_message, in its own process ──
+
+def _target(db_path: str):
+    """
+    Runs TelemetryAggregator (main loop included) against the broker in
+    MQTT_BROKER / MQTT_PORT. Every line on stdin is answered on stdout with
+    the callback statistics since the previous line, as JSON.
+    """
+    import src.telemetry.aggregator as aggregator_module
+
+    aggregator_module.DB_PATH = db_path
+    agg = aggregator_module.TelemetryAggregator()
+    handle = agg.on_mqtt_message
+    lock = threading.Lock()
+    window = {"handled": 0, "callback": [], "delay": []}
+
+    def timed_on_message(client, userdata, msg):
+        started = time.time()
+        t0 = time.perf_counter()
+        handle(client, userdata, msg)
+        duration = time.perf_counter() - t0
+        sent = dict(getattr(msg.properties, "UserProperty", None) or []).get(SENT_PROPERTY)
+        with lock:
+            window["handled"] += 1
+            window["callback"].append(duration)
+            if sent is not None:
+                window["delay"].append(started - float(sent))
+
+    agg.mqtt_client.on_message = timed_on_message
+    threading.Thread(target=agg.run, name="aggregator", daemon=True).start()
+
+    for line in sys.stdin:
+        if line.strip() == "quit":
+            break
+        with lock:
+            current = dict(window)
+            window.update(handled=0, callback=[], delay=[])
+        print(json.dumps({
+            "handled": current["handled"],
+            "callback_us": _percentiles(current["callback"], 1e6),
+            "delay_ms": _percentiles(current["delay"], 1e3),
+        }), flush=True)
+
+
+def _serve_broker(conn):
+    from benchmarks.broker import LoopbackBroker
+    broker = LoopbackBroker()
+    conn.send(broker.start())
+    conn.recv()   # any message: stop
+    broker.stop()
+
+
+# ── Load: spacecraft-equivalent publishers ──
+
+class Publisher(threading.Thread):
+    """One MQTT client sending its share of the load on a fixed schedule (topic mix of one spacecraft)."""
+
+    def __init__(self, index: int, host: str, port: int, qos: int, pad_bytes: int):
+        super().__init__(name=f"loadgen-{index}", daemon=True)
+        self.client = get_mqtt_client(f"cubesat-loadgen-{index}", policy=LOAD_POLICY)
+        self.client.connect(host, port)
+        self.client.loop_start()
+        self.qos = qos
+        self.rates: Dict[str, float] = {}
+        self.sent = 0
+        self._stop = threading.Event()
+        self._pad = "x" * pad_bytes
+
+    def set_rates(self, rates: Dict[str, float]):
+        self.rates = dict(rates)
+
+    def run(self):
+        due = {key: time.monotonic() for key in SAMPLES}
+        while not self._stop.is_set():
+            rates = self.rates
+            now = time.monotonic()
+            next_due = now + 0.1
+            for key, sample in SAMPLES.items():
+                rate = rates.get(key, 0.0)
+                if rate <= 0:
+                    due[key] = now
+                    continue
+                # Catch up after a stall, but never by more than one second of messages
+                due[key] = max(due[key], now - 1.0)
+                while due[key] <= now:
+                    message = dict(sample, timestamp=time.time())
+                    if self._pad:
+                        message["pad"] = self._pad
+                    payload, props = codec.encode(key, message)
+                    props.UserProperty = (SENT_PROPERTY, repr(time.time()))
+                    self.client.publish(TOPICS[key], payload, qos=self.qos, properties=props)
+                    self.sent += 1
+                    due[key] += 1.0 / rate
+                next_due = min(next_due, due[key])
+            self._stop.wait(max(0.0, next_due - time.monotonic()))
+
+    def stop(self):
+        self._stop.set()
+        self.client.loop_stop()
+        self.client.disconnect()
+
+
+def main(argv=None) -> int:
+    """
+    Ramps spacecraft-equivalent publishers against the aggregator until the
+    callback backs up (queue delay p95) or falls behind (backlog), and
+    reports the last sustainable message rate.
+    """
+    parser = argparse.ArgumentParser(description="Aggregator saturation test on a loopback broker")
+    parser.add_argument("--adcs-hz", type=float, default=10.0, help="per spacecraft-equivalent")
+    parser.add_argument("--eps-hz", type=float, default=1.0)
+    parser.add_argument("--payload-hz", type=float, default=0.5)
+    parser.add_argument("--obc-hz", type=float, default=0.1)
+    parser.add_argument("--pad-bytes", type=int, default=0, help="extra bytes per message (larger payloads)")
+    parser.add_argument("--qos", type=int, default=1, choices=(0, 1))
+    parser.add_argument("--start", type=float, default=1, help="spacecraft-equivalents in the first step")
+    parser.add_argument("--factor", type=float, default=1.5, help="load multiplier per step")
+    parser.add_argument("--max-craft", type=float, default=1000)
+    parser.add_argument("--step-sec", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=4, help="publisher connections sharing the load")
+    parser.add_argument("--max-delay-ms", type=float, default=100.0, help="queue delay p95 threshold")
+    parser.add_argument("--max-backlog-pct", type=float, default=5.0, help="messages not handled by the step's end")
+    parser.add_argument("--output", help="write the steps as JSON")
+    args = parser.parse_args(argv)
+
+    per_craft = {"adcs_status": args.adcs_hz, "eps_status": args.eps_hz,
+                 "payload_data": args.payload_hz, "obc_status": args.obc_hz}
+    craft_rate = sum(per_craft.values())
+
+    broker_conn, child_conn = multiprocessing.Pipe()
+    broker_proc = multiprocessing.Process(target=_serve_broker, args=(child_conn,), daemon=True)
+    broker_proc.start()
+    host, port = broker_conn.recv()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    env = dict(os.environ, MQTT_BROKER=host, MQTT_PORT=str(port), PYTHONPATH=str(ROOT))
+    target = subprocess.Popen(
+        [sys.executable, "-c", f"from benchmarks import loadgen; loadgen._target({tmpdir.name + '/load.db'!r})"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=ROOT, env=env, text=True)
+
+    def snapshot() -> Dict:
+        target.stdin.write("\n")
+        target.stdin.flush()
+        return json.loads(target.stdout.readline())
+
+    proc = _ServiceProcess(target.pid)
+    broker_stat = _ServiceProcess(broker_proc.pid)
+    publishers = [Publisher(i, host, port, args.qos, args.pad_bytes) for i in range(args.clients)]
+    for publisher in publishers:
+        publisher.start()
+    time.sleep(1.0)   # aggregator connected and subscribed
+    snapshot()
+    proc.sample()
+    broker_stat.sample()
+
+    print(f"{'craft':>7} {'target/s':>9} {'sent/s':>8} {'handled/s':>9} {'cb p50 us':>9} {'cb p99 us':>9} "
+          f"{'delay p95 ms':>12} {'backlog %':>9} {'RSS MiB':>8} {'CPU %':>6} {'broker %':>8}")
+    steps, capacity, reason = [], None, "max-craft reached"
+    craft = args.start
+    try:
+        while craft <= args.max_craft:
+            rates = {key: rate * craft / len(publishers) for key, rate in per_craft.items()}
+            for publisher in publishers:
+                publisher.set_rates(rates)
+            sent_before = sum(p.sent for p in publishers)
+            start = time.monotonic()
+            time.sleep(args.step_sec)
+            stats = snapshot()
+            elapsed = time.monotonic() - start
+            sample = proc.sample() or {}
+            broker_cpu = (broker_stat.sample() or {}).get("cpu_percent")
+            sent = sum(p.sent for p in publishers) - sent_before
+            backlog_pct = max(0.0, (sent - stats["handled"]) / sent * 100) if sent else 0.0
+            step = {
+                "craft": craft, "target_rate": round(craft * craft_rate, 1),
+                "sent_rate": round(sent / elapsed, 1), "handled_rate": round(stats["handled"] / elapsed, 1),
+                "callback_us": stats["callback_us"], "delay_ms": stats["delay_ms"],
+                "backlog_pct": round(backlog_pct, 1),
+                "rss_mib": round(sample.get("rss_kib", 0) / 1024, 1), "cpu_percent": sample.get("cpu_percent"),
+                "broker_cpu_percent": broker_cpu,
+            }
+            steps.append(step)
+            print(f"{craft:>7g} {step['target_rate']:>9} {step['sent_rate']:>8} {step['handled_rate']:>9} "
+                  f"{step['callback_us']['p50']!s:>9} {step['callback_us']['p99']!s:>9} "
+                  f"{step['delay_ms']['p95']!s:>12} {step['backlog_pct']:>9} {step['rss_mib']:>8} "
+                  f"{step['cpu_percent']!s:>6} {broker_cpu!s:>8}")
+
+            delay_p95 = step["delay_ms"]["p95"]
+            if delay_p95 is not None and delay_p95 > args.max_delay_ms:
+                reason = f"queue delay p95 {delay_p95} ms > {args.max_delay_ms:g} ms"
+            elif backlog_pct > args.max_backlog_pct:
+                reason = f"backlog {backlog_pct:.1f} % > {args.max_backlog_pct:g} %"
+            elif step["sent_rate"] < 0.9 * step["target_rate"]:
+                reason = f"generator limit: sent {step['sent_rate']}/s of {step['target_rate']}/s"
+            else:
+                capacity = step
+                craft = round(craft * args.factor, 2)
+                continue
+            # A saturated stand-in (one Python process) caps the load before the aggregator does
+            if broker_cpu is not None and broker_cpu >= 90:
+                reason += f"; broker stand-in at {broker_cpu:g} % CPU, so the capacity is a lower bound"
+            break
+    finally:
+        for publisher in publishers:
+            publisher.stop()
+        target.stdin.write("quit\n")
+        target.stdin.flush()
+        target.wait(timeout=5)
+        broker_conn.send("stop")
+        broker_proc.join(timeout=5)
+        tmpdir.cleanup()
+
+    print(f"stopped: {reason}")
+    if capacity is not None:
+        print(f"capacity: {capacity['handled_rate']} msg/s "
+              f"({capacity['craft']:g} spacecraft-equivalents at {craft_rate:g} msg/s each), "
+              f"callback p99 {capacity['callback_us']['p99']} us, RSS {capacity['rss_mib']} MiB")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"per_craft_rates": per_craft, "pad_bytes": args.pad_bytes, "qos": args.qos,
+                       "stopped": reason, "capacity": capacity, "steps": steps}, f, indent=2)
+    return 0 if capacity is not None else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+import sys
+import types
+from typing import Dict, List
+
+
+class FakeSMBus:
+    """
+    Register-map stand-in for smbus2.SMBus.
+    Reads return deterministic values so benchmarks are repeatable on any machine.
+    """
+
+    def __init__(self, bus: int = 1, registers: Dict[int, Dict[int, int]] = None):
+        self.bus = bus
+        self.registers = registers or {}
+
+    def _reg(self, addr: int, reg: int) -> int:
+        return self.registers.get(addr, {}).get(reg, 0x01)
+
+    def read_byte_data(self, addr: int, reg: int) -> int:
+        return self._reg(addr, reg)
+
+    def write_byte_data(self, addr: int, reg: int, value: int):
+        self.registers.setdefault(addr, {})[reg] = value & 0xFF
+
+    def read_i2c_block_data(self, addr: int, reg: int, length: int) -> List[int]:
+        return [self._reg(addr, reg + i) for i in range(length)]
+
+    def write_i2c_block_data(self, addr: int, reg: int, data: List[int]):
+        for i, value in enumerate(data):
+            self.write_byte_data(addr, reg + i, value)
+
+    def close(self):
+        pass
+
+
+def imu_registers() -> Dict[int, Dict[int, int]]:
+    """QMI8658 + AK09918 register map: WHO_AM_I values, a ~1 g Z axis, small gyro/mag readings."""
+    from src.common.imu_qmi8658_ak09918 import (
+        I2C_ADD_QMI8658, I2C_ADD_AK09918, QMI_AX_L, QMI_TEMP_L, AK_WIA2, AK_ST1, AK_HXL
+    )
+    accel_gyro = [0x10, 0x00, 0xF0, 0xFF, 0x00, 0x40,   # ax, ay, az (≈1 g)
+                  0x05, 0x00, 0xFB, 0xFF, 0x02, 0x00]   # gx, gy, gz
+    qmi = {0x00: 0x05, QMI_TEMP_L: 0x00, QMI_TEMP_L + 1: 0x1E}
+    qmi.update({QMI_AX_L + i: b for i, b in enumerate(accel_gyro)})
+    ak = {AK_WIA2: 0x0C, AK_ST1: 0x01}
+    ak.update({AK_HXL + i: b for i, b in enumerate([0x20, 0x01, 0x10, 0xFF, 0x80, 0x00])})
+    return {I2C_ADD_QMI8658: qmi, I2C_ADD_AK09918: ak}
+
+
+def _fake_gpio_module() -> types.ModuleType:
+    gpio = types.ModuleType("RPi.GPIO")
+    gpio.BCM = 11
+    gpio.IN = 1
+    gpio.OUT = 0
+    gpio.BOTH = 33
+    gpio.setwarnings = lambda flag: None
+    gpio.setmode = lambda mode: None
+    gpio.setup = lambda pin, mode, **kwargs: None
+    gpio.input = lambda pin: 0
+    gpio.cleanup = lambda *args: None
+    gpio.add_event_detect = lambda pin, edge, callback=None, bouncetime=None: None
+    gpio.remove_event_detect = lambda pin: None
+    return gpio
+
+
+def _fake_lgpio_module() -> types.ModuleType:
+    lgpio = types.ModuleType("lgpio")
+    lgpio.i2c_open = lambda bus, addr, flags: 0
+    lgpio.i2c_close = lambda handle: None
+    lgpio.i2c_write_byte_data = lambda handle, reg, value: None
+    lgpio.i2c_read_device = lambda handle, count: (count, bytearray(count))
+    return lgpio
+
+
+def install():
+    """
+    Registers stand-in modules for hardware libraries that are not importable
+    on this machine (smbus2, RPi.GPIO, lgpio). Real libraries are left untouched.
+    """
+    try:
+        import smbus2  # noqa: F401
+    except ImportError:
+        smbus2 = types.ModuleType("smbus2")
+        smbus2.SMBus = FakeSMBus
+        sys.modules["smbus2"] = smbus2
+
+    try:
+        import RPi.GPIO  # noqa: F401
+    except (ImportError, RuntimeError):
+        rpi = types.ModuleType("RPi")
+        rpi.GPIO = _fake_gpio_module()
+        sys.modules["RPi"] = rpi
+        sys.modules["RPi.GPIO"] = rpi.GPIO
+
+    try:
+        import lgpio  # noqa: F401
+    except ImportError:
+        sys.modules["lgpio"] = _fake_lgpio_module()
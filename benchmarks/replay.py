@@ -0,0 +1,407 @@
+import argparse
+import heapq
+import itertools
+import json
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from benchmarks import mock_hw
+
+mock_hw.install()
+
+from src.common import codec, get_mqtt_client
+from src.common.config import DB_PATH, MQTT_BROKER, MQTT_PORT, TOPICS, build_publish_policy
+from src.telemetry.history import STATE_FIELD, epoch_to_iso, iso_to_epoch
+from src.telemetry.recorder import SECTION_FIELDS
+from src.telemetry.series import SeriesStore
+
+# Packet section → TOPICS key it arrived on
+SECTION_TOPICS = {"obc": "obc_status", "eps": "eps_status", "adcs": "adcs_status", "payload": "payload_data"}
+# The producers' (QoS, retain) per topic
+PUBLISH_FLAGS = {"obc_status": (0, True), "eps_status": (1, True), "adcs_status": (1, False), "payload_data": (1, False)}
+SEQ_PROPERTY = "replay_seq"
+# Every message goes out with PUBLISH_FLAGS: no config topic rules, nothing coalesced or dropped
+REPLAY_POLICY = build_publish_policy({"offline_queue": 1_000_000})
+
+
+def logged_packets(db_path: str, start: float = None, end: float = None) -> Iterator[Tuple[float, Dict]]:
+    """(epoch, packet) from telemetry_log.raw_json in time order, streamed row by row through the timestamp index."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    where, args = [], []
+    if start is not None:
+        where.append("timestamp >= ?")
+        args.append(epoch_to_iso(start))
+    if end is not None:
+        where.append("timestamp < ?")
+        args.append(epoch_to_iso(end))
+    sql = "SELECT timestamp, raw_json FROM telemetry_log"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    try:
+        for timestamp, raw in conn.execute(sql + " ORDER BY timestamp", args):
+            try:
+                yield iso_to_epoch(timestamp), json.loads(raw)
+            except (TypeError, ValueError):
+                continue
+    finally:
+        conn.close()
+
+
+def _received_at(packet_ts: float, freshness: Optional[Dict], message: Optional[Dict]) -> float:
+    # Aggregator receive time from the packet's freshness ages; older packets have none: producer time
+    if freshness and freshness.get("age_sec") is not None:
+        return packet_ts - freshness["age_sec"]
+    timestamp = (message or {}).get("timestamp")
+    return float(timestamp) if isinstance(timestamp, (int, float)) else packet_ts
+
+
+def subsystem_messages(packets: Iterable[Tuple[float, Dict]]) -> Iterator[Tuple[float, str, Dict]]:
+    """
+    The subsystem messages behind logged packets, as (receive time, topic key,
+    message) in time order. A packet holds the latest message of each
+    subsystem, so a section is emitted when it differs from the previous
+    packet's; obc_status is rebuilt from obc_state and the obc receive time.
+    """
+    previous: Dict[str, object] = {}
+    last_t = None
+    for packet_ts, packet in packets:
+        freshness = packet.get("freshness") or {}
+        batch = []
+        for name in ("eps", "adcs", "payload"):
+            section = packet.get(name)
+            if section and section != previous.get(name):
+                previous[name] = section
+                batch.append((_received_at(packet_ts, freshness.get(name), section), SECTION_TOPICS[name], section))
+        state = packet.get("obc_state")
+        if state and state != "UNKNOWN":
+            t = _received_at(packet_ts, freshness.get("obc"), None)
+            last_state, last_obc_t = previous.get("obc", (None, None))
+            # A heartbeat shows up as a later receive time (ages are rounded to 0.1 s)
+            if state != last_state or (freshness.get("obc") and t - last_obc_t >= 1.0):
+                previous["obc"] = (state, t)
+                batch.append((t, "obc_status", {"timestamp": t, "status": state}))
+        batch.sort(key=lambda item: item[0])
+        for t, key, message in batch:
+            last_t = t if last_t is None else max(t, last_t)   # never backwards across packets
+            yield last_t, key, message
+
+
+def _tagged(name: str, samples: Iterable[Tuple[float, object]]) -> Iterator[Tuple[float, str, object]]:
+    for ts, value in samples:
+        yield ts, name, value
+
+
+def _section_messages(series: SeriesStore, section: str, start: float, end: float) -> Iterator[Tuple[float, str, Dict]]:
+    # A section's fields are stored together, so samples sharing a timestamp make up one message
+    fields = SECTION_FIELDS[section]
+    samples = heapq.merge(*(_tagged(name, series.read(name, start, end)) for name in fields), key=lambda s: s[0])
+    previous = None
+    for ts, group in itertools.groupby(samples, key=lambda s: s[0]):
+        body: Dict = {}
+        for _, name, value in group:
+            if value is None:
+                continue
+            target = body
+            *parents, leaf = fields[name]
+            for key in parents:
+                target = target.setdefault(key, {})
+            target[leaf] = value
+        if body and body != previous:
+            previous = body
+            yield ts, SECTION_TOPICS[section], dict(body, timestamp=ts)
+
+
+def _state_messages(series: SeriesStore, start: float, end: float) -> Iterator[Tuple[float, str, Dict]]:
+    last = None
+    for ts, state in series.read(STATE_FIELD, start, end):
+        if state and state != "UNKNOWN" and state != last:
+            last = state
+            yield ts, "obc_status", {"timestamp": ts, "status": state}
+
+
+def series_messages(db_path: str, start: float = None, end: float = None) -> Iterator[Tuple[float, str, Dict]]:
+    """
+    The subsystem messages in series_blocks (telemetry.storage series or
+    both), as (receive time, topic key, message) in time order. With
+    telemetry.record every message was stored at its receive time, otherwise
+    one sample per packet; either way a section is emitted when it differs
+    from the previous one, and obc_status when obc_state changes. Only the
+    stored fields (HISTORY_FIELDS) come back.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        try:
+            first, last = conn.execute("SELECT MIN(start_ts), MAX(end_ts) FROM series_blocks").fetchone()
+        except sqlite3.OperationalError:
+            return   # no series_blocks table: stored with storage rows
+        if first is None:
+            return
+        start = first if start is None else start
+        end = last + 0.001 if end is None else end
+        series = SeriesStore(conn, threading.Lock())
+        streams = [_section_messages(series, section, start, end) for section in SECTION_FIELDS]
+        streams.append(_state_messages(series, start, end))
+        yield from heapq.merge(*streams, key=lambda m: m[0])
+    finally:
+        conn.close()
+
+
+def has_logged_packets(db_path: str) -> bool:
+    """True when telemetry_log holds raw_json rows (telemetry.storage rows or both)."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return conn.execute("SELECT 1 FROM telemetry_log WHERE raw_json IS NOT NULL LIMIT 1").fetchone() is not None
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+
+class LagProbe:
+    """
+    Subscriber on the replayed topics: per message, the delay from the
+    replayer's publish() to delivery here. cost_ms simulates a consumer
+    that needs that long per message, so a backlog (and lag) builds up
+    once the replay outruns it.
+    """
+
+    def __init__(self, sent_at: Dict[int, float], cost_ms: float = 0.0):
+        self.sent_at = sent_at
+        self.cost_sec = cost_ms / 1000.0
+        self.lags: List[float] = []
+        self.received = 0
+        self.unmatched = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self.client = get_mqtt_client("cubesat-replay-probe")
+        self.client.on_connect = self._on_connect
+        self.client.on_subscribe = lambda *args: self._ready.set()
+        self.client.on_message = self._on_message
+
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
+        client.subscribe([(TOPICS[key], 1) for key in SECTION_TOPICS.values()])
+
+    def _on_message(self, client, userdata, msg):
+        if msg.retain:
+            return   # retained copy from before the replay
+        now = time.monotonic()
+        seq = dict(getattr(msg.properties, "UserProperty", None) or []).get(SEQ_PROPERTY)
+        with self._lock:
+            self.received += 1
+            sent = self.sent_at.pop(int(seq), None) if seq is not None else None
+            if sent is None:
+                self.unmatched += 1
+            else:
+                self.lags.append(now - sent)
+        if self.cost_sec:
+            time.sleep(self.cost_sec)
+
+    def start(self, host: str, port: int):
+        self.client.connect(host, port)
+        self.client.loop_start()
+        if not self._ready.wait(5):
+            raise ConnectionError(f"probe could not subscribe on {host}:{port}")
+
+    def stop(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+    def window(self, since: int = 0) -> Dict:
+        """Lag percentiles (ms) of the messages received after the first `since`."""
+        with self._lock:
+            lags = sorted(self.lags[since:])
+        if not lags:
+            return {"count": 0}
+        pick = lambda q: round(lags[min(len(lags) - 1, int(q * len(lags)))] * 1000, 2)
+        return {"count": len(lags), "p50_ms": pick(0.5), "p95_ms": pick(0.95), "max_ms": round(lags[-1] * 1000, 2)}
+
+
+class Replayer:
+    """
+    Republishes recovered subsystem messages on their original topics with
+    the producers' codec, QoS and retain flag. speed 1 keeps the original
+    inter-arrival times, N compresses them N-fold, 0 sends as fast as the
+    client can. retime shifts each message's timestamp to the replay clock.
+    """
+
+    def __init__(self, client, speed: float = 1.0, retime: bool = False):
+        self.client = client
+        self.speed = speed
+        self.retime = retime
+        self.sent = 0
+        self.sent_bytes = 0
+        self.acked = 0
+        self.max_behind_sec = 0.0    # how far publishing fell behind the schedule
+        self.sent_at: Dict[int, float] = {}
+        client.on_publish = self._on_publish
+
+    def _on_publish(self, client, userdata, mid, *args):
+        self.acked += 1
+
+    def run(self, messages: Iterable[Tuple[float, str, Dict]], stop: threading.Event = None,
+            on_progress=None, report_sec: float = 5.0) -> float:
+        """Publishes until messages run out (or stop is set); returns the elapsed seconds."""
+        t0 = wall0 = None
+        next_report = time.monotonic() + report_sec
+        for t, key, message in messages:
+            if stop is not None and stop.is_set():
+                break
+            now = time.monotonic()
+            if t0 is None:
+                t0, wall0 = t, now
+            if self.speed > 0:
+                due = wall0 + (t - t0) / self.speed
+                if due > now:
+                    time.sleep(due - now)
+                else:
+                    self.max_behind_sec = max(self.max_behind_sec, now - due)
+            if self.retime and isinstance(message.get("timestamp"), (int, float)):
+                message = dict(message, timestamp=time.time() - (t - message["timestamp"]))
+            qos, retain = PUBLISH_FLAGS[key]
+            payload, props = codec.encode(key, message)
+            props.UserProperty = (SEQ_PROPERTY, str(self.sent))
+            self.sent_at[self.sent] = time.monotonic()
+            self.client.publish(TOPICS[key], payload, qos=qos, retain=retain, properties=props)
+            self.sent += 1
+            self.sent_bytes += len(payload)
+            if on_progress is not None and time.monotonic() >= next_report:
+                next_report += report_sec
+                on_progress(self, time.monotonic() - wall0)
+        return 0.0 if wall0 is None else time.monotonic() - wall0
+
+
+def simulated_db(n: int, tmpdir: str, storage: str = None) -> str:
+    """
+    A telemetry.db with n simulated packets, stored as the aggregator does
+    with telemetry.storage (or `storage`): each packet's messages go through
+    the recorder when telemetry.record is on (no logged database needed).
+    """
+    from benchmarks.series import simulated_day
+    import src.telemetry.aggregator as aggregator_module
+
+    path = f"{tmpdir}/replay.db"
+    aggregator_module.DB_PATH = path
+    if storage is not None:
+        aggregator_module.TELEMETRY_STORAGE = storage
+    agg = aggregator_module.TelemetryAggregator()
+    for packet in simulated_day(n):
+        if agg.recorder is not None:
+            packet_ts = iso_to_epoch(packet["timestamp"])
+            for section in SECTION_TOPICS:
+                message = {"status": packet["obc_state"]} if section == "obc" else packet[section]
+                agg.recorder.record(section, message, _received_at(packet_ts, packet["freshness"].get(section), None))
+            agg.recorder.write()
+        agg._log_to_db(packet, json.dumps(packet, ensure_ascii=False).encode("utf-8"))
+    if agg.series is not None:
+        agg.series.flush(force=True)
+    agg.conn.close()
+    return path
+
+
+def _epoch(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return iso_to_epoch(value)
+
+
+def main(argv=None) -> int:
+    """Replays a telemetry.db through MQTT and reports the achieved rate and consumer lag."""
+    parser = argparse.ArgumentParser(description="Replay logged telemetry on the original MQTT topics")
+    parser.add_argument("--db", default=str(DB_PATH), help=f"telemetry.db to replay (default {DB_PATH})")
+    parser.add_argument("--source", choices=("auto", "rows", "series"), default="auto",
+                        help="telemetry_log raw_json or series_blocks; auto = rows when telemetry_log has any")
+    parser.add_argument("--simulated", type=int, metavar="N", help="replay N simulated packets instead of --db")
+    parser.add_argument("--storage", choices=("series", "rows", "both"),
+                        help="telemetry.storage for --simulated (default: config.yaml)")
+    parser.add_argument("--start", help="epoch seconds or ISO time")
+    parser.add_argument("--end", help="epoch seconds or ISO time")
+    parser.add_argument("--limit", type=int, help="stop after this many messages")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression: 1 = original spacing")
+    parser.add_argument("--max", action="store_true", help="as fast as possible (ignore the original spacing)")
+    parser.add_argument("--retime", action="store_true", help="shift message timestamps to the replay clock")
+    parser.add_argument("--loopback", action="store_true", help="run against an in-process broker stand-in")
+    parser.add_argument("--broker", default=f"{MQTT_BROKER}:{MQTT_PORT}", help="host:port (ignored with --loopback)")
+    parser.add_argument("--consumer-cost-ms", type=float, default=0.0, help="simulated work per message in the probe")
+    parser.add_argument("--report-sec", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    broker = None
+    if args.loopback:
+        from benchmarks.broker import LoopbackBroker
+        broker = LoopbackBroker()
+        host, port = broker.start()
+    else:
+        host, _, port = args.broker.rpartition(":")
+        port = int(port)
+
+    tmpdir = tempfile.TemporaryDirectory()
+    db_path = simulated_db(args.simulated, tmpdir.name, args.storage) if args.simulated else args.db
+    source = args.source
+    if source == "auto":
+        source = "rows" if has_logged_packets(db_path) else "series"
+    if source == "rows":
+        messages = subsystem_messages(logged_packets(db_path, _epoch(args.start), _epoch(args.end)))
+    else:
+        messages = series_messages(db_path, _epoch(args.start), _epoch(args.end))
+    if args.limit:
+        messages = (m for i, m in zip(range(args.limit), messages))
+
+    client = get_mqtt_client("cubesat-replay", policy=REPLAY_POLICY)
+    replayer = Replayer(client, speed=0.0 if args.max else args.speed, retime=args.retime)
+    probe = LagProbe(replayer.sent_at, args.consumer_cost_ms)
+    probe.start(host, port)
+    client.connect(host, port)
+    client.loop_start()
+
+    window_start = [0]
+
+    def progress(r: Replayer, elapsed: float):
+        lag = probe.window(window_start[0])
+        window_start[0] += lag["count"]
+        print(f"{elapsed:7.1f} s  sent {r.sent:>8}  {r.sent / elapsed:>8.1f} msg/s  received {probe.received:>8}  "
+              f"lag p95 {lag.get('p95_ms', '-')} ms  behind {r.max_behind_sec:.2f} s")
+
+    print(f"Replaying {'simulated' if args.simulated else db_path} ({source}) to {host}:{port} "
+          f"at {'max speed' if args.max else f'{args.speed:g}x'}")
+    try:
+        elapsed = replayer.run(messages, on_progress=progress, report_sec=args.report_sec)
+    except KeyboardInterrupt:
+        elapsed = 0.0
+    if not replayer.sent:
+        print(f"nothing to replay in {db_path}: no {'telemetry_log raw_json rows' if source == 'rows' else 'series blocks'}")
+        return 1
+
+    # Drain: wait until the probe stops receiving
+    drain_start, last = time.monotonic(), -1
+    while probe.received != last and probe.received < replayer.sent and time.monotonic() - drain_start < 60:
+        last = probe.received
+        time.sleep(1.0)
+    drained = time.monotonic() - drain_start
+
+    lag = probe.window()
+    print(f"sent {replayer.sent} messages ({replayer.sent_bytes / 1024:.1f} KiB) in {elapsed:.2f} s: "
+          f"{replayer.sent / max(elapsed, 1e-9):.1f} msg/s, {replayer.sent_bytes / max(elapsed, 1e-9) / 1024:.1f} KiB/s; "
+          f"acked {replayer.acked}, max behind schedule {replayer.max_behind_sec:.3f} s")
+    print(f"consumer: received {probe.received} ({replayer.sent - probe.received} missing after {drained:.1f} s drain), "
+          f"lag p50 {lag.get('p50_ms')} ms, p95 {lag.get('p95_ms')} ms, max {lag.get('max_ms')} ms")
+    if broker is not None:
+        print(f"broker: {broker.stats()}")
+
+    probe.stop()
+    client.loop_stop()
+    client.disconnect()
+    if broker is not None:
+        broker.stop()
+    tmpdir.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.harness import run_case, compare
+from benchmarks.cases import CASES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+
+def _load_settings():
+    """Threshold and timing defaults from config/config.yaml (benchmarks section)."""
+    try:
+        from src.common.config import BENCHMARK_REGRESSION_PCT, BENCHMARK_MIN_TIME_SEC
+        return BENCHMARK_REGRESSION_PCT, BENCHMARK_MIN_TIME_SEC
+    except Exception as e:
+        logger.warning(f"Could not load benchmark settings from config ({e}); using defaults")
+        return 20.0, 1.0
+
+
+def main(argv=None) -> int:
+    threshold_default, min_time_default = _load_settings()
+
+    parser = argparse.ArgumentParser(description="CubeSat hot-path micro-benchmarks (mock hardware)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=threshold_default,
+                        help="allowed regression in percent before failing")
+    parser.add_argument("--min-time", type=float, default=min_time_default,
+                        help="minimum timed seconds per case")
+    parser.add_argument("--only", action="append", default=[], help="run only cases whose name contains this")
+    parser.add_argument("--output", type=Path, help="also write this run's results to a JSON file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    cases = [c for c in CASES if not args.only or any(o in c.name for o in args.only)]
+    results = {}
+    failed = []
+    print(f"{'case':40} {'ops/s':>12} {'us/call':>10} {'alloc B':>9} {'peak KiB':>9}")
+    for case in cases:
+        try:
+            result = run_case(case, min_time=args.min_time)
+        except ImportError as e:
+            # Optional dependency (msgpack, sqlite extension...) missing on this machine
+            print(f"{case.name:40} SKIPPED ({type(e).__name__}: {e})")
+            continue
+        except Exception as e:
+            logger.exception(f"{case.name} failed")
+            print(f"{case.name:40} FAILED ({type(e).__name__}: {e})")
+            failed.append(case.name)
+            continue
+        results[case.name] = result.to_dict()
+        print(f"{case.name:40} {result.ops_per_sec:>12.1f} {result.us_per_call:>10.2f} "
+              f"{result.alloc_bytes_per_call:>9.0f} {result.peak_kib:>9.1f}")
+
+    report = {
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "results": results,
+    }
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if failed:
+        print(f"\n{len(failed)} case(s) failed: {', '.join(failed)}")
+        return 1
+
+    if args.save:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"Baseline saved: {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --save to create one")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+    if baseline.get("machine") != report["machine"]:
+        print(f"Warning: baseline recorded on {baseline.get('machine')}, running on {report['machine']}")
+
+    regressions = compare(results, baseline.get("results", {}), args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0f}%:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+
+    print(f"\nNo regressions beyond {args.threshold:.0f}% against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
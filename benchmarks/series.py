@@ -0,0 +1,200 @@
+import argparse
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+from benchmarks import mock_hw
+from benchmarks.harness import BenchCase
+from benchmarks.cases_data import SAMPLE_EPS, SAMPLE_ADCS, SAMPLE_PAYLOAD
+
+mock_hw.install()
+
+
+def simulated_day(n: int = 2880, interval: float = 30.0, seed: int = 7) -> List[Dict]:
+    """
+    Telemetry packets shaped like the aggregator's, with plausible dynamics:
+    90-minute orbit (battery charge/discharge, temperatures), sensor noise at
+    the producers' rounding, millisecond jitter on the timestamps.
+    """
+    from src.common.system_metrics import SystemMetricsCollector
+
+    rng = random.Random(seed)
+    system = SystemMetricsCollector().collect()
+    t, battery, packets = 1741863600.0, 92.0, []
+    for i in range(n):
+        t += interval + rng.uniform(-0.005, 0.005)
+        orbit = math.sin(2 * math.pi * t / 5400)
+        battery = min(100.0, max(5.0, battery + (0.03 if orbit > 0 else -0.05)))
+        eps = dict(SAMPLE_EPS, timestamp=t - 3, battery=round(battery, 2),
+                   voltage=round(3.6 + battery / 200 + rng.gauss(0, 0.002), 3), external_power=orbit > 0)
+        adcs = dict(SAMPLE_ADCS, timestamp=t - 0.2,
+                    roll=round(rng.gauss(1.2, 0.3), 2), pitch=round(rng.gauss(-0.4, 0.3), 2),
+                    yaw=round(178.9 + rng.gauss(0, 0.5), 2), imu_temp=round(30 + 5 * orbit + rng.gauss(0, 0.05), 2),
+                    accel_g={k: round(v + rng.gauss(0, 0.005), 2) for k, v in SAMPLE_ADCS["accel_g"].items()},
+                    gyro_dps={k: round(v + rng.gauss(0, 0.05), 2) for k, v in SAMPLE_ADCS["gyro_dps"].items()})
+        payload = dict(SAMPLE_PAYLOAD, timestamp=t - 20,
+                       temperature=round(20 + 8 * orbit + rng.gauss(0, 0.02), 2),
+                       humidity=round(45 + rng.gauss(0, 0.1), 2), pressure=round(1013.25 + rng.gauss(0, 0.03), 2))
+        sys_now = dict(system, cpu_percent=round(rng.uniform(3, 15), 1), uptime_seconds=int(i * interval),
+                       cpu_temperature=round(48 + 4 * orbit + rng.gauss(0, 0.3), 1))
+        packets.append({
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(t)) + f".{int(t % 1 * 1e6):06d}Z",
+            "obc_state": "SCIENCE", "eps": eps, "adcs": adcs, "payload": payload, "system": sys_now,
+            "freshness": {"obc": {"age_sec": 4.1, "stale": False}, "eps": {"age_sec": 3.0, "stale": False},
+                          "adcs": {"age_sec": 0.2, "stale": False}, "payload": {"age_sec": 20.0, "stale": False}},
+        })
+    return packets
+
+
+def logged_packets(path: str) -> List[Dict]:
+    """Packets from the raw_json column of a telemetry.db pulled from the board."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return [json.loads(raw) for (raw,) in conn.execute("SELECT raw_json FROM telemetry_log ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def _make_aggregator(db_path: str, storage: str):
+    import src.telemetry.aggregator as aggregator_module
+
+    aggregator_module.DB_PATH = db_path
+    aggregator_module.TELEMETRY_STORAGE = storage
+    # Whole packets into both storages (no per-message recording), so the two compare value for value
+    aggregator_module.TELEMETRY_RECORD_ENABLED = False
+    return aggregator_module.TelemetryAggregator()
+
+
+def _db_bytes(conn) -> int:
+    conn.execute("VACUUM")
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    return page_count * conn.execute("PRAGMA page_size").fetchone()[0]
+
+
+def _store(packets: List[Dict], storage: str, tmpdir: str):
+    agg = _make_aggregator(os.path.join(tmpdir, f"{storage}.db"), storage)
+    start = time.perf_counter()
+    for packet in packets:
+        agg._log_to_db(packet, json.dumps(packet, ensure_ascii=False).encode("utf-8"))
+    if agg.series is not None:
+        agg.series.flush(force=True)
+    write_sec = time.perf_counter() - start
+    return agg, write_sec
+
+
+def series_cases() -> List[BenchCase]:
+    def setup_append():
+        from src.telemetry.series import SeriesStore
+        from src.telemetry.history import HISTORY_FIELDS, extract_field
+
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        store = SeriesStore(conn, threading.Lock(), flush_sec=math.inf)
+        packet = simulated_day(1)[0]
+        values = {name: extract_field(packet, path) for name, path in HISTORY_FIELDS.items()}
+        clock = [1741863600.0]
+
+        def append():
+            clock[0] += 30.0
+            store.append(clock[0], values)
+        return append
+
+    def setup_record():
+        from src.telemetry.series import SeriesStore
+        from src.telemetry.recorder import MessageRecorder
+
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        recorder = MessageRecorder(SeriesStore(conn, threading.Lock(), flush_sec=math.inf))
+        message = json.loads(json.dumps(SAMPLE_ADCS))
+        clock = [1741863600.0]
+
+        def record():
+            clock[0] += 0.1
+            recorder.record("adcs", message, clock[0])
+            recorder.write()
+        return record
+
+    def setup_decode():
+        from src.telemetry.gorilla import encode_points, decode_block
+
+        packets = simulated_day(720)
+        block = encode_points([i * 30.0 for i in range(len(packets))], [p["eps"]["voltage"] for p in packets], 3)
+        return lambda: sum(1 for _ in decode_block(block))
+
+    return [
+        BenchCase("series.append_packet", setup_append, "21 fields of one packet into open Gorilla blocks"),
+        BenchCase("recorder.adcs_message", setup_record, "One ADCS message recorded and written (13 series)"),
+        BenchCase("gorilla.decode_720", setup_decode, "Stream-decode a 720-sample voltage block (6 h at 30 s)"),
+    ]
+
+
+def main(argv=None) -> int:
+    """Storage size and write/read cost: telemetry_log rows vs compressed series blocks."""
+    parser = argparse.ArgumentParser(description="telemetry_log rows vs Gorilla series blocks")
+    parser.add_argument("--db", help="telemetry.db with logged rows (default: a simulated day)")
+    parser.add_argument("--points", type=int, default=2880, help="simulated packets (default 24 h at 30 s)")
+    args = parser.parse_args(argv)
+
+    packets = logged_packets(args.db) if args.db else simulated_day(args.points)
+    if not packets:
+        print("no packets")
+        return 1
+    print(f"{len(packets)} packets ({'logged: ' + args.db if args.db else 'simulated'})")
+
+    from src.telemetry.history import HISTORY_FIELDS, STATE_FIELD, iso_to_epoch
+
+    fields = list(HISTORY_FIELDS) + [STATE_FIELD]
+    start_ts = iso_to_epoch(packets[0]["timestamp"])
+    end_ts = iso_to_epoch(packets[-1]["timestamp"]) + 1
+    with tempfile.TemporaryDirectory() as tmpdir:
+        results = {}
+        for storage in ("rows", "series"):
+            agg, write_sec = _store(packets, storage, tmpdir)
+            query = agg._query_db_history if storage == "rows" else agg._query_series
+            start = time.perf_counter()
+            rows = query(start_ts, end_ts, fields)
+            read_sec = time.perf_counter() - start
+            if storage == "rows":
+                full_bytes = _db_bytes(agg.conn)
+                # Like for like: only the columns of the fields the series hold, without raw_json
+                with agg.db_lock:
+                    agg.conn.execute("UPDATE telemetry_log SET raw_json = NULL, uptime_seconds = NULL")
+                    agg.conn.commit()
+            results[storage] = (_db_bytes(agg.conn), write_sec, read_sec, rows)
+            agg.conn.close()
+
+        print(f"{'storage':10} {'bytes':>10} {'B/packet':>9} {'write us/pkt':>13} {'full read ms':>13}")
+        print(f"{'rows+json':10} {full_bytes:>10} {full_bytes / len(packets):>9.1f} {'':>13} {'':>13}")
+        for storage, (nbytes, write_sec, read_sec, rows) in results.items():
+            print(f"{storage:10} {nbytes:>10} {nbytes / len(packets):>9.1f} "
+                  f"{write_sec / len(packets) * 1e6:>13.1f} {read_sec * 1000:>13.1f}")
+        ratio = results["rows"][0] / results["series"][0]
+        print(f"series is {ratio:.1f}x denser than the same fields as rows "
+              f"({full_bytes / results['series'][0]:.1f}x with raw_json)")
+
+        # Lossless: every stored value comes back identical, timestamps to the millisecond
+        expected, actual = results["rows"][3], results["series"][3]
+        mismatches = abs(len(expected) - len(actual)) + sum(
+            1 for (ts_a, a), (ts_b, b) in zip(expected, actual) if abs(ts_a - ts_b) >= 0.001 or a != b)
+        print(f"round trip: {len(actual)} rows, {mismatches} mismatches")
+
+    # Bulk history transfer of one field: JSON arrays vs a base64 Gorilla block
+    from src.telemetry.gorilla import encode_points
+    import base64
+    timestamps = [iso_to_epoch(p["timestamp"]) for p in packets]
+    voltage = [p["eps"]["voltage"] for p in packets]
+    as_json = len(json.dumps({"timestamps": timestamps, "values": {"voltage": voltage}}))
+    as_block = len(base64.b64encode(encode_points(timestamps, voltage, 3)))
+    print(f"history transfer (voltage, {len(packets)} points): json {as_json} B, gorilla+base64 {as_block} B "
+          f"({as_json / as_block:.1f}x)")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "startup_baseline.json"
+
+# Service → (main module, service class)
+SERVICES = {
+    "i2c":       ("src.i2c.main",       "I2CService"),
+    "obc":       ("src.obc.main",       "OBC"),
+    "eps":       ("src.eps.main",       "EPSService"),
+    "adcs":      ("src.adcs.main",      "ADCS"),
+    "payload":   ("src.payload.main",   "PayloadService"),
+    "telemetry": ("src.telemetry.main", "TelemetryAggregator"),
+}
+
+PHASES = ("imports", "logging", "constructed", "hardware_ready")
+
+# Runs in a fresh interpreter: the same phases as main(), minus the broker connection
+_CHILD = """
+import importlib, json, sys
+from benchmarks import mock_hw
+mock_hw.install()
+from src.common.startup import timeline
+module = importlib.import_module(sys.argv[1])
+timeline.mark("imports")
+module.setup_logging(log_level="WARNING", log_file="startup-bench.log", console=False)
+timeline.mark("logging")
+service = getattr(module, sys.argv[2])()
+timeline.mark("constructed")
+hardware = getattr(service, "hardware", None)
+if hardware is not None:
+    hardware.start()
+    hardware.wait(60)
+print(json.dumps(timeline.as_dict()))
+"""
+
+
+def cold_start(service: str, workdir: Path) -> Dict[str, float]:
+    """One cold start of a service on simulated hardware; phase → ms since process start."""
+    module, cls = SERVICES[service]
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(ROOT),
+        I2C_MODE="direct",
+        I2C_BACKEND="simulated",
+        LOG_DIR=str(workdir),
+        TELEMETRY_DB_PATH=str(workdir / "telemetry.db"),
+        OBC_JOURNAL_PATH=str(workdir / "obc_journal.jsonl"),
+        OBC_SCHEDULE_PATH=str(workdir / "obc_schedule.json"),
+    )
+    proc = subprocess.run([sys.executable, "-c", _CHILD, module, cls], cwd=ROOT, env=env,
+                          capture_output=True, text=True, timeout=120)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _fmt(value: Optional[float]) -> str:
+    return f"{value:>10.0f}" if value is not None else f"{'-':>10}"
+
+
+def main(argv=None) -> int:
+    from src.common.config import STARTUP_COLD_START_BUDGET_MS, BENCHMARK_REGRESSION_PCT
+
+    parser = argparse.ArgumentParser(description="Cold-start timeline per service (simulated hardware, no broker)")
+    parser.add_argument("--runs", type=int, default=3, help="cold starts per service (median is reported)")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_COLD_START_BUDGET_MS,
+                        help="max ms from process start until a service is ready to connect")
+    parser.add_argument("--threshold", type=float, default=BENCHMARK_REGRESSION_PCT,
+                        help="allowed regression against the baseline in percent")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--only", action="append", default=[], help="run only these services")
+    args = parser.parse_args(argv)
+
+    tmpdir = tempfile.TemporaryDirectory(prefix="cubesat-startup-")
+    workdir = Path(tmpdir.name)
+    services = [s for s in SERVICES if not args.only or s in args.only]
+
+    results: Dict[str, Dict[str, float]] = {}
+    failures = []
+    print(f"{'service':10} " + " ".join(f"{p:>10}" for p in ("imports", "logging", "ready*", "hardware")) + "   (ms)")
+    for service in services:
+        try:
+            runs = [cold_start(service, workdir) for _ in range(args.runs)]
+        except Exception as e:
+            print(f"{service:10} FAILED ({e})")
+            failures.append(f"{service}: did not start ({e})")
+            continue
+        median = {p: statistics.median(r[p] for r in runs) for p in PHASES if all(p in r for r in runs)}
+        results[service] = median
+        print(f"{service:10} " + " ".join(_fmt(median.get(p)) for p in PHASES))
+        if median["constructed"] > args.budget_ms:
+            failures.append(f"{service}: ready to connect after {median['constructed']:.0f} ms "
+                            f"(budget {args.budget_ms:.0f} ms)")
+    tmpdir.cleanup()
+    print("* ready = constructed, about to connect to MQTT; hardware = background init finished")
+
+    if args.save:
+        args.baseline.write_text(json.dumps(results, indent=2))
+        print(f"Baseline saved: {args.baseline}")
+    elif args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        for service, phases in results.items():
+            for phase in ("constructed", "hardware_ready"):
+                old, new = baseline.get(service, {}).get(phase), phases.get(phase)
+                if old and new and new > old * (1 + args.threshold / 100):
+                    failures.append(f"{service}: {phase} {new:.0f} ms vs baseline {old:.0f} ms")
+
+    if failures:
+        print(f"\n{len(failures)} start-up problem(s):")
+        for line in failures:
+            print(f"  - {line}")
+        return 1
+    print("\nOK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
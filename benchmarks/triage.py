@@ -0,0 +1,76 @@
+import argparse
+import sys
+from typing import List
+
+from benchmarks import mock_hw
+from benchmarks.harness import BenchCase, run_case
+
+mock_hw.install()
+
+# Synthetic sequence and the verdict triage must reach for each frame
+EXPECTED = [
+    ("earth", "keep"),
+    ("duplicate", "deprioritize"),
+    ("pan", "keep"),
+    ("eclipse", "drop"),
+    ("saturated", "drop"),
+    ("flat", "drop"),
+    ("earth", "keep"),
+]
+
+
+def _setup_assess():
+    # numpy imported here: without it the cases are skipped, not the whole run
+    from src.payload.synthetic import SyntheticFrames
+    from src.payload.triage import ImageTriage
+
+    triage = ImageTriage()
+    frame = SyntheticFrames().frame("earth")
+    return lambda: triage.assess(frame)
+
+
+def _setup_phash():
+    from src.payload.synthetic import SyntheticFrames
+    from src.payload.triage import perceptual_hash
+
+    frame = SyntheticFrames().frame("earth")
+    return lambda: perceptual_hash(frame)
+
+
+def triage_cases() -> List[BenchCase]:
+    return [
+        BenchCase("triage.assess", _setup_assess, "Quality score of a 640x480 lores frame (stats + histogram + pHash)"),
+        BenchCase("triage.perceptual_hash", _setup_phash, "64-bit DCT hash of a 640x480 frame"),
+    ]
+
+
+def main(argv=None) -> int:
+    """Scores the synthetic frame sequence; fails when a verdict differs from EXPECTED."""
+    parser = argparse.ArgumentParser(description="Image triage verdicts and cost on synthetic frames")
+    parser.add_argument("--min-time", type=float, default=0.5)
+    args = parser.parse_args(argv)
+
+    from src.payload.synthetic import SyntheticFrames
+    from src.payload.triage import ImageTriage
+
+    frames = SyntheticFrames(sequence=[kind for kind, _ in EXPECTED])
+    triage = ImageTriage()
+    failures = 0
+    print(f"{'frame':10} {'expected':13} {'verdict':13} {'score':>6} {'mean':>6} {'std':>6} {'dist':>5}  reasons")
+    for kind, expected in EXPECTED:
+        _, luma = frames.next()
+        r = triage.assess(luma)
+        mark = "" if r.verdict == expected else "  <-- MISMATCH"
+        failures += r.verdict != expected
+        dist = "-" if r.distance is None else r.distance
+        print(f"{kind:10} {expected:13} {r.verdict:13} {r.score:>6.3f} {r.mean:>6.1f} {r.std:>6.1f} {dist:>5}  "
+              f"{','.join(r.reasons)}{mark}")
+
+    for case in triage_cases():
+        result = run_case(case, min_time=args.min_time)
+        print(f"{case.name:24} {result.us_per_call:>10.1f} us/call")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -34,6 +34,7 @@ echo "Dependencies installed"
 
 # Step 5: Copy .service files to /etc/systemd/system/
 SERVICE_DIR="/etc/systemd/system"
+sudo cp ./systemd/cubesat-i2c.service $SERVICE_DIR/
 sudo cp ./systemd/cubesat-adcs.service $SERVICE_DIR/
 sudo cp ./systemd/cubesat-obc.service $SERVICE_DIR/
 sudo cp ./systemd/cubesat-eps.service $SERVICE_DIR/
@@ -46,7 +47,7 @@ sudo sed -i "s/%i/$CURRENT_USER/g" $SERVICE_DIR/cubesat-*.service
 
 # Step 6: Reload systemd and start/enable services
 sudo systemctl daemon-reload
-for service in cubesat-obc cubesat-eps cubesat-adcs cubesat-payload cubesat-telemetry; do
+for service in cubesat-i2c cubesat-obc cubesat-eps cubesat-adcs cubesat-payload cubesat-telemetry; do
     sudo systemctl enable $service.service
     sudo systemctl start $service.service
     sudo systemctl status $service.service --no-pager
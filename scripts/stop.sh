@@ -3,6 +3,7 @@
 set -euo pipefail
 
 SERVICES=(
+    "cubesat-i2c.service"
     "cubesat-adcs.service"
     "cubesat-obc.service"
     "cubesat-eps.service"
@@ -1,26 +1,51 @@
 import logging
-from src.common import setup_logging
-
-setup_logging(
-    log_level = "INFO",
-    log_file  = "adcs.log",
-    console   = True
-)
-
 import time
-import json
-from src.common import get_mqtt_client
+from src.common.startup import timeline, announce, first_publish, BackgroundInit
+from src.common.config_manager import config_manager
+from src.common import setup_logging, get_mqtt_client, codec
 from src.common.config import TOPICS, MQTT_BROKER, MQTT_PORT, MQTT_KEEPALIVE
-from src.common.imu_qmi8658_ak09918 import IMU
+from src.common.rate_policy import RatePolicy
+from src.common.publish_filter import PublishFilter
+from src.common.anomaly import AnomalyDetector
 
-logger = logging.getLogger(__name__)
+logger = logging.getLogger("src.adcs.main")  # run as -m, where __name__ is "__main__"
 
 class ADCS:
     def __init__(self):
         self.mqtt_client = get_mqtt_client("cubesat-adcs")
+        self.mqtt_client.on_connect = self.on_mqtt_connect
+        self.mqtt_client.on_message = self.on_mqtt_message
+
+        self.rate_policy = RatePolicy("adcs")
+        self.publish_filter = PublishFilter("adcs_status")
+        self.anomaly = AnomalyDetector("adcs", self.rate_policy, client=self.mqtt_client)
+        # IMU setup + gyro calibration take ~1.5 s: done in the background after MQTT is up
+        self.imu = None
+        self.hardware = BackgroundInit("adcs-imu", self._init_hardware)
+
+    def _init_hardware(self):
+        from src.common.imu_qmi8658_ak09918 import IMU
         self.imu = IMU()
         logger.info("ADCS subsystem initialized")
 
+    def on_mqtt_connect(self, client, userdata, flags, rc, properties=None):
+        if rc != 0:
+            logger.error(f"MQTT connection error → rc = {rc}")
+            return
+
+        logger.info(f"MQTT connected (rc={rc}, client_id={client._client_id.decode()})")
+        client.subscribe(TOPICS["obc_status"], qos=1)
+        timeline.mark("mqtt_connected")
+        announce(client, "adcs", "alive")
+        config_manager.attach(client, "adcs")
+
+    def on_mqtt_message(self, client, userdata, msg):
+        try:
+            if msg.topic == TOPICS["obc_status"]:
+                self.rate_policy.on_obc_status(codec.decode(msg))
+        except Exception as e:
+            logger.error(f"Error processing message {msg.topic}: {e}")
+
     def publish_status(self):
         try:
             ori = self.imu.get_orientation_deg()
@@ -36,30 +61,54 @@ class ADCS:
                 "gyro_dps": ori["gyro_dps"]
             }
 
-            self.mqtt_client.publish(
-                TOPICS["adcs_status"],
-                json.dumps(packet),
+            burst = self.anomaly.process(packet)
+            if not self.publish_filter.should_publish(packet, force=burst):
+                return
+
+            codec.publish(
+                self.mqtt_client,
+                "adcs_status",
+                packet,
                 qos=1
             )
+            first_publish(self.mqtt_client, "adcs")
+            if self.publish_filter.reason == "heartbeat":
+                logger.info(f"ADCS publish filter: {self.publish_filter.stats()}")
         except Exception as e:
             logger.error(f"Error reading/publishing ADCS: {e}")
 
     def run(self):
         self.mqtt_client.connect(MQTT_BROKER, MQTT_PORT, keepalive=MQTT_KEEPALIVE)
         self.mqtt_client.loop_start()
+        config_manager.start()
+        self.hardware.start()
 
         try:
+            self.hardware.wait()
             while True:
                 self.publish_status()
-                time.sleep(0.5)  # 2 Hz update rate
+                self.rate_policy.wait()  # 2 Hz in NOMINAL (20 Hz during an anomaly burst)
         except KeyboardInterrupt:
             logger.info("ADCS stopped")
         except Exception as e:
             logger.exception("Critical error in main ADCS loop")
         finally:
+            config_manager.stop()
+            self.hardware.stop()
             self.mqtt_client.loop_stop()
             self.mqtt_client.disconnect()
 
-if __name__ == "__main__":
+def main():
+    timeline.mark("imports")
+    setup_logging(
+        log_level = "INFO",
+        log_file  = "adcs.log",
+        console   = True
+    )
+    timeline.mark("logging")
     adcs = ADCS()
-    adcs.run()
\ No newline at end of file
+    timeline.mark("constructed")
+    adcs.run()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
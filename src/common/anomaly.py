@@ -0,0 +1,283 @@
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from src.common import codec
+from src.common.config import ANOMALY_RULES
+from src.common.config_manager import config_manager
+
+logger = logging.getLogger(__name__)
+
+
+class FieldStats:
+    """
+    O(1) online statistics of one numeric field.
+
+    level is an EWMA of the value. Welford's algorithm accumulates the mean
+    and variance of the residual (value - level before the update), so the
+    noise estimate stays valid while the value drifts slowly (battery
+    discharge, orbital temperature cycle). rate is the change per second
+    since the previous sample.
+    """
+    __slots__ = ("count", "level", "_mean", "_m2", "last", "last_t", "rate")
+
+    def __init__(self):
+        self.count = 0
+        self.level: Optional[float] = None
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.last: Optional[float] = None
+        self.last_t: Optional[float] = None
+        self.rate: Optional[float] = None
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def deviation(self, value: float) -> float:
+        """Distance of the residual from its usual value (an EWMA lags a drift by a steady offset)."""
+        return 0.0 if self.level is None else abs(value - self.level - self._mean)
+
+    def update(self, value: float, t: float, alpha: float, learn: bool = True):
+        """learn=False leaves the noise estimate alone (anomalous samples must not widen it)."""
+        if self.last_t is not None and t > self.last_t:
+            self.rate = (value - self.last) / (t - self.last_t)
+        if self.level is None:
+            self.level = value
+        else:
+            if learn:
+                r = value - self.level
+                self.count += 1
+                delta = r - self._mean
+                self._mean += delta / self.count
+                self._m2 += delta * (r - self._mean)
+            self.level += alpha * (value - self.level)
+        self.last, self.last_t = value, t
+
+    def snapshot(self) -> Dict:
+        return {"level": self.level, "std": round(self.std, 6), "rate": self.rate, "count": self.count}
+
+
+def _field_value(sample: Dict, path: str) -> Optional[float]:
+    """Dotted path into the sample; a dict of numbers counts as a vector (its magnitude)."""
+    value = sample
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    if isinstance(value, dict):
+        parts = [v for v in value.values() if isinstance(v, (int, float)) and not isinstance(v, bool)]
+        return math.sqrt(sum(v * v for v in parts)) if parts else None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return None
+
+
+class AnomalyDetector:
+    """
+    Streaming anomaly detection for one producer, with event-triggered
+    high-rate capture.
+
+    observe() feeds a sample; every field configured in
+    anomaly.services.<service>.fields is checked against its limits:
+
+        z     |residual - mean residual| / std of the residuals, where the
+              residual is value - level (after warmup_samples)
+        rate  |change per second| since the previous sample
+        min / max  hard limits
+
+    The first anomaly starts a burst: the service's RatePolicy switches to
+    burst_interval_sec for burst_sec, and cubesat/anomaly gets a "start"
+    event. Further anomalies extend the burst up to max_burst_sec in total;
+    when it runs out an "end" event follows, with the burst's counts.
+    Packets published during a burst carry tag() output, so the ground can
+    tell high-rate event data from routine samples. No bursts start in
+    blocked_states (the events are still reported).
+
+    A producer calls process() once per packet: observe, then tag during a
+    burst; it returns whether the packet must bypass the publish filter.
+    Events go to on_event, or are published on TOPICS["anomaly_event"]
+    through client.
+
+    Rules follow live edits of the anomaly section in config.yaml.
+    """
+
+    def __init__(self, service: str, rate_policy=None, on_event: Callable[[Dict], None] = None,
+                 rules: Dict = None, client=None):
+        self.service = service
+        self.rate_policy = rate_policy
+        self.on_event = on_event
+        self.client = client
+        self._lock = threading.Lock()
+        self._stats: Dict[str, FieldStats] = {}
+        self._apply_rules(ANOMALY_RULES if rules is None else rules)
+        if rules is None:
+            config_manager.subscribe("anomaly", self._apply_rules)
+
+        self.bursts = 0
+        self.anomalies = 0
+        self._burst_id: Optional[str] = None
+        self._burst_started: Optional[float] = None
+        self._burst_until: Optional[float] = None
+        self._burst_trigger: Optional[str] = None
+        self._burst_samples = 0
+        self._burst_anomalies = 0
+        self._flagged: List[str] = []   # fields flagged since the last tag()
+        self._suppressed_at: Optional[float] = None
+
+    def _apply_rules(self, rules: Dict):
+        cfg = rules.get("services", {}).get(self.service, {})
+        with self._lock:
+            self.fields: Dict[str, Dict[str, float]] = dict(cfg.get("fields", {}))
+            self.burst_sec = float(cfg.get("burst_sec", 60))
+            self.max_burst_sec = float(cfg.get("max_burst_sec", 3 * self.burst_sec))
+            self.burst_interval_sec = cfg.get("burst_interval_sec")
+            self.warmup = int(rules.get("warmup_samples", 30))
+            self.alpha = float(rules.get("ewma_alpha", 0.05))
+            self.blocked_states = set(rules.get("blocked_states", ()))
+            for path in self.fields:
+                self._stats.setdefault(path, FieldStats())
+
+    def _check(self, path: str, limits: Dict[str, float], stats: FieldStats, value: float, t: float) -> Optional[Dict]:
+        if "max" in limits and value > limits["max"]:
+            return {"kind": "max", "limit": limits["max"]}
+        if "min" in limits and value < limits["min"]:
+            return {"kind": "min", "limit": limits["min"]}
+        if "rate" in limits and stats.last_t is not None and t > stats.last_t:
+            rate = (value - stats.last) / (t - stats.last_t)
+            if abs(rate) > limits["rate"]:
+                return {"kind": "rate", "limit": limits["rate"], "rate": round(rate, 6)}
+        if "z" in limits and stats.count >= self.warmup:
+            deviation = stats.deviation(value)
+            sigma = max(stats.std, limits.get("min_std", 0.0))
+            if deviation > limits["z"] * sigma:   # sigma 0 (a constant signal): any deviation
+                return {"kind": "z", "limit": limits["z"], "z": round(deviation / sigma, 2) if sigma else None}
+        return None
+
+    def observe(self, sample: Dict, t: float = None) -> List[Dict]:
+        """Updates every configured field; returns this sample's anomalies (usually none)."""
+        t = time.monotonic() if t is None else t
+        found = []
+        with self._lock:
+            for path, limits in self.fields.items():
+                value = _field_value(sample, path)
+                if value is None:
+                    continue
+                stats = self._stats[path]
+                hit = self._check(path, limits, stats, value, t)
+                if hit is not None:
+                    hit.update({"field": path, "value": value, "level": stats.level, "std": round(stats.std, 6)})
+                    found.append(hit)
+                stats.update(value, t, self.alpha, learn=hit is None)
+            if self._burst_id is not None:
+                self._burst_samples += 1
+            if found:
+                self.anomalies += len(found)
+                self._flagged.extend(a["field"] for a in found if a["field"] not in self._flagged)
+        if found:
+            self._on_anomalies(found, t)
+        return found
+
+    def _on_anomalies(self, found: List[Dict], t: float):
+        state = self.rate_policy.state if self.rate_policy is not None else None
+        event = None
+        with self._lock:
+            if self._burst_id is not None:
+                self._burst_anomalies += len(found)
+                self._burst_until = min(self._burst_started + self.max_burst_sec, t + self.burst_sec)
+                until = self._burst_until
+            elif state in self.blocked_states or self.burst_interval_sec is None:
+                until = None
+                # Reported, at most once per burst_sec: a blocked state must not turn into an event flood
+                if self._suppressed_at is None or t - self._suppressed_at >= self.burst_sec:
+                    self._suppressed_at = t
+                    event = {"timestamp": time.time(), "service": self.service, "phase": "suppressed",
+                             "state": state, "anomalies": found}
+            else:
+                self.bursts += 1
+                self._burst_id = f"{self.service}-{int(time.time())}-{self.bursts}"
+                self._burst_started, self._burst_until = t, t + self.burst_sec
+                self._burst_trigger = found[0]["field"]
+                self._burst_samples, self._burst_anomalies = 1, len(found)
+                until = self._burst_until
+                event = self._event("start", anomalies=found)
+        if self.rate_policy is not None and until is not None:
+            self.rate_policy.burst(self.burst_interval_sec, until)
+        if event is not None:
+            logger.warning(f"[{self.service}] anomaly {event['phase']}: "
+                           + ", ".join(f"{a['field']} {a['kind']} ({a['value']:g})" for a in found))
+            self._emit(event)
+
+    def _event(self, phase: str, **extra) -> Dict:
+        # Caller holds the lock
+        event = {
+            "timestamp": time.time(),
+            "service": self.service,
+            "phase": phase,
+            "burst": self._burst_id,
+            "trigger": self._burst_trigger,
+            "burst_interval_sec": self.burst_interval_sec,
+            "remaining_sec": round(max(0.0, self._burst_until - time.monotonic()), 1),
+        }
+        event.update(extra)
+        return event
+
+    def _emit(self, event: Dict):
+        try:
+            if self.on_event is not None:
+                self.on_event(event)
+            elif self.client is not None:
+                codec.publish(self.client, "anomaly_event", event, qos=1)
+        except Exception as e:
+            logger.error(f"[{self.service}] anomaly event handler failed: {e}")
+
+    def process(self, packet: Dict, observe: bool = True, burst_extra: Callable[[], Dict] = None) -> bool:
+        """
+        One producer tick: observes the packet (unless the service feeds
+        observe() itself) and, during a burst, adds burst_extra() and tags
+        it. Returns True during a burst: publish it whatever the filter says.
+        """
+        if observe:
+            self.observe(packet)
+        if not self.in_burst():
+            return False
+        if burst_extra is not None:
+            packet.update(burst_extra())
+        self.tag(packet)
+        return True
+
+    def in_burst(self, t: float = None) -> bool:
+        """True while a burst runs; ends an expired burst (and emits its "end" event)."""
+        t = time.monotonic() if t is None else t
+        with self._lock:
+            if self._burst_id is None:
+                return False
+            if t < self._burst_until:
+                return True
+            event = self._event("end", duration_sec=round(t - self._burst_started, 1),
+                                samples=self._burst_samples, anomalies=self._burst_anomalies)
+            self._burst_id = None
+        logger.info(f"[{self.service}] burst {event['burst']} ended after {event['duration_sec']}s, "
+                    f"{event['samples']} samples, {event['anomalies']} anomalies")
+        self._emit(event)
+        return False
+
+    def tag(self, packet: Dict) -> Dict:
+        """Adds "anomaly" (burst id, trigger, fields flagged since the last tag) to a packet sent during a burst."""
+        if not self.in_burst():
+            return packet
+        with self._lock:
+            packet["anomaly"] = {"burst": self._burst_id, "trigger": self._burst_trigger, "flagged": self._flagged}
+            self._flagged = []
+        return packet
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "bursts": self.bursts,
+                "anomalies": self.anomalies,
+                "in_burst": self._burst_id,
+                "fields": {path: s.snapshot() for path, s in self._stats.items() if path in self.fields},
+            }
@@ -0,0 +1,270 @@
+import json
+import math
+import struct
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from paho.mqtt.properties import Properties
+from paho.mqtt.packettypes import PacketTypes
+
+from src.common.config import TOPICS, TOPIC_CODECS
+from src.common.config_manager import config_manager
+
+logger = logging.getLogger(__name__)
+
+JSON_CONTENT_TYPE    = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+STRUCT_CONTENT_TYPE  = "application/x-cubesat-struct"
+
+
+class Codec:
+    """Encodes a message dict to bytes and back. content_type travels in the MQTTv5 properties."""
+    name = ""
+    content_type = ""
+
+    def encode(self, obj: Dict) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: bytes) -> Dict:
+        raise NotImplementedError
+
+
+class JsonCodec(Codec):
+    name = "json"
+    content_type = JSON_CONTENT_TYPE
+
+    def __init__(self):
+        # Compact separators: same JSON for consumers, ~10 % fewer bytes
+        self._encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+    def encode(self, obj: Dict) -> bytes:
+        return self._encoder.encode(obj).encode("utf-8")
+
+    def decode(self, data: bytes) -> Dict:
+        return json.loads(data)
+
+
+class MsgPackCodec(Codec):
+    """MessagePack via the optional `msgpack` package."""
+    name = "msgpack"
+    content_type = MSGPACK_CONTENT_TYPE
+
+    def __init__(self):
+        import msgpack
+        self._packb = msgpack.packb
+        self._unpackb = msgpack.unpackb
+
+    def encode(self, obj: Dict) -> bytes:
+        return self._packb(obj, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Dict:
+        return self._unpackb(data, raw=False)
+
+
+# Fixed-schema layouts: (dotted path, struct format, fixed-point scale).
+# "i" fields are int32 fixed-point (value * scale) so decoded values match the
+# rounded originals exactly; "d" is float64; "b" is a bool. None travels as a sentinel.
+STRUCT_SCHEMAS: Dict[str, List[Tuple[str, str, Optional[int]]]] = {
+    "eps_status": [
+        ("timestamp",      "d", None),
+        ("battery",        "i", 100),
+        ("voltage",        "i", 1000),
+        ("external_power", "b", None),
+        ("discharge_rate_pct_h", "i", 100),
+        ("voltage_trend_v_h",    "i", 1000),
+        ("time_to_empty_sec",    "i", 1),
+    ],
+    "adcs_status": [
+        ("timestamp",  "d", None),
+        ("roll",       "i", 100),
+        ("pitch",      "i", 100),
+        ("yaw",        "i", 100),
+        ("imu_temp",   "i", 100),
+        ("accel_g.x",  "i", 100),
+        ("accel_g.y",  "i", 100),
+        ("accel_g.z",  "i", 100),
+        ("gyro_dps.x", "i", 100),
+        ("gyro_dps.y", "i", 100),
+        ("gyro_dps.z", "i", 100),
+    ],
+    "payload_data": [
+        ("timestamp",   "d", None),
+        ("temperature", "i", 100),
+        ("pressure",    "i", 100),
+        ("humidity",    "i", 100),
+    ],
+}
+
+
+_INT_NONE = -2 ** 31
+
+
+class StructCodec(Codec):
+    """
+    struct-packed encoding for a fixed-schema topic (an ADCS packet is 48 bytes
+    instead of ~160 of JSON). Messages whose fields do not match the schema
+    exactly, or whose values overflow it, are sent as JSON instead, so schema
+    drift never loses data.
+    """
+    name = "struct"
+
+    def __init__(self, schema_name: str):
+        fields = STRUCT_SCHEMAS[schema_name]
+        self.schema_name = schema_name
+        self.content_type = f"{STRUCT_CONTENT_TYPE};schema={schema_name}"
+        self._struct = struct.Struct("<" + "".join(fmt for _, fmt, _ in fields))
+        # Pre-split paths and the expected key layout so encode/decode do no string work
+        self._fields = [(tuple(path.split(".")), fmt, scale) for path, fmt, scale in fields]
+        self._shape: Dict[str, Optional[set]] = {}
+        for keys, _, _ in self._fields:
+            if len(keys) == 1:
+                self._shape[keys[0]] = None
+            else:
+                self._shape.setdefault(keys[0], set()).add(keys[1])
+
+    def matches(self, obj: Dict) -> bool:
+        if obj.keys() != self._shape.keys():
+            return False
+        for key, subkeys in self._shape.items():
+            value = obj[key]
+            if subkeys is None:
+                if isinstance(value, dict):
+                    return False
+            elif not isinstance(value, dict) or value.keys() != subkeys:
+                return False
+        return True
+
+    def encode(self, obj: Dict) -> bytes:
+        values = []
+        for keys, fmt, scale in self._fields:
+            value = obj[keys[0]] if len(keys) == 1 else obj[keys[0]][keys[1]]
+            if fmt == "i":
+                values.append(_INT_NONE if value is None else round(value * scale))
+            elif fmt == "b":
+                values.append(-1 if value is None else int(bool(value)))
+            else:
+                values.append(math.nan if value is None else float(value))
+        return self._struct.pack(*values)
+
+    def decode(self, data: bytes) -> Dict:
+        result: Dict[str, Any] = {}
+        for (keys, fmt, scale), value in zip(self._fields, self._struct.unpack(data)):
+            if fmt == "i":
+                value = None if value == _INT_NONE else value / scale
+            elif fmt == "b":
+                value = None if value < 0 else bool(value)
+            elif value != value:  # NaN
+                value = None
+            if len(keys) == 1:
+                result[keys[0]] = value
+            else:
+                result.setdefault(keys[0], {})[keys[1]] = value
+        return result
+
+
+_json_codec = JsonCodec()
+_codecs_by_content_type: Dict[str, Codec] = {JSON_CONTENT_TYPE: _json_codec}
+_codecs_by_topic: Dict[str, Codec] = {}
+_topic_codecs: Dict[str, str] = dict(TOPIC_CODECS)
+
+
+def _on_codecs_config(topic_codecs: Dict[str, str]):
+    """Live edit of the codecs section: later publishes use the new codec, receivers follow ContentType."""
+    global _topic_codecs
+    _topic_codecs = dict(topic_codecs)
+    _codecs_by_topic.clear()
+    logger.info(f"Topic codecs reloaded: {_topic_codecs}")
+
+
+config_manager.subscribe("codecs", _on_codecs_config)
+_topic_keys: Dict[str, str] = {topic: key for key, topic in TOPICS.items()}
+
+
+def _register(codec: Codec) -> Codec:
+    _codecs_by_content_type.setdefault(codec.content_type, codec)
+    return codec
+
+
+def _build_codec(topic_key: str, name: str) -> Codec:
+    try:
+        if name == "msgpack":
+            return _register(MsgPackCodec())
+        if name == "struct":
+            return _register(StructCodec(topic_key))
+    except ImportError:
+        logger.warning(f"Codec '{name}' for {topic_key} needs the msgpack package; falling back to JSON")
+        return _json_codec
+    except KeyError:
+        logger.warning(f"No struct schema for {topic_key}; falling back to JSON")
+        return _json_codec
+    if name != "json":
+        logger.warning(f"Unknown codec '{name}' for {topic_key}; using JSON")
+    return _json_codec
+
+
+def codec_for(topic_key: str) -> Codec:
+    """Codec configured for a TOPICS key (config: codecs.<topic_key>, default json)."""
+    codec = _codecs_by_topic.get(topic_key)
+    if codec is None:
+        codec = _build_codec(topic_key, _topic_codecs.get(topic_key, "json"))
+        _codecs_by_topic[topic_key] = codec
+    return codec
+
+
+def _codec_for_content_type(content_type: Optional[str]) -> Codec:
+    if not content_type:
+        return _json_codec
+    codec = _codecs_by_content_type.get(content_type)
+    if codec is not None:
+        return codec
+    # Producer uses a codec this process has not needed yet (mixed fleet)
+    if content_type == MSGPACK_CONTENT_TYPE:
+        return _register(MsgPackCodec())
+    if content_type.startswith(STRUCT_CONTENT_TYPE + ";schema="):
+        return _register(StructCodec(content_type.split("=", 1)[1]))
+    logger.warning(f"Unknown content type '{content_type}'; trying JSON")
+    return _json_codec
+
+
+def encode(topic_key: str, obj: Dict, json_payload: bytes = None) -> Tuple[bytes, Properties]:
+    """
+    Encodes obj with the topic's codec. Returns (payload, MQTTv5 PUBLISH properties).
+    json_payload: obj already encoded as JSON, used as is when the topic's codec is JSON.
+    """
+    codec = codec_for(topic_key)
+    payload = json_payload if codec is _json_codec else None
+    if isinstance(codec, StructCodec):
+        try:
+            if codec.matches(obj):
+                payload = codec.encode(obj)
+        except (struct.error, TypeError, ValueError):
+            pass
+        if payload is None:
+            codec = _json_codec
+    if payload is None:
+        payload = codec.encode(obj)
+    props = Properties(PacketTypes.PUBLISH)
+    props.ContentType = codec.content_type
+    return payload, props
+
+
+def decode(msg) -> Dict:
+    """Decodes a received paho message using its ContentType property (JSON when absent)."""
+    props = getattr(msg, "properties", None)
+    content_type = getattr(props, "ContentType", None) if props is not None else None
+    try:
+        codec = _codec_for_content_type(content_type)
+    except KeyError as e:
+        raise ValueError(f"No struct schema {e} for message on {msg.topic}") from None
+    return codec.decode(msg.payload)
+
+
+def publish(client, topic_key: str, obj: Dict, qos: int = 0, retain: bool = False, json_payload: bytes = None):
+    """Encodes and publishes obj on TOPICS[topic_key]."""
+    payload, props = encode(topic_key, obj, json_payload)
+    return client.publish(TOPICS[topic_key], payload, qos=qos, retain=retain, properties=props)
+
+
+def topic_key(topic: str) -> Optional[str]:
+    """Reverse lookup: MQTT topic string → TOPICS key."""
+    return _topic_keys.get(topic)
@@ -0,0 +1,257 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple
+
+from src.common import codec
+from src.common.config import (
+    COMMAND_QUEUE_SIZE, COMMAND_TIMEOUT_SEC, COMMAND_TIMEOUTS, COMMAND_PRIORITIES,
+    COMMAND_CONCURRENCY, COMMAND_DEFAULT_PRIORITY
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(order=True)
+class CommandJob:
+    priority: int
+    seq: int
+    command: str = field(compare=False)
+    fn: Callable = field(compare=False)
+    args: Tuple = field(compare=False, default=())
+    request_id: Optional[str] = field(compare=False, default=None)
+    timeout: float = field(compare=False, default=COMMAND_TIMEOUT_SEC)
+    on_timeout: Optional[Callable] = field(compare=False, default=None)
+    on_reject: Optional[Callable] = field(compare=False, default=None)
+    submitted: float = field(compare=False, default=0.0)
+    started: Optional[float] = field(compare=False, default=None)
+    timed_out: bool = field(compare=False, default=False)
+
+
+def build_ack(command: str, request_id: Optional[str], status: str, reason: str = None) -> Dict:
+    """Payload for TOPICS["command_ack"]: ACCEPTED / REJECTED / TIMEOUT / FAILED."""
+    ack = {
+        "timestamp": time.time(),
+        "command": command,
+        "request_id": request_id,
+        "status": status,
+    }
+    if reason:
+        ack["reason"] = reason
+    return ack
+
+
+class CommandAcks:
+    """
+    on_timeout / on_reject callbacks shared by the services: each publishes a
+    TIMEOUT / REJECTED ack on TOPICS["command_ack"] through self.mqtt_client.
+    A service that also answers on its own topic overrides them and calls super().
+    """
+
+    def _publish_ack(self, job, status, reason):
+        codec.publish(
+            self.mqtt_client,
+            "command_ack",
+            build_ack(job.command, job.request_id, status, reason),
+            qos=1
+        )
+
+    def _on_command_reject(self, job, reason):
+        self._publish_ack(job, "REJECTED", reason)
+
+    def _on_command_timeout(self, job, reason):
+        self._publish_ack(job, "TIMEOUT", reason)
+
+
+class CommandExecutor:
+    """
+    Bounded, prioritised worker pool for commands received over MQTT.
+
+    MQTT callbacks only parse the message and call submit(); handlers run on
+    worker threads so paho's network loop (keepalives, acks, other topics)
+    never waits on a slow command.
+
+    - Lower priority value runs first (config: commands.priorities).
+    - Per-command concurrency limits keep slow commands (take_photo) from
+      occupying every worker; a held-back command does not block others.
+    - When the queue is full, a new command evicts the lowest-priority queued
+      one if it outranks it, otherwise it is rejected. on_reject is called for
+      whichever job lost, so the service can publish a backpressure response.
+    - A job that waited in the queue longer than its timeout is not started;
+      a job that runs longer than its timeout is reported via on_timeout and
+      marked timed_out, which the handler can check through current_job()
+      before it publishes a result nobody waits for any more.
+    """
+
+    def __init__(self, name: str, workers: int = 1, max_queue: int = COMMAND_QUEUE_SIZE):
+        self.name = name
+        self.max_queue = max_queue
+
+        self._queue = []
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._running: Dict[str, int] = defaultdict(int)
+        self._active: Dict[int, CommandJob] = {}
+        self._local = threading.local()
+        self._stopping = False
+
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "timed_out": 0}
+
+        self._workers = [
+            threading.Thread(target=self._worker_loop, name=f"{name}-cmd-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for t in self._workers:
+            t.start()
+
+        self._watchdog = threading.Thread(target=self._watchdog_loop, name=f"{name}-cmd-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def submit(self, command: str, fn: Callable, *args, request_id: str = None,
+               priority: int = None, timeout: float = None,
+               on_timeout: Callable = None, on_reject: Callable = None) -> bool:
+        """
+        Queues fn(*args) for execution. Returns False if the command was rejected.
+        on_timeout(job, reason) and on_reject(job, reason) are called from executor threads.
+        """
+        job = CommandJob(
+            priority=COMMAND_PRIORITIES.get(command, COMMAND_DEFAULT_PRIORITY) if priority is None else priority,
+            seq=next(self._seq),
+            command=command,
+            fn=fn,
+            args=args,
+            request_id=request_id,
+            timeout=COMMAND_TIMEOUTS.get(command, COMMAND_TIMEOUT_SEC) if timeout is None else timeout,
+            on_timeout=on_timeout,
+            on_reject=on_reject,
+            submitted=time.monotonic(),
+        )
+
+        rejected = None
+        with self._cond:
+            if self._stopping:
+                rejected = job
+            elif len(self._queue) >= self.max_queue:
+                worst = max(self._queue)
+                if job < worst:
+                    self._queue.remove(worst)
+                    heapq.heapify(self._queue)
+                    heapq.heappush(self._queue, job)
+                    rejected = worst
+                else:
+                    rejected = job
+            else:
+                heapq.heappush(self._queue, job)
+
+            self.stats["submitted"] += 1
+            if rejected is not None:
+                self.stats["rejected"] += 1
+            self._cond.notify()
+
+        if rejected is not None:
+            reason = "executor stopping" if self._stopping else "command queue full"
+            logger.warning(f"[{self.name}] Command '{rejected.command}' rejected: {reason}")
+            self._call(rejected.on_reject, rejected, reason)
+        return rejected is not job
+
+    def current_job(self) -> Optional[CommandJob]:
+        """Job running on the calling worker thread (None outside a handler)."""
+        return getattr(self._local, "job", None)
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def snapshot(self) -> Dict:
+        """Counters plus current queue depth and running commands."""
+        with self._cond:
+            return dict(self.stats, queued=len(self._queue),
+                        running={k: v for k, v in self._running.items() if v})
+
+    def shutdown(self, wait: bool = True, timeout: float = 5.0):
+        """Stops accepting commands; queued commands still run before workers exit."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if wait:
+            deadline = time.monotonic() + timeout
+            for t in self._workers:
+                t.join(timeout=max(0.0, deadline - time.monotonic()))
+
+    # ────────────── Internals ──────────────
+    def _pop_runnable(self) -> Optional[CommandJob]:
+        """Highest-priority queued job whose command is below its concurrency limit."""
+        for job in sorted(self._queue):
+            limit = COMMAND_CONCURRENCY.get(job.command)
+            if limit is None or self._running[job.command] < limit:
+                self._queue.remove(job)
+                heapq.heapify(self._queue)
+                return job
+        return None
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                job = self._pop_runnable()
+                while job is None:
+                    if self._stopping and not self._queue:
+                        return
+                    self._cond.wait()
+                    job = self._pop_runnable()
+                self._running[job.command] += 1
+                job.started = time.monotonic()
+                self._active[job.seq] = job
+
+            outcome = "completed"
+            try:
+                waited = job.started - job.submitted
+                if waited > job.timeout:
+                    job.timed_out = True
+                    outcome = "timed_out"
+                    logger.warning(f"[{self.name}] Command '{job.command}' expired after {waited:.1f}s in queue")
+                    self._call(job.on_timeout, job, f"expired in queue after {waited:.1f}s")
+                else:
+                    self._local.job = job
+                    job.fn(*job.args)
+            except Exception as e:
+                outcome = "failed"
+                logger.exception(f"[{self.name}] Command '{job.command}' failed: {e}")
+            finally:
+                self._local.job = None
+                with self._cond:
+                    self.stats[outcome] += 1
+                    self._running[job.command] -= 1
+                    self._active.pop(job.seq, None)
+                    # A command held back by its concurrency limit may be runnable now
+                    self._cond.notify_all()
+
+            elapsed = time.monotonic() - job.started
+            if job.timed_out and elapsed > job.timeout:
+                logger.warning(f"[{self.name}] Command '{job.command}' finished late ({elapsed:.1f}s)")
+
+    def _watchdog_loop(self):
+        while not (self._stopping and not self._active and not self._queue):
+            time.sleep(0.5)
+            now = time.monotonic()
+            with self._cond:
+                overdue = [j for j in self._active.values()
+                           if not j.timed_out and j.started is not None and now - j.started > j.timeout]
+                for job in overdue:
+                    job.timed_out = True
+                    self.stats["timed_out"] += 1
+            for job in overdue:
+                logger.warning(f"[{self.name}] Command '{job.command}' exceeded {job.timeout:g}s timeout")
+                self._call(job.on_timeout, job, f"exceeded {job.timeout:g}s timeout")
+
+    @staticmethod
+    def _call(callback: Optional[Callable], job: CommandJob, reason: str):
+        if callback is None:
+            return
+        try:
+            callback(job, reason)
+        except Exception as e:
+            logger.error(f"Command callback error for '{job.command}': {e}")
@@ -1,7 +1,7 @@
 import os
 import yaml
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,17 +11,59 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
 # Load config/config.yaml — provides defaults overrideable by environment variables
 _CONFIG_FILE = BASE_DIR / "config" / "config.yaml"
+CONFIG_FILE  = str(_CONFIG_FILE)
+
+class _StrictLoader(yaml.SafeLoader):
+    """SafeLoader that rejects a key repeated in one mapping (PyYAML silently keeps the last)."""
+
+    def construct_mapping(self, node, deep=False):
+        if isinstance(node, yaml.MappingNode):
+            seen = set()
+            for key_node, _ in node.value:
+                if key_node.tag == "tag:yaml.org,2002:merge":
+                    continue  # "<<: *anchor" may be overridden by the keys next to it
+                key = self.construct_object(key_node, deep=deep)
+                if key in seen:
+                    raise yaml.constructor.ConstructorError(
+                        "while constructing a mapping", node.start_mark,
+                        f"found duplicate key {key!r}", key_node.start_mark)
+                seen.add(key)
+        return super().construct_mapping(node, deep=deep)
+
+
+def load_yaml(data) -> dict:
+    """Parses config.yaml (bytes, str or file); a repeated key is a yaml.YAMLError here and on reload."""
+    return yaml.load(data, Loader=_StrictLoader) or {}
 
 def _load_yaml_config() -> dict:
     if _CONFIG_FILE.exists():
         with open(_CONFIG_FILE) as f:
-            return yaml.safe_load(f) or {}
+            return load_yaml(f)
     return {}
 
 _yaml            = _load_yaml_config()
+LOADED_CONFIG    = _yaml   # as parsed at import; src/common/config_manager.py diffs reloads against it
 _mqtt_cfg        = _yaml.get("mqtt", {})
 _telemetry_cfg   = _yaml.get("telemetry", {})
 _camera_cfg      = _yaml.get("camera", {})
+_triage_cfg      = _camera_cfg.get("triage", {}) or {}
+_series_cfg      = _telemetry_cfg.get("series", {}) or {}
+_record_cfg      = _telemetry_cfg.get("record", {}) or {}
+_retention_cfg   = _telemetry_cfg.get("retention", {}) or {}
+_benchmarks_cfg  = _yaml.get("benchmarks", {})
+_commands_cfg    = _yaml.get("commands", {})
+_codecs_cfg      = _yaml.get("codecs", {})
+_intervals_cfg   = _yaml.get("publish_intervals", {})
+_filters_cfg     = _yaml.get("publish_filter", {})
+_eps_cfg         = _yaml.get("eps", {})
+_i2c_cfg         = _yaml.get("i2c", {})
+_metrics_cfg     = _yaml.get("system_metrics", {})
+_obc_cfg         = _yaml.get("obc", {})
+_logging_cfg     = _yaml.get("logging", {})
+_startup_cfg     = _yaml.get("startup", {})
+_watch_cfg       = _yaml.get("config_watch", {})
+_downlink_cfg    = _yaml.get("downlink", {})
+_anomaly_cfg     = _yaml.get("anomaly", {})
 
 # MQTT — environment variables override YAML values
 MQTT_BROKER    = os.getenv("MQTT_BROKER",  _mqtt_cfg.get("broker",    "localhost"))
@@ -33,34 +75,267 @@ TOPICS: Dict[str, str] = {
     # Commands (ground → all services). All commands are routed through this
     # single topic; the "command" field in the payload determines the handler.
     "command":              "cubesat/command",
+    "command_ack":          "cubesat/command/ack",
 
     # Subsystem status
     "obc_status":           "cubesat/obc/status",
+    "obc_journal":          "cubesat/obc/journal",
+    "obc_schedule":         "cubesat/obc/schedule",
     "eps_status":           "cubesat/eps/status",
+    "eps_power_event":      "cubesat/eps/power_event",
+    "i2c_status":           "cubesat/i2c/status",
     "adcs_status":          "cubesat/adcs/status",
     "payload_status":       "cubesat/payload/status",
     "payload_data":         "cubesat/payload/data",
     "payload_photo":        "cubesat/payload/photo",
+    "payload_photo_low":    "cubesat/payload/photo/low",   # photos triage scored as low quality
     "telemetry_data":       "cubesat/telemetry/data",
+    "telemetry_history":    "cubesat/telemetry/history",
+
+    # Live config reload: OBC → all services, then each service's result
+    "config_reload":        "cubesat/config/reload",
+    "config_status":        "cubesat/config/status",
+
+    # Anomaly bursts: start / end / suppressed events from EPS, ADCS, payload
+    "anomaly_event":        "cubesat/anomaly",
+
+    # Downlink scheduler queue depth / throughput per class
+    "downlink_status":      "cubesat/downlink/status",
+
+    # Service lifecycle: "alive" once MQTT is up, "ready" with the start-up timeline
+    "service_startup":      "cubesat/startup",
 }
 
+# Payload codec per TOPICS key (src/common/codec.py): json | msgpack | struct
+def build_topic_codecs(codecs_cfg: dict) -> Dict[str, str]:
+    return {k: str(v) for k, v in (codecs_cfg or {}).items()}
+
+TOPIC_CODECS: Dict[str, str] = build_topic_codecs(_codecs_cfg)
+
+# Publish policy of every service's MQTT client (src/common/mqtt_client.py).
+# Per-topic rules are keyed by topic string; omitted qos / retain keep the caller's flags.
+def build_publish_policy(publish_cfg: dict) -> Dict:
+    cfg = publish_cfg or {}
+    topics = {}
+    for key, rule in (cfg.get("topics") or {}).items():
+        if key not in TOPICS or not isinstance(rule, dict):
+            continue
+        topics[TOPICS[key]] = {
+            **({"qos": int(rule["qos"])} if "qos" in rule else {}),
+            **({"retain": bool(rule["retain"])} if "retain" in rule else {}),
+            **({"max_age_sec": float(rule["max_age_sec"])} if rule.get("max_age_sec") is not None else {}),
+            "coalesce": bool(rule.get("coalesce", False)),
+        }
+    return {
+        "max_inflight":  int(cfg.get("max_inflight",  20)),
+        "offline_queue": int(cfg.get("offline_queue", 500)),
+        "topics":        topics,
+    }
+
+MQTT_PUBLISH_POLICY: Dict = build_publish_policy(_mqtt_cfg.get("publish"))
+
 # Data paths
 DATA_DIR   = BASE_DIR / "data"
 PHOTOS_DIR = DATA_DIR / "photos"
-DB_PATH    = DATA_DIR / "telemetry.db"
+DB_PATH    = BASE_DIR / os.getenv("TELEMETRY_DB_PATH", "data/telemetry.db")
 
 # Camera
 PHOTO_RESOLUTION = tuple(_camera_cfg.get("resolution", [1920, 1080]))
+CAMERA_BACKEND   = os.getenv("CAMERA_BACKEND", _camera_cfg.get("backend", "picamera2"))
+
+# Image triage (src/payload/triage.py)
+TRIAGE_ENABLED             = bool(_triage_cfg.get("enabled",              True))
+TRIAGE_DROP_BELOW          = float(_triage_cfg.get("drop_below",          0.15))
+TRIAGE_DEPRIORITIZE_BELOW  = float(_triage_cfg.get("deprioritize_below",  0.4))
+TRIAGE_TARGET_MEAN         = float(_triage_cfg.get("target_mean",         110))
+TRIAGE_EXPOSURE_TOLERANCE  = float(_triage_cfg.get("exposure_tolerance",  100))
+TRIAGE_CONTRAST_REF        = float(_triage_cfg.get("contrast_ref",        40))
+TRIAGE_DARK_LEVEL          = int(_triage_cfg.get("dark_level",            16))
+TRIAGE_BRIGHT_LEVEL        = int(_triage_cfg.get("bright_level",          240))
+TRIAGE_DUPLICATE_HAMMING   = int(_triage_cfg.get("duplicate_hamming",     6))
+TRIAGE_DUPLICATE_FACTOR    = float(_triage_cfg.get("duplicate_factor",    0.3))
 
 # Telemetry intervals (seconds)
 TELEMETRY_INTERVAL_SEC       = _telemetry_cfg.get("interval_sec",           30)
 LOW_POWER_TELEMETRY_INTERVAL = _telemetry_cfg.get("low_power_interval_sec", 300)
+TELEMETRY_HISTORY_SIZE       = int(_telemetry_cfg.get("history_size",       2880))
+TELEMETRY_HISTORY_MAX_POINTS = int(_telemetry_cfg.get("history_max_points", 1000))
+TELEMETRY_STALE_AFTER_SEC: Dict[str, float] = {
+    name: float(sec) for name, sec in (_telemetry_cfg.get("stale_after_sec") or
+                                       {"obc": 90, "eps": 600, "adcs": 30, "payload": 1200}).items()
+}
+TELEMETRY_STORAGE            = _telemetry_cfg.get("storage", "both")     # rows | series | both
+
+# Compressed time-series blocks (src/telemetry/series.py, src/telemetry/gorilla.py)
+SERIES_BLOCK_POINTS = int(_series_cfg.get("block_points", 720))
+SERIES_BLOCK_SEC    = float(_series_cfg.get("block_sec",  86400))
+SERIES_FLUSH_SEC    = float(_series_cfg.get("flush_sec",  300))
+SERIES_PRECISION: Dict[str, int] = {k: int(v) for k, v in (_series_cfg.get("precision") or {}).items()}
+
+# Every subsystem message into the series blocks as it arrives (src/telemetry/recorder.py)
+TELEMETRY_RECORD_ENABLED   = bool(_record_cfg.get("enabled",   True))
+TELEMETRY_RECORD_BATCH_SEC = float(_record_cfg.get("batch_sec", 1.0))
+TELEMETRY_RECORD_BATCH_MAX = int(_record_cfg.get("batch_max",   500))
+
+
+# Database retention (src/telemetry/retention.py)
+def build_retention_policy(retention_cfg: dict) -> Dict:
+    cfg = retention_cfg or {}
+    pressure = cfg.get("disk_pressure")
+    if pressure is None:
+        pressure = {80: 0.5, 90: 0.25, 95: 0.1}
+    return {
+        "enabled":            bool(cfg.get("enabled", True)),
+        "max_age_days":       float(cfg.get("max_age_days",       90)),
+        "max_db_mb":          float(cfg.get("max_db_mb",          1024)),
+        "check_interval_sec": float(cfg.get("check_interval_sec", 600)),
+        "batch_rows":         int(cfg.get("batch_rows",           500)),
+        "batch_pause_sec":    float(cfg.get("batch_pause_sec",    0.05)),
+        "vacuum_pages":       int(cfg.get("vacuum_pages",         256)),
+        # (disk_percent, share kept), highest threshold first
+        "disk_pressure":      sorted(((float(p), float(f)) for p, f in pressure.items()), reverse=True),
+    }
+
+RETENTION_POLICY: Dict = build_retention_policy(_retention_cfg)
 
 # Remote telemetry API integration — secrets/URLs via environment variables only
 TELEMETRY_API_KEY           = os.getenv("TELEMETRY_API_KEY",           None)
 TELEMETRY_SEND_ENABLED      = int(os.getenv("TELEMETRY_SEND_ENABLED",  0))
-TELEMETRY_SEND_INTERVAL_SEC = int(os.getenv("TELEMETRY_SEND_INTERVAL_SEC", 30))
+TELEMETRY_SEND_INTERVAL_SEC = int(os.getenv("TELEMETRY_SEND_INTERVAL_SEC", TELEMETRY_INTERVAL_SEC))
 TELEMETRY_API_URL           = os.getenv("TELEMETRY_API_URL",           "http://localhost:8080")
+TELEMETRY_REMOTE_CHECK_SEC  = float(os.getenv("TELEMETRY_REMOTE_CHECK_SEC", 60))
+
+# Publish intervals per service and OBC state (src/common/rate_policy.py).
+# None pauses the service loop in that state.
+def _interval(value):
+    return float(value) if value is not None and float(value) > 0 else None
+
+def build_publish_intervals(intervals_cfg: dict, telemetry_cfg: dict) -> Dict[str, Dict[str, float]]:
+    intervals = {
+        service: {state: _interval(value) for state, value in (states or {}).items()}
+        for service, states in (intervals_cfg or {}).items()
+    }
+    telemetry = intervals.setdefault("telemetry", {})
+    send_interval = os.getenv("TELEMETRY_SEND_INTERVAL_SEC", telemetry_cfg.get("interval_sec", 30))
+    telemetry.setdefault("default",   float(send_interval))
+    telemetry.setdefault("LOW_POWER", float(telemetry_cfg.get("low_power_interval_sec", 300)))
+    return intervals
+
+PUBLISH_INTERVALS: Dict[str, Dict[str, float]] = build_publish_intervals(_intervals_cfg, _telemetry_cfg)
+
+# OBC state journal (src/obc/journal.py)
+OBC_JOURNAL_PATH               = str(BASE_DIR / os.getenv("OBC_JOURNAL_PATH", _obc_cfg.get("journal_path", "data/obc_journal.jsonl")))
+OBC_JOURNAL_FSYNC_INTERVAL_SEC = float(_obc_cfg.get("journal_fsync_interval_sec", 5.0))
+OBC_JOURNAL_SYNC_STATES: List[str] = _obc_cfg.get("journal_sync_states") or ["SAFE", "LOW_POWER"]
+OBC_JOURNAL_MAX_ENTRIES        = int(_obc_cfg.get("journal_max_entries", 10000))
+
+# OBC time-tagged command scheduler (src/obc/scheduler.py)
+OBC_SCHEDULE_PATH                  = str(BASE_DIR / os.getenv("OBC_SCHEDULE_PATH", _obc_cfg.get("schedule_path", "data/obc_schedule.json")))
+OBC_SCHEDULE_DEFAULT_STATES: List[str] = _obc_cfg.get("schedule_default_states") or ["NOMINAL", "SCIENCE"]
+OBC_SCHEDULE_DEFAULT_EXPIRE_SEC    = float(_obc_cfg.get("schedule_default_expire_sec", 300))
+OBC_SCHEDULE_MAX_ENTRIES           = int(_obc_cfg.get("schedule_max_entries", 256))
+
+# EPS battery sampler (src/eps/sampler.py)
+EPS_SAMPLE_INTERVAL_SEC = float(_eps_cfg.get("sample_interval_sec", 1.0))
+EPS_TREND_WINDOW_SEC    = float(_eps_cfg.get("window_sec",          300))
+EPS_MEDIAN_SAMPLES      = int(_eps_cfg.get("median_samples",        5))
+EPS_SOC_EWMA_ALPHA      = float(_eps_cfg.get("soc_ewma_alpha",      0.2))
+EPS_PLD_DEBOUNCE_MS     = float(_eps_cfg.get("pld_debounce_ms",     50))
+
+# Shared I2C bus access (src/i2c, src/common/i2c_client.py)
+I2C_MODE                = os.getenv("I2C_MODE",    _i2c_cfg.get("mode",    "arbiter"))
+I2C_BACKEND             = os.getenv("I2C_BACKEND", _i2c_cfg.get("backend", "smbus"))
+I2C_BUS_NUMBER          = int(_i2c_cfg.get("bus", 1))
+I2C_SOCKET_PATH         = str(BASE_DIR / os.getenv("I2C_SOCKET_PATH", _i2c_cfg.get("socket_path", "data/i2c.sock")))
+I2C_CLIENT_TIMEOUT_SEC  = float(_i2c_cfg.get("client_timeout_sec", 2.0))
+# The arbiter must give up first, so the client reads an ETIMEDOUT reply instead of hitting its socket timeout
+I2C_QUEUE_TIMEOUT_SEC   = min(float(_i2c_cfg.get("queue_timeout_sec", 1.0)), I2C_CLIENT_TIMEOUT_SEC * 0.75)
+I2C_BATCH_MAX           = int(_i2c_cfg.get("batch_max",            8))
+I2C_PRIORITIES: Dict[str, int] = _i2c_cfg.get("priorities", {}) or {}
+I2C_DEFAULT_PRIORITY    = int(_i2c_cfg.get("default_priority",     5))
+
+# System / per-service metrics (src/common/system_metrics.py)
+METRICS_SERVICES: List[str] = _metrics_cfg.get("services") or ["obc", "eps", "adcs", "payload", "telemetry", "i2c"]
+METRICS_PID_RESCAN_SEC      = float(_metrics_cfg.get("pid_rescan_sec", 300))
+METRICS_THERMAL_ZONE        = _metrics_cfg.get("thermal_zone", "/sys/class/thermal/thermal_zone0/temp")
+
+# Change-driven publishing per TOPICS key (src/common/publish_filter.py)
+def build_publish_filters(filters_cfg: dict) -> Dict[str, dict]:
+    return {
+        topic_key: {
+            "heartbeat_sec": _interval((cfg or {}).get("heartbeat_sec")),
+            "deadbands":     {field: float(v) for field, v in ((cfg or {}).get("deadbands") or {}).items()},
+        }
+        for topic_key, cfg in (filters_cfg or {}).items()
+    }
+
+PUBLISH_FILTERS: Dict[str, dict] = build_publish_filters(_filters_cfg)
+
+# Command execution (src/common/command_executor.py)
+COMMAND_QUEUE_SIZE       = int(_commands_cfg.get("queue_size",  16))
+COMMAND_TIMEOUT_SEC      = float(_commands_cfg.get("timeout_sec", 30))
+COMMAND_WORKERS: Dict[str, int]       = _commands_cfg.get("workers",     {}) or {}
+COMMAND_PRIORITIES: Dict[str, int]    = _commands_cfg.get("priorities",  {}) or {}
+COMMAND_DEFAULT_PRIORITY              = int(_commands_cfg.get("default_priority", 5))
+COMMAND_CONCURRENCY: Dict[str, int]   = _commands_cfg.get("concurrency", {}) or {}
+COMMAND_TIMEOUTS: Dict[str, float]    = _commands_cfg.get("timeouts",    {}) or {}
+
+# Logging pipeline (src/common/logging_setup.py)
+LOG_DIR                = os.getenv("LOG_DIR",    _logging_cfg.get("dir",    "/var/log/cubesat"))
+LOG_FORMAT             = os.getenv("LOG_FORMAT", _logging_cfg.get("format", "text"))
+LOG_MAX_BYTES          = int(_logging_cfg.get("max_bytes",           10 * 1024 * 1024))
+LOG_BACKUP_COUNT       = int(_logging_cfg.get("backup_count",        5))
+LOG_COMPRESS           = bool(_logging_cfg.get("compress",           True))
+LOG_QUEUE_SIZE         = int(_logging_cfg.get("queue_size",          10000))
+LOG_FLUSH_INTERVAL_SEC = float(_logging_cfg.get("flush_interval_sec", 5.0))
+LOG_RATE_LIMITS: Dict[str, dict] = _logging_cfg.get("rate_limits", {}) or {}
+
+# Service start-up (src/common/startup.py, benchmarks/startup.py)
+STARTUP_HW_RETRY_SEC         = float(_startup_cfg.get("hardware_retry_sec",     5.0))
+STARTUP_HW_RETRY_MAX_SEC     = float(_startup_cfg.get("hardware_retry_max_sec", 300.0))
+STARTUP_COLD_START_BUDGET_MS = float(_startup_cfg.get("cold_start_budget_ms",   2000))
+
+# Downlink scheduler (src/telemetry/downlink.py)
+DOWNLINK_ENABLED            = bool(_downlink_cfg.get("enabled", True))
+DOWNLINK_SINK               = os.getenv("DOWNLINK_SINK", _downlink_cfg.get("sink", "radio"))
+DOWNLINK_RATE_BYTES_PER_SEC = float(_downlink_cfg.get("rate_bytes_per_sec", 1200))
+DOWNLINK_BURST_BYTES        = int(_downlink_cfg.get("burst_bytes",          2400))
+DOWNLINK_MTU                = int(_downlink_cfg.get("mtu",                  256))
+DOWNLINK_CLASSES: List[str] = _downlink_cfg.get("classes") or ["health", "ack", "science", "photo", "photo_low"]
+DOWNLINK_TOPIC_CLASSES: Dict[str, str] = _downlink_cfg.get("topics", {}) or {}
+DOWNLINK_QUEUE_BYTES: Dict[str, int]   = {k: int(v) for k, v in (_downlink_cfg.get("queue_bytes") or {}).items()}
+DOWNLINK_PASS_WINDOWS: List[list]      = _downlink_cfg.get("pass_windows") or []
+
+# Streaming anomaly detection and high-rate bursts (src/common/anomaly.py)
+def build_anomaly_rules(anomaly_cfg: dict) -> Dict:
+    services = {}
+    for service, cfg in ((anomaly_cfg or {}).get("services") or {}).items():
+        cfg = cfg or {}
+        burst_interval = cfg.get("burst_interval_sec")
+        services[service] = {
+            "burst_sec":          float(cfg.get("burst_sec", 60)),
+            "max_burst_sec":      float(cfg.get("max_burst_sec", 3 * float(cfg.get("burst_sec", 60)))),
+            "burst_interval_sec": float(burst_interval) if burst_interval is not None else None,
+            "fields": {path: {k: float(v) for k, v in (limits or {}).items()}
+                       for path, limits in (cfg.get("fields") or {}).items()},
+        }
+    return {
+        "warmup_samples": int((anomaly_cfg or {}).get("warmup_samples", 30)),
+        "ewma_alpha":     float((anomaly_cfg or {}).get("ewma_alpha", 0.05)),
+        "blocked_states": list((anomaly_cfg or {}).get("blocked_states") or ["LOW_POWER", "SAFE"]),
+        "services":       services,
+    }
+
+ANOMALY_RULES: Dict = build_anomaly_rules(_anomaly_cfg)
+
+# Live reload of this file (src/common/config_manager.py)
+CONFIG_WATCH_INOTIFY     = bool(_watch_cfg.get("inotify",            True))
+CONFIG_WATCH_POLL_SEC    = float(_watch_cfg.get("poll_interval_sec", 0.5))
+CONFIG_WATCH_DEBOUNCE_MS = float(_watch_cfg.get("debounce_ms",       100))
+
+# Benchmarks (benchmarks/run.py)
+BENCHMARK_REGRESSION_PCT = float(_benchmarks_cfg.get("regression_threshold_pct", 20))
+BENCHMARK_MIN_TIME_SEC   = float(_benchmarks_cfg.get("min_time_sec",             1.0))
 
 def get_config(key: str, default=None):
     """Return a value from environment variables, or default."""
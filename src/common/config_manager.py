@@ -0,0 +1,446 @@
+import ctypes
+import ctypes.util
+import hashlib
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import yaml
+
+from src.common import config
+from src.common.config import (
+    CONFIG_FILE, CONFIG_WATCH_INOTIFY, CONFIG_WATCH_POLL_SEC, CONFIG_WATCH_DEBOUNCE_MS, TOPICS,
+)
+
+logger = logging.getLogger(__name__)
+
+# inotify(7)
+_IN_MODIFY      = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO    = 0x00000080
+_IN_CREATE      = 0x00000100
+_IN_Q_OVERFLOW  = 0x00004000
+_IN_NONBLOCK    = 0o4000
+_IN_CLOEXEC     = 0o2000000
+_EVENT_HEADER   = struct.Struct("iIII")   # wd, mask, cookie, len(name)
+
+_CODEC_NAMES = ("json", "msgpack", "struct")
+
+
+def _section(raw: dict, name: str) -> dict:
+    value = raw.get(name)
+    return value if isinstance(value, dict) else {}
+
+
+# Settings components can follow at runtime: key → typed value from the parsed file.
+# Anything else that changes is reported as restart_required.
+LIVE_SETTINGS: Dict[str, Callable[[dict], Any]] = {
+    "publish_intervals":   lambda raw: config.build_publish_intervals(
+                               _section(raw, "publish_intervals"), _section(raw, "telemetry")),
+    "publish_filter":      lambda raw: config.build_publish_filters(_section(raw, "publish_filter")),
+    "codecs":              lambda raw: config.build_topic_codecs(_section(raw, "codecs")),
+    "camera.resolution":   lambda raw: tuple(_section(raw, "camera").get("resolution", [1920, 1080])),
+    "logging.rate_limits": lambda raw: dict(_section(raw, "logging").get("rate_limits") or {}),
+    "anomaly":             lambda raw: config.build_anomaly_rules(_section(raw, "anomaly")),
+    "telemetry.retention": lambda raw: config.build_retention_policy(_section(raw, "telemetry").get("retention")),
+    "mqtt.publish":        lambda raw: config.build_publish_policy(_section(raw, "mqtt").get("publish")),
+}
+
+# File paths whose changes reach a live setting (telemetry intervals feed publish_intervals.telemetry)
+_LIVE_PATHS = tuple(LIVE_SETTINGS) + ("telemetry.interval_sec", "telemetry.low_power_interval_sec")
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate(raw) -> List[str]:
+    """Problems that make a parsed config.yaml unusable; empty when it can be applied."""
+    if not isinstance(raw, dict):
+        return ["top level must be a mapping"]
+    errors = [f"{name}: must be a mapping" for name, value in raw.items()
+              if value is not None and not isinstance(value, dict)]
+
+    for service, states in _section(raw, "publish_intervals").items():
+        if not isinstance(states, dict):
+            errors.append(f"publish_intervals.{service}: must be a mapping of state → seconds")
+            continue
+        for state, value in states.items():
+            if value is not None and not (_is_number(value) and value >= 0):
+                errors.append(f"publish_intervals.{service}.{state}: {value!r} is not a number >= 0 or null")
+
+    for topic_key, cfg in _section(raw, "publish_filter").items():
+        if not isinstance(cfg, dict):
+            errors.append(f"publish_filter.{topic_key}: must be a mapping")
+            continue
+        heartbeat = cfg.get("heartbeat_sec")
+        if heartbeat is not None and not (_is_number(heartbeat) and heartbeat >= 0):
+            errors.append(f"publish_filter.{topic_key}.heartbeat_sec: {heartbeat!r} is not a number >= 0")
+        for field, value in (cfg.get("deadbands") or {}).items():
+            if not (_is_number(value) and value >= 0):
+                errors.append(f"publish_filter.{topic_key}.deadbands.{field}: {value!r} is not a number >= 0")
+
+    for topic_key, name in _section(raw, "codecs").items():
+        if topic_key not in TOPICS:
+            errors.append(f"codecs.{topic_key}: unknown TOPICS key")
+        if name not in _CODEC_NAMES:
+            errors.append(f"codecs.{topic_key}: {name!r} is not one of {', '.join(_CODEC_NAMES)}")
+
+    resolution = _section(raw, "camera").get("resolution", [1920, 1080])
+    if not (isinstance(resolution, list) and len(resolution) == 2
+            and all(isinstance(v, int) and not isinstance(v, bool) and v > 0 for v in resolution)):
+        errors.append(f"camera.resolution: {resolution!r} is not [width, height]")
+
+    for name in ("interval_sec", "low_power_interval_sec"):
+        value = _section(raw, "telemetry").get(name)
+        if value is not None and not (_is_number(value) and value > 0):
+            errors.append(f"telemetry.{name}: {value!r} is not a number > 0")
+
+    for logger_name, rule in (_section(raw, "logging").get("rate_limits") or {}).items():
+        if not isinstance(rule, dict):
+            errors.append(f"logging.rate_limits.{logger_name}: must be a mapping")
+        elif "sample" in rule:
+            if not (isinstance(rule["sample"], int) and rule["sample"] >= 1):
+                errors.append(f"logging.rate_limits.{logger_name}.sample: must be an integer >= 1")
+        elif not (_is_number(rule.get("rate_per_sec")) and rule["rate_per_sec"] > 0):
+            errors.append(f"logging.rate_limits.{logger_name}: needs rate_per_sec > 0 or sample")
+        elif not (_is_number(rule.get("burst", 1)) and rule.get("burst", 1) >= 1):
+            errors.append(f"logging.rate_limits.{logger_name}.burst: must be >= 1")
+
+    for service, cfg in (_section(raw, "anomaly").get("services") or {}).items():
+        if not isinstance(cfg, dict):
+            errors.append(f"anomaly.services.{service}: must be a mapping")
+            continue
+        for name in ("burst_sec", "max_burst_sec", "burst_interval_sec"):
+            value = cfg.get(name)
+            if value is not None and not (_is_number(value) and value > 0):
+                errors.append(f"anomaly.services.{service}.{name}: {value!r} is not a number > 0")
+        for path, limits in (cfg.get("fields") or {}).items():
+            if not isinstance(limits, dict) or not limits:
+                errors.append(f"anomaly.services.{service}.fields.{path}: needs z, rate, min or max")
+                continue
+            for kind, value in limits.items():
+                if kind not in ("z", "rate", "min", "max", "min_std") or not _is_number(value):
+                    errors.append(f"anomaly.services.{service}.fields.{path}.{kind}: {value!r} is not a valid limit")
+
+    retention = _section(raw, "telemetry").get("retention")
+    if isinstance(retention, dict):
+        for name in ("max_age_days", "max_db_mb", "check_interval_sec", "batch_rows", "vacuum_pages"):
+            value = retention.get(name)
+            if value is not None and not (_is_number(value) and value > 0):
+                errors.append(f"telemetry.retention.{name}: {value!r} is not a number > 0")
+        pressure = retention.get("disk_pressure")
+        if pressure is not None and not isinstance(pressure, dict):
+            errors.append("telemetry.retention.disk_pressure: must be a mapping of disk_percent → share kept")
+        elif pressure:
+            for percent, share in pressure.items():
+                if not (_is_number(percent) and 0 < percent <= 100 and _is_number(share) and 0 < share <= 1):
+                    errors.append(f"telemetry.retention.disk_pressure.{percent}: needs a percent and a share in (0, 1]")
+    elif retention is not None:
+        errors.append("telemetry.retention: must be a mapping")
+
+    publish = _section(raw, "mqtt").get("publish")
+    if isinstance(publish, dict):
+        for name, minimum in (("max_inflight", 1), ("offline_queue", 0)):
+            value = publish.get(name)
+            if value is not None and not (isinstance(value, int) and not isinstance(value, bool) and value >= minimum):
+                errors.append(f"mqtt.publish.{name}: {value!r} is not an integer >= {minimum}")
+        for topic_key, rule in (publish.get("topics") or {}).items():
+            if topic_key not in TOPICS:
+                errors.append(f"mqtt.publish.topics.{topic_key}: unknown TOPICS key")
+            elif not isinstance(rule, dict):
+                errors.append(f"mqtt.publish.topics.{topic_key}: must be a mapping")
+            elif rule.get("qos", 0) not in (0, 1, 2):
+                errors.append(f"mqtt.publish.topics.{topic_key}.qos: {rule['qos']!r} is not 0, 1 or 2")
+            elif rule.get("max_age_sec") is not None and not (_is_number(rule["max_age_sec"]) and rule["max_age_sec"] > 0):
+                errors.append(f"mqtt.publish.topics.{topic_key}.max_age_sec: {rule['max_age_sec']!r} is not a number > 0")
+    elif publish is not None:
+        errors.append("mqtt.publish: must be a mapping")
+
+    if not errors:
+        for key, parse in LIVE_SETTINGS.items():
+            try:
+                parse(raw)
+            except (TypeError, ValueError, AttributeError) as e:
+                errors.append(f"{key}: {e}")
+    return errors
+
+
+def _changed_paths(old, new, prefix: str = "") -> List[str]:
+    """Dotted paths of leaves that differ between two parsed configs."""
+    if isinstance(old, dict) and isinstance(new, dict):
+        paths = []
+        for key in sorted(set(old) | set(new), key=str):
+            paths.extend(_changed_paths(old.get(key), new.get(key), f"{prefix}{key}."))
+        return paths
+    return [] if old == new else [prefix.rstrip(".")]
+
+
+def _is_live(path: str) -> bool:
+    return any(path == live or path.startswith(live + ".") for live in _LIVE_PATHS)
+
+
+class ConfigManager:
+    """
+    Applies edits of config/config.yaml to a running service.
+
+    A watcher thread follows the file with inotify on its directory (so
+    editors that save by rename are seen too), falling back to polling its
+    mtime. A changed file is parsed and validated as a whole: one bad value
+    rejects the reload and the previous settings stay in force. Otherwise
+    each changed LIVE_SETTINGS key is pushed, as a typed value, to the
+    callbacks registered with subscribe(). Changes to other settings are
+    logged and reported as restart_required.
+
+    attach() also listens on TOPICS["config_reload"] (published by the OBC
+    for the reload_config command) and reports every reload on
+    TOPICS["config_status"].
+    """
+
+    def __init__(self, path: str = CONFIG_FILE):
+        self.path = Path(path)
+        self.version = self._version(self._read())
+        self.reloads = 0
+        self.rejected = 0
+        self.last_result: Optional[Dict] = None
+
+        self._raw: dict = config.LOADED_CONFIG
+        self._values: Dict[str, Any] = {}
+        for key, parse in LIVE_SETTINGS.items():
+            try:
+                self._values[key] = parse(self._raw)
+            except (TypeError, ValueError, AttributeError):
+                self._values[key] = None
+        self._subscribers: Dict[str, List[Callable[[Any], None]]] = defaultdict(list)
+        self._lock = threading.RLock()   # one reload at a time; callbacks may subscribe
+
+        self._client = None
+        self._service: Optional[str] = None
+        self._requests: Deque[Optional[str]] = deque()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._inotify_fd: Optional[int] = None
+        self._wake_r: Optional[int] = None
+        self._wake_w: Optional[int] = None
+
+    # ── Subscriptions ──
+    def subscribe(self, key: str, callback: Callable[[Any], None]) -> Any:
+        """Calls callback(value) from the reload thread whenever `key` changes; returns the current value."""
+        if key not in LIVE_SETTINGS:
+            raise KeyError(f"'{key}' is not a live setting")
+        with self._lock:
+            self._subscribers[key].append(callback)
+            return self._values.get(key)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            return self._values.get(key)
+
+    # ── Reload ──
+    def _read(self) -> Optional[bytes]:
+        try:
+            return self.path.read_bytes()
+        except OSError:
+            return None
+
+    @staticmethod
+    def _version(data: Optional[bytes]) -> Optional[str]:
+        return hashlib.sha1(data).hexdigest()[:12] if data is not None else None
+
+    def check(self) -> List[str]:
+        """Validates the file on disk without applying it."""
+        data = self._read()
+        if data is None:
+            return [f"cannot read {self.path}"]
+        try:
+            return validate(config.load_yaml(data))
+        except yaml.YAMLError as e:
+            return [f"YAML: {' '.join(str(e).split())}"]
+
+    def reload(self, source: str = "manual", request_id: str = None) -> Dict:
+        """Re-reads the file and applies it if valid. Returns the result published on config_status."""
+        started = time.monotonic()
+        result = {"timestamp": time.time(), "service": self._service, "source": source,
+                  "request_id": request_id, "status": "unchanged", "version": self.version,
+                  "changed": [], "restart_required": [], "errors": []}
+        with self._lock:
+            data = self._read()
+            version = self._version(data)
+            if data is None:
+                result.update(status="rejected", errors=[f"cannot read {self.path}"])
+            elif version != self.version:
+                try:
+                    raw = config.load_yaml(data)
+                    errors = validate(raw)
+                except yaml.YAMLError as e:
+                    raw, errors = None, [f"YAML: {' '.join(str(e).split())}"]
+                if errors:
+                    result.update(status="rejected", errors=errors)
+                else:
+                    self._apply(raw, version, result)
+
+            result["apply_ms"] = round((time.monotonic() - started) * 1000, 2)
+            self.last_result = result
+            if result["status"] == "rejected":
+                self.rejected += 1
+
+        self._report(result)
+        return result
+
+    def _apply(self, raw: dict, version: str, result: Dict):
+        values = {key: parse(raw) for key, parse in LIVE_SETTINGS.items()}
+        changed = [key for key, value in values.items() if value != self._values.get(key)]
+        restart = [path for path in _changed_paths(self._raw, raw) if not _is_live(path)]
+        self._raw, self._values, self.version = raw, values, version
+        self.reloads += 1
+
+        for key in changed:
+            for callback in list(self._subscribers.get(key, ())):
+                try:
+                    callback(values[key])
+                except Exception as e:
+                    result["errors"].append(f"{key}: {e}")
+                    logger.exception(f"Config subscriber for {key} failed")
+        result.update(status="applied", version=version, changed=changed, restart_required=restart)
+
+    def _report(self, result: Dict):
+        if result["status"] == "rejected":
+            logger.error(f"Config reload rejected ({result['source']}), keeping {self.version}: "
+                         + "; ".join(result["errors"]))
+        elif result["status"] == "applied":
+            logger.info(f"Config {result['version']} applied in {result['apply_ms']} ms "
+                        f"({result['source']}): {', '.join(result['changed']) or 'no live settings changed'}")
+            if result["restart_required"]:
+                logger.warning(f"Config changes that need a service restart: {', '.join(result['restart_required'])}")
+        if self._client is not None and (result["status"] != "unchanged" or result["source"] == "command"):
+            from src.common import codec
+            try:
+                codec.publish(self._client, "config_status", result, qos=1)
+            except Exception as e:
+                logger.warning(f"Could not publish config status: {e}")
+
+    # ── MQTT ──
+    def attach(self, client, service: str):
+        """Call from on_connect: follows reload requests on TOPICS["config_reload"]."""
+        self._client, self._service = client, service
+        client.message_callback_add(TOPICS["config_reload"], self._on_reload_message)
+        client.subscribe(TOPICS["config_reload"], qos=1)
+
+    def _on_reload_message(self, client, userdata, msg):
+        # paho network thread: hand over to the watcher thread
+        from src.common import codec
+        try:
+            request_id = codec.decode(msg).get("request_id")
+        except Exception:
+            request_id = None
+        self.request_reload(request_id)
+
+    def request_reload(self, request_id: str = None):
+        if not self._running:
+            self.reload("command", request_id)
+            return
+        self._requests.append(request_id)
+        os.write(self._wake_w, b"r")
+
+    # ── Watcher thread ──
+    def start(self):
+        if self._running:
+            return
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self._inotify_fd = self._open_inotify() if CONFIG_WATCH_INOTIFY else None
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name="config-watch", daemon=True)
+        self._thread.start()
+        mode = "inotify" if self._inotify_fd is not None else f"polling every {CONFIG_WATCH_POLL_SEC:g} s"
+        logger.info(f"Watching {self.path} ({mode}, version {self.version})")
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        os.write(self._wake_w, b"x")
+        if self._thread:
+            self._thread.join(timeout=2)
+        for fd in (self._inotify_fd, self._wake_r, self._wake_w):
+            if fd is not None:
+                os.close(fd)
+        self._inotify_fd = self._wake_r = self._wake_w = None
+
+    def _open_inotify(self) -> Optional[int]:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+            mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+            if libc.inotify_add_watch(fd, os.fsencode(self.path.parent), mask) < 0:
+                errno = ctypes.get_errno()
+                os.close(fd)
+                raise OSError(errno, f"inotify_add_watch {self.path.parent} failed")
+            return fd
+        except (OSError, AttributeError) as e:
+            logger.warning(f"inotify unavailable ({e}); falling back to polling")
+            return None
+
+    def _inotify_hit(self) -> bool:
+        """Drains pending inotify events; True if any concerned the config file."""
+        name = os.fsencode(self.path.name)
+        hit = False
+        while True:
+            try:
+                data = os.read(self._inotify_fd, 4096)
+            except BlockingIOError:
+                return hit
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                event_name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                hit = hit or event_name == name or bool(mask & _IN_Q_OVERFLOW)
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size, st.st_ino
+        except OSError:
+            return None
+
+    def _loop(self):
+        fds = [self._wake_r] + ([self._inotify_fd] if self._inotify_fd is not None else [])
+        timeout = None if self._inotify_fd is not None else CONFIG_WATCH_POLL_SEC
+        stamp = self._stat()
+        while self._running:
+            try:
+                ready, _, _ = select.select(fds, [], [], timeout)
+                file_changed = False
+                if self._inotify_fd is not None:
+                    file_changed = self._inotify_fd in ready and self._inotify_hit()
+                elif self._stat() != stamp:
+                    file_changed = True
+                if self._wake_r in ready:
+                    os.read(self._wake_r, 4096)
+
+                if file_changed:
+                    # Editors write in several steps: wait for the last one
+                    time.sleep(CONFIG_WATCH_DEBOUNCE_MS / 1000)
+                    if self._inotify_fd is not None:
+                        self._inotify_hit()
+                    stamp = self._stat()
+                    self.reload("inotify" if self._inotify_fd is not None else "poll")
+                while self._requests:
+                    self.reload("command", self._requests.popleft())
+            except Exception:
+                logger.exception("Config watcher error")
+                time.sleep(1)
+
+
+# One per process, like the module constants in config.py
+config_manager = ConfigManager()
@@ -0,0 +1,220 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+from src.common.config import I2C_BUS_NUMBER, I2C_MODE, I2C_BACKEND
+
+logger = logging.getLogger(__name__)
+
+# Transaction op codes shared by the backends, the arbiter and the client library.
+# An op is [code, addr, reg, arg]; reg is None for raw device transfers.
+OP_READ_BYTE   = "rb"    # read_byte_data(addr, reg)                    → int
+OP_WRITE_BYTE  = "wb"    # write_byte_data(addr, reg, arg)              → None
+OP_READ_BLOCK  = "rblk"  # read_i2c_block_data(addr, reg, arg=length)   → List[int]
+OP_WRITE_BLOCK = "wblk"  # write_i2c_block_data(addr, reg, arg=data)    → None
+OP_READ_RAW    = "rraw"  # read_device(addr, arg=length)                → List[int]
+OP_WRITE_RAW   = "wraw"  # write_device(addr, arg=data)                 → None
+
+READ_OPS = (OP_READ_BYTE, OP_READ_BLOCK, OP_READ_RAW)
+
+
+class I2CBackend:
+    """
+    smbus2-style access to one I2C bus, plus raw device transfers (for
+    command-based sensors such as the SHTC3). execute() runs one op.
+    """
+
+    def read_byte_data(self, addr: int, reg: int) -> int:
+        raise NotImplementedError
+
+    def write_byte_data(self, addr: int, reg: int, value: int):
+        raise NotImplementedError
+
+    def read_i2c_block_data(self, addr: int, reg: int, length: int) -> List[int]:
+        raise NotImplementedError
+
+    def write_i2c_block_data(self, addr: int, reg: int, data: Sequence[int]):
+        raise NotImplementedError
+
+    def read_device(self, addr: int, length: int) -> List[int]:
+        raise NotImplementedError
+
+    def write_device(self, addr: int, data: Sequence[int]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def transaction(self, ops: Sequence[Sequence]) -> list:
+        """Runs ops in order; same contract as I2CClient.transaction()."""
+        return [self.execute(op) for op in ops]
+
+    def execute(self, op: Sequence):
+        code, addr, reg, arg = op
+        if code == OP_READ_BYTE:
+            return self.read_byte_data(addr, reg)
+        if code == OP_READ_BLOCK:
+            return self.read_i2c_block_data(addr, reg, arg)
+        if code == OP_WRITE_BYTE:
+            return self.write_byte_data(addr, reg, arg)
+        if code == OP_WRITE_BLOCK:
+            return self.write_i2c_block_data(addr, reg, arg)
+        if code == OP_READ_RAW:
+            return self.read_device(addr, arg)
+        if code == OP_WRITE_RAW:
+            return self.write_device(addr, arg)
+        raise ValueError(f"Unknown I2C op '{code}'")
+
+
+class SMBusBackend(I2CBackend):
+    """/dev/i2c-N through smbus2; raw transfers use I2C_RDWR messages."""
+
+    def __init__(self, bus: int = I2C_BUS_NUMBER):
+        import smbus2
+        self._i2c_msg = smbus2.i2c_msg
+        self.bus = smbus2.SMBus(bus)
+
+    def read_byte_data(self, addr, reg):
+        return self.bus.read_byte_data(addr, reg)
+
+    def write_byte_data(self, addr, reg, value):
+        self.bus.write_byte_data(addr, reg, value)
+
+    def read_i2c_block_data(self, addr, reg, length):
+        return self.bus.read_i2c_block_data(addr, reg, length)
+
+    def write_i2c_block_data(self, addr, reg, data):
+        self.bus.write_i2c_block_data(addr, reg, list(data))
+
+    def read_device(self, addr, length):
+        msg = self._i2c_msg.read(addr, length)
+        self.bus.i2c_rdwr(msg)
+        return list(msg)
+
+    def write_device(self, addr, data):
+        self.bus.i2c_rdwr(self._i2c_msg.write(addr, list(data)))
+
+    def close(self):
+        self.bus.close()
+
+
+def _shtc3_word(value: int) -> List[int]:
+    """Two data bytes + CRC-8 (poly 0x31, init 0xFF), as the SHTC3 sends them."""
+    data = [(value >> 8) & 0xFF, value & 0xFF]
+    crc = 0xFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x31) if crc & 0x80 else (crc << 1)
+            crc &= 0xFF
+    return data + [crc]
+
+
+class SimulatedI2CBus(I2CBackend):
+    """
+    In-memory I2C bus for running the stack (and the arbiter) without
+    hardware. Devices are register maps; reading an unknown address raises
+    OSError like a NACK. The default devices answer like the flight sensors:
+    MAX17048 (EPS), QMI8658 + AK09918 (ADCS), LPS22HB + SHTC3 (payload).
+    op_latency_sec adds a per-op delay to mimic bus time.
+    """
+
+    def __init__(self, devices: Dict[int, Dict[int, int]] = None, op_latency_sec: float = 0.0):
+        self.registers: Dict[int, Dict[int, int]] = devices if devices is not None else self.default_devices()
+        self.op_latency_sec = op_latency_sec
+        # Bits the device clears by itself after a write (reset / one-shot triggers)
+        self.self_clearing: Dict[int, Dict[int, int]] = {0x5C: {0x11: 0x05}}
+        # Raw command devices: addr → (handler for written bytes, pending response)
+        self._raw_handlers: Dict[int, Callable[[List[int]], Optional[List[int]]]] = {0x70: self._shtc3}
+        self._raw_pending: Dict[int, List[int]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def default_devices() -> Dict[int, Dict[int, int]]:
+        accel_gyro = [0x10, 0x00, 0xF0, 0xFF, 0x00, 0x40,   # ax, ay, az (≈1 g)
+                      0x05, 0x00, 0xFB, 0xFF, 0x02, 0x00]   # gx, gy, gz
+        qmi = {0x00: 0x05, 0x33: 0x00, 0x34: 0x1E}
+        qmi.update({0x35 + i: b for i, b in enumerate(accel_gyro)})
+        ak = {0x01: 0x0C, 0x10: 0x01}
+        ak.update({0x11 + i: b for i, b in enumerate([0x20, 0x01, 0x10, 0xFF, 0x80, 0x00])})
+        max17048 = {0x02: 0xC3, 0x03: 0x00,   # VCELL ≈ 3.9 V
+                    0x04: 0x50, 0x05: 0x00}   # SOC = 80 %
+        lps22hb = {0x10: 0x00, 0x11: 0x10, 0x27: 0x03,
+                   0x28: 0x00, 0x29: 0x54, 0x2A: 0x3F,   # 1013.25 hPa
+                   0x2B: 0x2E, 0x2C: 0x09}               # 23.50 °C
+        return {0x6B: qmi, 0x0C: ak, 0x36: max17048, 0x5C: lps22hb, 0x70: {}}
+
+    def _device(self, addr: int) -> Dict[int, int]:
+        if self.op_latency_sec:
+            time.sleep(self.op_latency_sec)
+        device = self.registers.get(addr)
+        if device is None:
+            raise OSError(121, f"Remote I/O error (no device at 0x{addr:02X})")
+        return device
+
+    def read_byte_data(self, addr, reg):
+        with self._lock:
+            return self._device(addr).get(reg, 0)
+
+    def write_byte_data(self, addr, reg, value):
+        with self._lock:
+            device = self._device(addr)
+            device[reg] = value & ~self.self_clearing.get(addr, {}).get(reg, 0) & 0xFF
+
+    def read_i2c_block_data(self, addr, reg, length):
+        with self._lock:
+            device = self._device(addr)
+            return [device.get(reg + i, 0) for i in range(length)]
+
+    def write_i2c_block_data(self, addr, reg, data):
+        with self._lock:
+            device = self._device(addr)
+            for i, value in enumerate(data):
+                device[reg + i] = value & 0xFF
+
+    def read_device(self, addr, length):
+        with self._lock:
+            self._device(addr)
+            data = self._raw_pending.pop(addr, [])
+            return (data + [0xFF] * length)[:length]
+
+    def write_device(self, addr, data):
+        with self._lock:
+            self._device(addr)
+            handler = self._raw_handlers.get(addr)
+            response = handler(list(data)) if handler else None
+            if response is not None:
+                self._raw_pending[addr] = response
+
+    @staticmethod
+    def _shtc3(data: List[int]) -> Optional[List[int]]:
+        command = (data[0] << 8) | data[1] if len(data) >= 2 else None
+        if command == 0x7866:   # read T first: 23.5 °C
+            return _shtc3_word(0x6435)
+        if command == 0x58E0:   # read RH first: 45 %
+            return _shtc3_word(0x7333)
+        return None
+
+
+def create_backend(name: str = I2C_BACKEND) -> I2CBackend:
+    """Bus backend by config name: "smbus" (/dev/i2c-N) or "simulated"."""
+    if name == "simulated":
+        return SimulatedI2CBus()
+    if name == "smbus":
+        return SMBusBackend()
+    raise ValueError(f"Unknown I2C backend '{name}'")
+
+
+def get_i2c_bus(service: str):
+    """
+    Bus handle for a service's sensor drivers.
+
+    mode "arbiter" (default): an I2CClient that sends every transaction
+    through the cubesat-i2c daemon, which serializes, prioritizes and counts
+    them. mode "direct": the service opens the backend itself (no daemon).
+    """
+    if I2C_MODE == "direct":
+        return create_backend()
+    from src.common.i2c_client import I2CClient
+    return I2CClient(service)
@@ -0,0 +1,143 @@
+import json
+import logging
+import socket
+import struct
+import threading
+from typing import List, Optional, Sequence
+
+from src.common.config import I2C_SOCKET_PATH, I2C_CLIENT_TIMEOUT_SEC
+from src.common.i2c_bus import (
+    OP_READ_BYTE, OP_WRITE_BYTE, OP_READ_BLOCK, OP_WRITE_BLOCK, OP_READ_RAW, OP_WRITE_RAW
+)
+
+logger = logging.getLogger(__name__)
+
+# Wire format on the arbiter socket: 4-byte big-endian length + compact JSON.
+#   hello:    {"service": "adcs"}
+#   request:  {"id": 7, "ops": [[code, addr, reg, arg], ...], "priority": 0 (optional)}
+#   response: {"id": 7, "results": [...]}  or  {"id": 7, "error": "...", "errno": 121}
+_HEADER = struct.Struct(">I")
+_MAX_FRAME = 1 << 20
+_encoder = json.JSONEncoder(separators=(",", ":"))
+
+
+def send_frame(sock: socket.socket, obj) -> None:
+    data = _encoder.encode(obj).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("I2C arbiter closed the connection")
+        buf += chunk
+    return bytes(buf)
+
+
+def recv_frame(sock: socket.socket):
+    (length,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if length > _MAX_FRAME:
+        raise ConnectionError(f"I2C frame too large ({length} bytes)")
+    return json.loads(_recv_exact(sock, length))
+
+
+class I2CClient:
+    """
+    smbus2-compatible bus handle that routes every transaction through the
+    I2C arbiter daemon (src/i2c). Drop-in for the smbus2.SMBus calls the
+    sensor drivers use; I2C failures surface as OSError, as with smbus2.
+
+    transaction() sends several ops as one unit: the arbiter runs them
+    back-to-back without interleaving other clients (e.g. trigger + read).
+    Calls are serialized per client; the socket reconnects on demand.
+    """
+
+    def __init__(self, service: str, socket_path: str = I2C_SOCKET_PATH,
+                 timeout: float = I2C_CLIENT_TIMEOUT_SEC, priority: Optional[int] = None):
+        self.service = service
+        self.socket_path = str(socket_path)
+        self.timeout = timeout
+        self.priority = priority  # None: the arbiter's per-service priority
+        self._sock: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    # ── smbus2-style API ──
+    def read_byte_data(self, addr: int, reg: int) -> int:
+        return self.transaction([(OP_READ_BYTE, addr, reg, None)])[0]
+
+    def write_byte_data(self, addr: int, reg: int, value: int):
+        self.transaction([(OP_WRITE_BYTE, addr, reg, value)])
+
+    def read_i2c_block_data(self, addr: int, reg: int, length: int) -> List[int]:
+        return self.transaction([(OP_READ_BLOCK, addr, reg, length)])[0]
+
+    def write_i2c_block_data(self, addr: int, reg: int, data: Sequence[int]):
+        self.transaction([(OP_WRITE_BLOCK, addr, reg, list(data))])
+
+    def read_device(self, addr: int, length: int) -> List[int]:
+        return self.transaction([(OP_READ_RAW, addr, None, length)])[0]
+
+    def write_device(self, addr: int, data: Sequence[int]):
+        self.transaction([(OP_WRITE_RAW, addr, None, list(data))])
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+    # ── Transactions ──
+    def transaction(self, ops: Sequence[Sequence]) -> list:
+        """Runs ops atomically on the bus; returns one result per op (None for writes)."""
+        with self._lock:
+            self._next_id += 1
+            request = {"id": self._next_id, "ops": [list(op) for op in ops]}
+            if self.priority is not None:
+                request["priority"] = self.priority
+            response = self._roundtrip(request)
+        if "error" in response:
+            raise OSError(response.get("errno") or 5, f"I2C arbiter: {response['error']}")
+        return response["results"]
+
+    def _roundtrip(self, request):
+        # A failed send is retried once on a fresh connection (restarted daemon).
+        # A lost reply is not: the ops may already have run, and writes must not repeat.
+        for attempt in (1, 2):
+            try:
+                sock = self._connect()
+                send_frame(sock, request)
+                break
+            except OSError as e:
+                self._disconnect()
+                if attempt == 2:
+                    raise OSError(107, f"I2C arbiter unavailable at {self.socket_path}: {e}") from e
+        try:
+            return recv_frame(sock)
+        except (OSError, ConnectionError, ValueError) as e:
+            self._disconnect()
+            raise OSError(5, f"No reply from I2C arbiter: {e}") from e
+
+    def _connect(self) -> socket.socket:
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+                send_frame(sock, {"service": self.service})
+            except OSError:
+                sock.close()
+                raise
+            self._sock = sock
+        return self._sock
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def __del__(self):
+        self._disconnect()
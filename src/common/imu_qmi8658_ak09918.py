@@ -1,8 +1,9 @@
 import time
 import math
-from smbus2 import SMBus as smbus
 from typing import Dict, Tuple, Optional
 
+from src.common.i2c_bus import get_i2c_bus
+
 
 def _to_signed16(v: int) -> int:
     """Convert an unsigned 16-bit integer to a signed 16-bit integer."""
@@ -39,7 +40,7 @@ AK_CONT_20HZ  = 0x04
 
 class IMU:
     def __init__(self):
-        self.bus = smbus(1)
+        self.bus = get_i2c_bus("adcs")
         self.q0 = 1.0
         self.q1 = 0.0
         self.q2 = 0.0
@@ -1,6 +1,181 @@
+import atexit
+import gzip
+import json
 import logging
-import logging.config
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
 from pathlib import Path
+from typing import Dict, Optional
+
+from src.common.config import (
+    LOG_DIR, LOG_FORMAT, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_COMPRESS, LOG_QUEUE_SIZE,
+    LOG_FLUSH_INTERVAL_SEC, LOG_RATE_LIMITS,
+)
+from src.common.config_manager import config_manager
+
+_TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_rate_filter: Optional["RateLimitFilter"] = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One compact JSON object per line: ts, level, logger, thread, msg (+ exc)."""
+
+    def format(self, record):
+        entry = {
+            "ts":     round(record.created, 3),
+            "level":  record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg":    record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Per-logger limits for hot paths, applied in the calling thread before a
+    record is queued. A rule (longest logger-name prefix wins) is either a
+    token bucket {"rate_per_sec", "burst"} or {"sample": N} (keep every Nth).
+    WARNING and above always pass. The next record that passes carries the
+    number dropped since, so nothing disappears silently.
+    """
+
+    def __init__(self, rules: Dict[str, dict]):
+        super().__init__()
+        self._state: Dict[str, list] = {}   # logger → [tokens, last refill, seen, suppressed]
+        self._lock = threading.Lock()
+        self.set_rules(rules)
+
+    def set_rules(self, rules: Dict[str, dict]):
+        """Replaces the rules (live edit of logging.rate_limits); counters start over."""
+        with self._lock:
+            self.rules = sorted(rules.items(), key=lambda item: len(item[0]), reverse=True)
+            self._state.clear()
+
+    def _rule(self, name: str):
+        for prefix, rule in self.rules:
+            if name == prefix or name.startswith(prefix + "."):
+                return rule
+        return None
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rule = self._rule(record.name)
+        if rule is None:
+            return True
+
+        with self._lock:
+            state = self._state.setdefault(record.name, [float(rule.get("burst", 1)), time.monotonic(), 0, 0])
+            state[2] += 1
+            if "sample" in rule:
+                allowed = (state[2] - 1) % max(1, int(rule["sample"])) == 0
+            else:
+                now = time.monotonic()
+                state[0] = min(float(rule.get("burst", 1)), state[0] + (now - state[1]) * float(rule["rate_per_sec"]))
+                state[1] = now
+                allowed = state[0] >= 1
+                if allowed:
+                    state[0] -= 1
+            if not allowed:
+                state[3] += 1
+                return False
+            suppressed, state[3] = state[3], 0
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} [{suppressed} similar suppressed]"
+            record.args = None
+        return True
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: a full queue drops the record and counts it."""
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        if self.dropped:
+            record.msg = f"{record.msg} [{self.dropped} records dropped: log queue full]"
+        try:
+            self.queue.put_nowait(record)
+            self.dropped = 0
+        except queue.Full:
+            self.dropped += 1
+
+
+class _FlushingQueueListener(logging.handlers.QueueListener):
+    """Flushes its handlers when the queue has been idle for flush_interval_sec."""
+
+    def __init__(self, q, *handlers, flush_interval_sec: float = 5.0):
+        super().__init__(q, *handlers, respect_handler_level=True)
+        self.flush_interval_sec = flush_interval_sec
+
+    def dequeue(self, block):
+        while True:
+            try:
+                return self.queue.get(block, self.flush_interval_sec)
+            except queue.Empty:
+                for handler in self.handlers:
+                    handler.flush()
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler for the listener thread: writes are flushed at most
+    every flush_interval_sec (at once for WARNING and above), so the SD card
+    sees few large writes. Rotated files are gzip-compressed in a background
+    thread (<name>.1.gz ...), keeping rotation itself a rename.
+    """
+
+    def __init__(self, filename, flush_interval_sec: float = 5.0, compress: bool = True, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.flush_interval_sec = flush_interval_sec
+        self._last_flush = time.monotonic()
+        if compress:
+            self.namer = lambda name: name + ".gz"
+            self.rotator = self._rotate_compressed
+
+    def emit(self, record):
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= logging.WARNING or time.monotonic() - self._last_flush >= self.flush_interval_sec:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        super().flush()
+        self._last_flush = time.monotonic()
+
+    @staticmethod
+    def _rotate_compressed(source: str, dest: str):
+        # Unique name: a rollover during a slow compression must not overwrite it
+        plain = f"{dest[:-len('.gz')]}.{time.monotonic_ns()}"
+        os.rename(source, plain)
+
+        def compress():
+            try:
+                with open(plain, "rb") as src, gzip.open(dest, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(plain)
+            except OSError as e:
+                logging.getLogger(__name__).warning(f"Log compression failed for {plain}: {e}")
+
+        threading.Thread(target=compress, name="log-gzip", daemon=True).start()
 
 
 def setup_logging(
@@ -10,47 +185,64 @@ def setup_logging(
 ):
     """
     Единая настройка логирования для всех сервисов.
+
+    Loggers only enqueue records (QueueHandler, after the rate limits in
+    logging.rate_limits); one listener thread formats them and writes the
+    console and the rotating file in logging.dir.
     """
-    log_dir = Path('/var/log/cubesat/')
+    global _listener, _rate_filter
+    log_dir = Path(LOG_DIR)
     log_dir.mkdir(parents=True, exist_ok=True)   # создаём папку, если нет
     log_path = log_dir / log_file
 
-    handlers = {}
+    formatter = JsonLinesFormatter() if LOG_FORMAT == "json" else logging.Formatter(_TEXT_FORMAT, _DATE_FORMAT)
+    handlers = []
     if console:
-        handlers["console"] = {
-            "class": "logging.StreamHandler",
-            "level": log_level,
-            "formatter": "standard",
-            "stream": "ext://sys.stdout",
-        }
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setLevel(log_level)
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+
+    file_handler = CompressingRotatingFileHandler(
+        str(log_path),
+        flush_interval_sec=LOG_FLUSH_INTERVAL_SEC,
+        compress=LOG_COMPRESS,
+        maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT,
+        encoding="utf-8",
+    )
+    file_handler.setLevel(log_level)
+    file_handler.setFormatter(formatter)
+    handlers.append(file_handler)
+
+    if _listener is not None:
+        shutdown_logging()
+    else:
+        atexit.register(shutdown_logging)
+        config_manager.subscribe("logging.rate_limits", lambda rules: _rate_filter and _rate_filter.set_rules(rules))
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = _DroppingQueueHandler(log_queue)
+    _rate_filter = RateLimitFilter(config_manager.get("logging.rate_limits") or LOG_RATE_LIMITS)
+    queue_handler.addFilter(_rate_filter)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(log_level)
+
+    _listener = _FlushingQueueListener(log_queue, *handlers, flush_interval_sec=LOG_FLUSH_INTERVAL_SEC)
+    _listener.start()
+
+    logging.info(f"Логирование настроено: уровень={log_level}, файл={log_path}, формат={LOG_FORMAT}")
+
 
-    handlers["file"] = {
-        "class": "logging.handlers.RotatingFileHandler",
-        "level": log_level,
-        "formatter": "standard",
-        "filename": str(log_path),
-        "maxBytes": 10*1024*1024,  # 10 MB
-        "backupCount": 5,
-        "encoding": "utf-8",
-    }
-
-    logging.config.dictConfig({
-        "version": 1,
-        "disable_existing_loggers": False,
-        "formatters": {
-            "standard": {
-                "format": "%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-                "datefmt": "%Y-%m-%d %H:%M:%S",
-            },
-        },
-        "handlers": handlers,
-        "loggers": {
-            "": {
-                "handlers": list(handlers.keys()),
-                "level": log_level,
-                "propagate": True,
-            },
-        },
-    })
-
-    logging.info(f"Логирование настроено: уровень={log_level}, файл={log_path}")
\ No newline at end of file
+def shutdown_logging():
+    """Drains the queue and flushes/closes the handlers (registered with atexit)."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
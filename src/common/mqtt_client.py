@@ -2,24 +2,244 @@ import paho.mqtt.client as mqtt
 import time
 import logging
 import random
+import threading
+from collections import OrderedDict, deque
+from itertools import count
+from typing import Dict, Optional
+
+from src.common.config import MQTT_PUBLISH_POLICY
 
 logger = logging.getLogger(__name__)
 
+
+class ManagedClient(mqtt.Client):
+    """
+    paho client whose publish() follows the publish policy (mqtt.publish in
+    config.yaml): per-topic qos / retain override the caller's flags.
+
+    paho keeps every QoS 1/2 publish it cannot send yet in an unbounded
+    queue. Here a publish made while the connection is down, or while
+    max_inflight messages still wait for their ack, goes into a bounded
+    queue instead:
+      - when it is full the oldest message is dropped,
+      - a coalesce topic (status) keeps only its latest message,
+      - a message older than its topic's max_age_sec is dropped unsent.
+    The queue is flushed when the connection returns and drained as acks
+    arrive, so a broker restart costs at most offline_queue messages of
+    memory and one fresh status per topic.
+
+    on_connect / on_publish / on_disconnect are set as on any paho client;
+    the client chains its own handling in front of them. stats() reports
+    queued, in flight, dropped and publish-to-ack latency.
+    """
+
+    def __init__(self, *args, policy: Dict = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self._queue: "OrderedDict[object, tuple]" = OrderedDict()   # coalesce topic or sequence → message
+        self._seq = count()
+        self._pending: Dict[int, tuple] = {}    # mid → (sent at, qos)
+        self._early_acks = set()                # mids acked before publish() returned (QoS 0 writes)
+        self._in_flight = 0
+        self._latencies = deque(maxlen=512)
+        self._dropped = {"overflow": 0, "coalesced": 0, "expired": 0, "lost": 0}
+        self.published = 0
+        self.acked = 0
+        self._service_on_connect = None
+        self._service_on_publish = None
+        self._service_on_disconnect = None
+        # Queued messages go out from this thread: paho iterates its own message list
+        # around on_connect / on_publish, so those callbacks must not publish themselves.
+        self._draining = False
+        self._wake = threading.Event()
+        threading.Thread(target=self._drain_loop, name="mqtt-publish-queue", daemon=True).start()
+        self._apply(MQTT_PUBLISH_POLICY if policy is None else policy)
+        if policy is None:
+            from src.common.config_manager import config_manager
+            config_manager.subscribe("mqtt.publish", self._apply)
+
+    def _apply(self, policy: Dict):
+        self.policy = policy
+        self.max_inflight_messages_set(policy["max_inflight"])
+        self._wake.set()
+
+    # ── Callbacks: paho reads these properties, the service's own callback runs inside ours ──
+    @property
+    def on_connect(self):
+        return self._on_connected
+
+    @on_connect.setter
+    def on_connect(self, func):
+        self._service_on_connect = func
+
+    @property
+    def on_publish(self):
+        return self._on_published
+
+    @on_publish.setter
+    def on_publish(self, func):
+        self._service_on_publish = func
+
+    @property
+    def on_disconnect(self):
+        return self._on_disconnected
+
+    @on_disconnect.setter
+    def on_disconnect(self, func):
+        self._service_on_disconnect = func
+
+    def _on_connected(self, client, userdata, flags, rc, *args):
+        if self._service_on_connect:
+            self._service_on_connect(client, userdata, flags, rc, *args)
+        if rc == 0:
+            with self._lock:
+                queued = len(self._queue)
+                dropped = sum(self._dropped.values())
+            if queued:
+                logger.info(f"MQTT connected: flushing {queued} queued messages ({dropped} dropped so far)")
+                self._wake.set()
+
+    def _on_published(self, client, userdata, mid, *args):
+        with self._lock:
+            self._complete(mid)
+        if self._service_on_publish:
+            self._service_on_publish(client, userdata, mid, *args)
+        if self._queue:
+            self._wake.set()
+
+    def _on_disconnected(self, client, userdata, *args):
+        # QoS 0 messages not yet written are gone; QoS 1/2 stay with paho and are resent on reconnect
+        with self._lock:
+            lost = [mid for mid, (_, qos) in self._pending.items() if qos == 0]
+            for mid in lost:
+                del self._pending[mid]
+            self._in_flight -= len(lost)
+            self._dropped["lost"] += len(lost)
+        if self._service_on_disconnect:
+            self._service_on_disconnect(client, userdata, *args)
+
+    # ── Publishing ──
+    def publish(self, topic: str, payload=None, qos: int = 0, retain: bool = False, properties=None):
+        rule = self.policy["topics"].get(topic, {})
+        qos = rule.get("qos", qos)
+        retain = rule.get("retain", retain)
+        message = (topic, payload, qos, retain, properties, time.monotonic())
+        with self._lock:
+            send_now = not self._queue and not self._draining and self._has_slot()
+            if send_now:
+                self._in_flight += 1
+            else:
+                # Behind older queued messages, or no room: wait in the queue (FIFO per client)
+                self._enqueue(message, rule)
+        if send_now:
+            return self._send(message)
+        self._wake.set()
+        info = mqtt.MQTTMessageInfo(0)
+        info.rc = mqtt.MQTT_ERR_SUCCESS
+        return info
+
+    def _has_slot(self) -> bool:
+        return self.is_connected() and self._in_flight < self.policy["max_inflight"]
+
+    def _enqueue(self, message: tuple, rule: Dict):
+        topic = message[0]
+        if rule.get("coalesce"):
+            if self._queue.pop(topic, None) is not None:
+                self._dropped["coalesced"] += 1
+            self._queue[topic] = message
+        else:
+            self._queue[next(self._seq)] = message
+        while len(self._queue) > self.policy["offline_queue"]:
+            self._queue.popitem(last=False)
+            self._dropped["overflow"] += 1
+            if self._dropped["overflow"] in (1, 10, 100) or self._dropped["overflow"] % 1000 == 0:
+                logger.warning(f"MQTT offline queue full ({self.policy['offline_queue']}): "
+                               f"{self._dropped['overflow']} oldest messages dropped")
+
+    def _send(self, message: tuple):
+        """paho publish of a message that holds an in-flight slot (never called with _lock held)."""
+        topic, payload, qos, retain, properties, _ = message
+        sent_at = time.monotonic()
+        info = super().publish(topic, payload, qos=qos, retain=retain, properties=properties)
+        with self._lock:
+            self.published += 1
+            if info.rc not in (mqtt.MQTT_ERR_SUCCESS, mqtt.MQTT_ERR_NO_CONN) or (
+                    info.rc == mqtt.MQTT_ERR_NO_CONN and qos == 0):
+                self._in_flight -= 1
+                self._dropped["lost"] += 1
+            elif info.mid in self._early_acks:
+                self._early_acks.discard(info.mid)
+                self._in_flight -= 1
+                self.acked += 1
+                self._latencies.append(time.monotonic() - sent_at)
+            else:
+                self._pending[info.mid] = (sent_at, qos)
+        return info
+
+    def _complete(self, mid: int):
+        entry = self._pending.pop(mid, None)
+        if entry is None:
+            self._early_acks.add(mid)
+            return
+        self._in_flight -= 1
+        self.acked += 1
+        self._latencies.append(time.monotonic() - entry[0])
+
+    def _drain_loop(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            self._drain()
+
+    def _drain(self):
+        """Sends queued messages while there are in-flight slots."""
+        while True:
+            with self._lock:
+                self._draining = bool(self._queue) and self._has_slot()
+                if not self._draining:
+                    return
+                _, message = self._queue.popitem(last=False)
+                max_age = self.policy["topics"].get(message[0], {}).get("max_age_sec")
+                if max_age is not None and time.monotonic() - message[5] > max_age:
+                    self._dropped["expired"] += 1
+                    continue
+                self._in_flight += 1
+            self._send(message)
+
+    def stats(self) -> Dict:
+        """Queue and delivery counters since start; ack latency over the last 512 messages (ms)."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            pick = lambda q: round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 1)
+            return {
+                "connected":   self.is_connected(),
+                "queued":      len(self._queue),
+                "in_flight":   self._in_flight,
+                "published":   self.published,
+                "acked":       self.acked,
+                "dropped":     dict(self._dropped),
+                "ack_latency_ms": {"p50": pick(0.5), "p95": pick(0.95), "max": pick(1.0)} if latencies else None,
+            }
+
+
 def get_mqtt_client(
         client_id: str,
         username: str = None,
         password: str = None,
         reconnect_delay_min: int = 1,
-        reconnect_delay_max: int = 120
-) -> mqtt.Client:
+        reconnect_delay_max: int = 120,
+        policy: Optional[Dict] = None
+) -> ManagedClient:
     """
     Creates an MQTT client with automatic reconnection and exponential backoff.
     on_connect and on_disconnect must be set by the caller after this returns.
+    policy defaults to mqtt.publish from config.yaml (followed on reload).
     """
-    client = mqtt.Client(
+    client = ManagedClient(
         client_id=client_id + "_" + str(random.randint(1000, 9999)),
         protocol=mqtt.MQTTv5,
-        userdata={"reconnect_delay_min": reconnect_delay_min, "reconnect_delay_max": reconnect_delay_max}
+        userdata={"reconnect_delay_min": reconnect_delay_min, "reconnect_delay_max": reconnect_delay_max},
+        policy=policy
     )
 
     if username and password:
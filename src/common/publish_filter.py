@@ -0,0 +1,116 @@
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from src.common.config import PUBLISH_FILTERS
+from src.common.config_manager import config_manager
+
+logger = logging.getLogger(__name__)
+
+# Fields that change on every sample and never count as a change by themselves
+_IGNORED_FIELDS = ("timestamp",)
+
+
+def _flatten(obj: Dict, prefix: str = "") -> Dict[str, Any]:
+    flat = {}
+    for key, value in obj.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path + "."))
+        elif path not in _IGNORED_FIELDS:
+            flat[path] = value
+    return flat
+
+
+class PublishFilter:
+    """
+    Change-driven publishing with a heartbeat fallback.
+
+    A packet is published when any numeric field moved by at least its
+    deadband since the last *published* packet (so slow drift still gets
+    through), when a discrete field (bool, string, None, or a number without
+    a deadband) changed, when fields appear or disappear, or when nothing was
+    published for heartbeat_sec. Nested fields use dotted names ("accel_g.x").
+
+    Thresholds come from config.yaml (publish_filter.<topic_key>) and follow
+    live edits of it; a topic without a section is never filtered.
+    """
+
+    def __init__(self, topic_key: str, deadbands: Dict[str, float] = None, heartbeat_sec: float = None):
+        cfg = PUBLISH_FILTERS.get(topic_key, {})
+        self.topic_key = topic_key
+        self.enabled = bool(cfg) or deadbands is not None or heartbeat_sec is not None
+        self.deadbands = dict(cfg.get("deadbands", {}) if deadbands is None else deadbands)
+        self.heartbeat_sec = cfg.get("heartbeat_sec") if heartbeat_sec is None else heartbeat_sec
+        if deadbands is None and heartbeat_sec is None:
+            config_manager.subscribe("publish_filter", self._on_config)
+
+        self.sent = 0
+        self.suppressed = 0
+        self.reason: Optional[str] = None   # why the last packet was sent: first / heartbeat / change / burst
+        self._last_values: Optional[Dict[str, Any]] = None
+        self._last_sent_at = 0.0
+
+    def should_publish(self, packet: Dict, force: bool = False) -> bool:
+        """
+        Decides for this packet and updates counters; call once per candidate
+        packet. force (an anomaly burst) publishes it regardless, as "burst".
+        """
+        if force:
+            self.reason = "burst"
+            self.sent += 1
+            self._last_values = _flatten(packet)
+            self._last_sent_at = time.monotonic()
+            return True
+        if not self.enabled:
+            self.reason = "unfiltered"
+            self.sent += 1
+            return True
+
+        now = time.monotonic()
+        values = _flatten(packet)
+        if self._last_values is None:
+            self.reason = "first"
+        elif self.heartbeat_sec is not None and now - self._last_sent_at >= self.heartbeat_sec:
+            self.reason = "heartbeat"
+        elif self._changed(values):
+            self.reason = "change"
+        else:
+            self.reason = None
+        publish = self.reason is not None
+
+        if publish:
+            self.sent += 1
+            self._last_values = values
+            self._last_sent_at = now
+        else:
+            self.suppressed += 1
+        return publish
+
+    def _on_config(self, publish_filters: Dict[str, dict]):
+        cfg = publish_filters.get(self.topic_key, {})
+        # Reassigned, not mutated: should_publish() may be reading them on another thread
+        self.deadbands = dict(cfg.get("deadbands", {}))
+        self.heartbeat_sec = cfg.get("heartbeat_sec")
+        self.enabled = bool(cfg)
+        logger.info(f"Publish filter {self.topic_key} reloaded: "
+                    + (f"heartbeat {self.heartbeat_sec}s, {len(self.deadbands)} deadbands" if cfg else "unfiltered"))
+
+    def stats(self) -> Dict[str, int]:
+        return {"sent": self.sent, "suppressed": self.suppressed}
+
+    def _changed(self, values: Dict[str, Any]) -> bool:
+        last = self._last_values
+        if values.keys() != last.keys():
+            return True
+        for key, value in values.items():
+            previous = last[key]
+            deadband = self.deadbands.get(key)
+            if (deadband is not None
+                    and isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and isinstance(previous, (int, float)) and not isinstance(previous, bool)):
+                if abs(value - previous) >= deadband:
+                    return True
+            elif value != previous:
+                return True
+        return False
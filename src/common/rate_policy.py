@@ -0,0 +1,114 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from src.common.config import PUBLISH_INTERVALS
+from src.common.config_manager import config_manager
+
+logger = logging.getLogger(__name__)
+
+
+class RatePolicy:
+    """
+    Publish interval of a service loop, chosen by the current OBC state.
+
+    Intervals come from config.yaml (publish_intervals.<service>): a
+    "default" plus optional per-state overrides, in seconds; null pauses
+    the loop in that state. A state change wakes a sleeping loop at once,
+    so the new rate applies immediately instead of after the old interval;
+    so does a live edit of publish_intervals (src/common/config_manager.py).
+
+    burst() temporarily shortens the interval (event-triggered high-rate
+    capture, src/common/anomaly.py); a state that pauses the loop stays
+    paused.
+
+    Usage:
+        while True:
+            self.publish_status()
+            self.rate_policy.wait()
+    """
+
+    def __init__(self, service: str, intervals: Dict[str, Optional[float]] = None):
+        self.service = service
+        self._intervals = dict(intervals if intervals is not None else PUBLISH_INTERVALS.get(service, {}))
+        self._state: Optional[str] = None
+        self._changed = threading.Event()
+        self._lock = threading.Lock()
+        self._burst_interval: Optional[float] = None
+        self._burst_until = 0.0   # monotonic
+        if intervals is None:
+            config_manager.subscribe("publish_intervals", self._on_config)
+
+    @property
+    def state(self) -> Optional[str]:
+        return self._state
+
+    def interval(self) -> Optional[float]:
+        """Seconds between publishes in the current state; None = paused."""
+        with self._lock:
+            if self._state in self._intervals:
+                interval = self._intervals[self._state]
+            else:
+                interval = self._intervals.get("default")
+            if interval is not None and self._burst_interval is not None and time.monotonic() < self._burst_until:
+                return min(interval, self._burst_interval)
+            return interval
+
+    def burst(self, interval: float, until: float):
+        """Publishes every `interval` seconds until the monotonic time `until`; a sleeping loop wakes at once."""
+        with self._lock:
+            starting = time.monotonic() >= self._burst_until
+            self._burst_interval, self._burst_until = float(interval), until
+        if starting:
+            logger.info(f"[{self.service}] burst: {interval:g}s interval for {until - time.monotonic():.0f}s")
+            self._changed.set()
+
+    def set_state(self, state: Optional[str]):
+        with self._lock:
+            if state == self._state:
+                return
+            previous, self._state = self._state, state
+        logger.info(f"[{self.service}] OBC state {previous} → {state}: publish interval {self._describe()}")
+        self._changed.set()
+
+    def set_intervals(self, intervals: Dict[str, Optional[float]]):
+        """Replaces the interval table; a sleeping loop re-evaluates at once."""
+        with self._lock:
+            if intervals == self._intervals:
+                return
+            self._intervals = dict(intervals)
+        logger.info(f"[{self.service}] publish intervals reloaded: now {self._describe()} in state {self._state}")
+        self._changed.set()
+
+    def _on_config(self, publish_intervals: Dict[str, Dict[str, Optional[float]]]):
+        self.set_intervals(publish_intervals.get(self.service, {}))
+
+    def on_obc_status(self, data: Dict):
+        """Feed a decoded cubesat/obc/status message."""
+        state = data.get("status")
+        if state:
+            self.set_state(state)
+
+    def wait(self):
+        """
+        Sleeps until the next publish is due under the current state's interval.
+        Re-evaluates on every state change: returns at once if the new, shorter
+        interval has already elapsed, and blocks while the state pauses the loop.
+        """
+        start = time.monotonic()
+        while True:
+            interval = self.interval()
+            timeout = None
+            if interval is not None:
+                timeout = start + interval - time.monotonic()
+                if timeout <= 0:
+                    return
+            if self._changed.wait(timeout):
+                self._changed.clear()
+                continue
+            return
+
+    def _describe(self) -> str:
+        interval = self.interval()
+        return "paused" if interval is None else f"{interval:g}s"
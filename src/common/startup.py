@@ -0,0 +1,123 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from src.common.config import STARTUP_HW_RETRY_SEC, STARTUP_HW_RETRY_MAX_SEC
+
+logger = logging.getLogger(__name__)
+
+
+def _process_start_time() -> float:
+    """Wall-clock time the process was started (from /proc), so interpreter start-up is counted too."""
+    try:
+        with open("/proc/self/stat") as f:
+            stat = f.read()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        start_ticks = int(stat[stat.rindex(")") + 2:].split()[19])   # field 22: starttime
+        return time.time() - (uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return time.time()
+
+
+class StartupTimeline:
+    """
+    Milliseconds from process start to each start-up phase of a service:
+    imports → logging → constructed → mqtt_connected → alive →
+    hardware_ready → first_publish. Each phase is recorded once.
+    """
+
+    def __init__(self):
+        self.t0 = _process_start_time()
+        self.phases: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, phase: str) -> bool:
+        """Records phase now; False if it was already recorded."""
+        with self._lock:
+            if phase in self.phases:
+                return False
+            self.phases[phase] = round((time.time() - self.t0) * 1000, 1)
+        logger.debug(f"Startup phase {phase}: {self.phases[phase]} ms")
+        return True
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.phases)
+
+    def log_report(self, service: str):
+        phases = self.as_dict()
+        steps = ", ".join(f"{name} {ms:.0f}" for name, ms in phases.items())
+        logger.info(f"{service} startup timeline (ms since process start): {steps}")
+
+
+# One per process: every service main module runs in its own interpreter
+timeline = StartupTimeline()
+
+
+def announce(client, service: str, phase: str):
+    """
+    Publishes a start-up milestone on TOPICS["service_startup"]:
+    "alive" as soon as MQTT is up, "ready" with the full timeline after the first publish.
+    """
+    from src.common import codec
+    codec.publish(
+        client,
+        "service_startup",
+        {"timestamp": time.time(), "service": service, "phase": phase, "timeline_ms": timeline.as_dict()},
+        qos=1
+    )
+
+
+def first_publish(client, service: str):
+    """Call after every status publish; reports the timeline once, on the first one."""
+    if timeline.mark("first_publish"):
+        timeline.log_report(service)
+        announce(client, service, "ready")
+
+
+class BackgroundInit:
+    """
+    Runs a service's hardware initialisation off the start-up path, so it
+    can connect and announce itself first. A failing init is retried with
+    exponential backoff (STARTUP_HW_RETRY_SEC … STARTUP_HW_RETRY_MAX_SEC)
+    instead of crashing the service into a systemd restart loop.
+    """
+
+    def __init__(self, name: str, init: Callable[[], None]):
+        self.name = name
+        self.init = init
+        self.ready = threading.Event()
+        self.error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-init", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self.ready.wait(timeout)
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        delay = STARTUP_HW_RETRY_SEC
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.init()
+            except Exception as e:
+                self.error = str(e)
+                logger.error(f"{self.name} init failed ({e}); retrying in {delay:.0f} s")
+                self._stop.wait(delay)
+                delay = min(delay * 2, STARTUP_HW_RETRY_MAX_SEC)
+                continue
+            self.error = None
+            timeline.mark("hardware_ready")
+            logger.info(f"{self.name} ready in {(time.monotonic() - started) * 1000:.0f} ms")
+            self.ready.set()
+            return
@@ -1,85 +1,217 @@
-import psutil
 import os
 import time
-from typing import Dict, Optional
+import logging
+import threading
+from typing import Dict, List, Optional
 
+from src.common.config import METRICS_SERVICES, METRICS_PID_RESCAN_SEC, METRICS_THERMAL_ZONE
 
-class SystemMetricsCollector:
-    """Сборщик системных метрик (RPi / Linux oriented)"""
+logger = logging.getLogger(__name__)
 
-    @staticmethod
-    def get_soc_temperature() -> Optional[float]:
-        path = "/sys/class/thermal/thermal_zone0/temp"
-        try:
-            with open(path, 'r') as f:
-                value = f.read().strip()
-            return round(float(value) / 1000, 1)
-        except Exception:
-            pass  # fallback
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_KIB = (os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096) // 1024
 
-        try:
-            res = os.popen('vcgencmd measure_temp').readline().strip()
-            if res.startswith("temp="):
-                temp_str = res.replace("temp=", "").replace("'C", "")
-                return round(float(temp_str), 1)
-        except Exception:
-            pass
 
-        return None
+class _ProcFile:
+    """
+    A /proc or /sys file kept open between reads: read() seeks back and
+    re-reads, so each sample costs one read syscall instead of open/read/close.
+    """
 
-    @staticmethod
-    def get_cpu_usage(interval: float = 0.8) -> float:
-        """Загрузка CPU в % (с небольшим интервалом измерения)"""
+    def __init__(self, path: str):
+        self.path = path
+        self._f = None
+
+    def read(self) -> Optional[str]:
         try:
-            return psutil.cpu_percent(interval=interval)
-        except Exception:
-            return 0.0
+            if self._f is None:
+                self._f = open(self.path, "r")
+            self._f.seek(0)
+            return self._f.read()
+        except OSError:
+            self.close()
+            return None
+
+    def close(self):
+        if self._f is not None:
+            try:
+                self._f.close()
+            except OSError:
+                pass
+            self._f = None
+
+
+class _ServiceProcess:
+    """Tracks one service process: its stat file and the previous CPU sample."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.stat = _ProcFile(f"/proc/{pid}/stat")
+        self.prev_ticks: Optional[int] = None
+        self.prev_time = 0.0
+
+    def sample(self) -> Optional[Dict]:
+        raw = self.stat.read()
+        if not raw:
+            return None
+        # comm (field 2) may contain spaces: split after its closing parenthesis
+        fields = raw[raw.rindex(")") + 2:].split()
+        ticks = int(fields[11]) + int(fields[12])          # utime + stime
+        threads = int(fields[17])
+        rss_kib = int(fields[21]) * _PAGE_KIB
+
+        now = time.monotonic()
+        cpu = None
+        if self.prev_ticks is not None and now > self.prev_time:
+            cpu = round((ticks - self.prev_ticks) / _CLK_TCK / (now - self.prev_time) * 100, 1)
+        self.prev_ticks, self.prev_time = ticks, now
 
-    @staticmethod
-    def get_ram_usage() -> float:
-        """Использование RAM в %"""
         try:
-            return psutil.virtual_memory().percent
-        except Exception:
-            return 0.0
+            fds = len(os.listdir(f"/proc/{self.pid}/fd"))
+        except OSError:
+            fds = None  # other user's process without CAP_SYS_PTRACE
+        return {"pid": self.pid, "cpu_percent": cpu, "rss_kib": rss_kib, "threads": threads, "open_fds": fds}
 
-    @staticmethod
-    def get_swap_usage() -> float:
-        """Использование swap в %"""
+    def close(self):
+        self.stat.close()
+
+
+class SystemMetricsCollector:
+    """
+    Host and per-service metrics straight from /proc and /sys (RPi / Linux).
+
+    Incremental: CPU percentages are deltas since the previous collect()
+    (on the first call: host average since boot, no per-service CPU yet),
+    so nothing sleeps and nothing spawns a subprocess. Source files
+    stay open between calls. Service processes are found by their
+    "-m src.<service>.main" command line and re-scanned every
+    METRICS_PID_RESCAN_SEC or when a tracked process disappears.
+    """
+
+    def __init__(self, services: List[str] = None):
+        self.services = list(METRICS_SERVICES if services is None else services)
+        self._stat = _ProcFile("/proc/stat")
+        self._meminfo = _ProcFile("/proc/meminfo")
+        self._uptime = _ProcFile("/proc/uptime")
+        self._thermal = _ProcFile(METRICS_THERMAL_ZONE)
+        self._prev_cpu = None  # (busy, total) jiffies
+        self._processes: Dict[str, _ServiceProcess] = {}
+        self._last_scan = 0.0
+        self.i2c_errors: Dict[str, int] = {}  # per service, fed from cubesat/i2c/status
+        self._lock = threading.Lock()          # deltas are per caller sequence: one collect() at a time
+
+    # ── Host metrics ──
+    def get_soc_temperature(self) -> Optional[float]:
+        raw = self._thermal.read()
         try:
-            return psutil.swap_memory().percent
-        except Exception:
+            return round(float(raw) / 1000, 1) if raw else None
+        except ValueError:
+            return None
+
+    def get_cpu_usage(self) -> float:
+        """CPU % across all cores since the previous call."""
+        raw = self._stat.read()
+        if not raw:
             return 0.0
+        values = [int(v) for v in raw[:raw.index("\n")].split()[1:]]
+        idle = values[3] + (values[4] if len(values) > 4 else 0)   # idle + iowait
+        total = sum(values[:8])                                     # excludes guest (already in user)
+        busy = total - idle
+        prev, self._prev_cpu = self._prev_cpu, (busy, total)
+        if prev is not None:
+            busy, total = busy - prev[0], total - prev[1]
+        return round(busy / total * 100, 1) if total > 0 else 0.0
 
-    @staticmethod
-    def get_uptime_seconds() -> int:
-        """Время работы системы в секундах"""
-        try:
-            return int(time.time() - psutil.boot_time())
-        except Exception:
-            return 0
+    def _meminfo_kib(self) -> Dict[str, int]:
+        raw = self._meminfo.read() or ""
+        info = {}
+        for line in raw.splitlines():
+            key, _, rest = line.partition(":")
+            if key in ("MemTotal", "MemAvailable", "SwapTotal", "SwapFree"):
+                info[key] = int(rest.split()[0])
+        return info
+
+    def get_uptime_seconds(self) -> Optional[float]:
+        raw = self._uptime.read()
+        return round(float(raw.split()[0]), 1) if raw else None
 
     @staticmethod
     def get_sd_usage() -> float:
-        """Использование SD-карты в %"""
+        """Root filesystem usage in % (same definition as df / psutil)."""
         try:
-            return psutil.disk_usage('/').percent
-        except Exception:
+            st = os.statvfs("/")
+            used = (st.f_blocks - st.f_bfree) * st.f_frsize
+            avail = st.f_bavail * st.f_frsize
+            return round(used / (used + avail) * 100, 1) if used + avail else 0.0
+        except OSError:
             return 0.0
 
-    @classmethod
-    def collect(cls, with_interval: float = 0.8) -> Dict:
+    # ── Per-service metrics ──
+    def _rescan(self):
+        self._last_scan = time.monotonic()
+        wanted = {f"src.{name}.main": name for name in self.services}
+        found: Dict[str, int] = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/cmdline", "rb") as f:
+                    args = f.read().split(b"\0")
+            except OSError:
+                continue
+            for i, arg in enumerate(args[:-1]):
+                if arg == b"-m":
+                    name = wanted.get(args[i + 1].decode(errors="replace"))
+                    if name:
+                        found[name] = int(entry)
+                    break
+
+        for name in list(self._processes):
+            if found.get(name) != self._processes[name].pid:
+                self._processes.pop(name).close()
+        for name, pid in found.items():
+            if name not in self._processes:
+                self._processes[name] = _ServiceProcess(pid)
+
+    def collect_services(self) -> Dict[str, Optional[Dict]]:
+        """Per-service RSS, CPU % (of one core), threads, open FDs, I2C errors; None = not running."""
+        if time.monotonic() - self._last_scan >= METRICS_PID_RESCAN_SEC:
+            self._rescan()
+        result: Dict[str, Optional[Dict]] = {}
+        vanished = False
+        for name in self.services:
+            proc = self._processes.get(name)
+            sample = proc.sample() if proc else None
+            if proc and sample is None:
+                vanished = True
+            if sample is not None:
+                sample["i2c_errors"] = self.i2c_errors.get(name)
+            result[name] = sample
+        if vanished:
+            self._last_scan = 0.0  # restarted service: find its new PID next time
+        return result
+
+    def on_i2c_status(self, data: Dict):
+        """Feed a decoded cubesat/i2c/status message."""
+        for name, stats in (data.get("services") or {}).items():
+            self.i2c_errors[name] = stats.get("errors", 0)
+
+    def collect(self) -> Dict:
         """
-        Собирает все метрики разом.
-        Возвращает словарь, готовый к включению в телеметрию.
+        All metrics in one call, ready to include in telemetry.
         """
-        cpu_temp = cls.get_soc_temperature()
+        with self._lock:
+            return self._collect()
 
+    def _collect(self) -> Dict:
+        mem = self._meminfo_kib()
+        mem_total, swap_total = mem.get("MemTotal", 0), mem.get("SwapTotal", 0)
         return {
-            "cpu_percent":   cls.get_cpu_usage(interval=with_interval),
-            "ram_percent":   cls.get_ram_usage(),
-            "swap_percent":  cls.get_swap_usage(),
-            "disk_percent":  cls.get_sd_usage(),
-            "uptime_seconds": time.time() - psutil.boot_time(),  # более точно
-            "cpu_temperature": cpu_temp,
-        }
\ No newline at end of file
+            "cpu_percent":     self.get_cpu_usage(),
+            "ram_percent":     round((1 - mem.get("MemAvailable", 0) / mem_total) * 100, 1) if mem_total else 0.0,
+            "swap_percent":    round((1 - mem.get("SwapFree", 0) / swap_total) * 100, 1) if swap_total else 0.0,
+            "disk_percent":    self.get_sd_usage(),
+            "uptime_seconds":  self.get_uptime_seconds(),
+            "cpu_temperature": self.get_soc_temperature(),
+            "services":        self.collect_services(),
+        }
@@ -0,0 +1,168 @@
+import argparse
+import logging
+import queue
+import sys
+import threading
+import time
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class SimulatedGPIO:
+    """
+    Stand-in for the RPi.GPIO module (the subset EPSMonitor uses), for
+    running the EPS edge-detection path without a Raspberry Pi.
+
+    Drive inputs with set_input() / bounce(); edge callbacks run on a
+    separate dispatcher thread, like RPi.GPIO's event thread.
+    """
+
+    BCM = 11
+    BOARD = 10
+    IN = 1
+    OUT = 0
+    LOW = 0
+    HIGH = 1
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+
+    def __init__(self, initial: Dict[int, int] = None):
+        self._levels: Dict[int, int] = dict(initial or {})
+        self._callbacks: Dict[int, List[Callable[[int], None]]] = {}
+        self._edges: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._events: "queue.Queue" = queue.Queue()
+        self._dispatcher = threading.Thread(target=self._dispatch, name="gpio-sim", daemon=True)
+        self._dispatcher.start()
+
+    # ── RPi.GPIO API ──
+    def setwarnings(self, flag: bool):
+        pass
+
+    def setmode(self, mode: int):
+        pass
+
+    def setup(self, pin: int, direction: int, pull_up_down: int = PUD_OFF, initial: int = None):
+        with self._lock:
+            if initial is not None:
+                self._levels[pin] = initial
+            else:
+                self._levels.setdefault(pin, self.HIGH if pull_up_down == self.PUD_UP else self.LOW)
+
+    def input(self, pin: int) -> int:
+        with self._lock:
+            return self._levels.get(pin, self.LOW)
+
+    def add_event_detect(self, pin: int, edge: int, callback: Callable[[int], None] = None, bouncetime: int = None):
+        with self._lock:
+            if pin in self._edges:
+                raise RuntimeError(f"Conflicting edge detection already enabled for GPIO {pin}")
+            self._edges[pin] = edge
+            self._callbacks[pin] = [callback] if callback else []
+
+    def add_event_callback(self, pin: int, callback: Callable[[int], None]):
+        with self._lock:
+            self._callbacks.setdefault(pin, []).append(callback)
+
+    def remove_event_detect(self, pin: int):
+        with self._lock:
+            self._edges.pop(pin, None)
+            self._callbacks.pop(pin, None)
+
+    def cleanup(self, pin: int = None):
+        with self._lock:
+            if pin is None:
+                self._edges.clear()
+                self._callbacks.clear()
+            else:
+                self._edges.pop(pin, None)
+                self._callbacks.pop(pin, None)
+
+    # ── Simulation controls ──
+    def set_input(self, pin: int, level: int):
+        """Drives an input pin; fires edge callbacks when the level changes."""
+        with self._lock:
+            previous = self._levels.get(pin, self.LOW)
+            self._levels[pin] = level
+            edge = self._edges.get(pin)
+            callbacks = list(self._callbacks.get(pin, ()))
+        if level == previous or edge is None:
+            return
+        rising = level > previous
+        if edge == self.BOTH or (edge == self.RISING) == rising:
+            for callback in callbacks:
+                self._events.put((callback, pin))
+
+    def bounce(self, pin: int, final_level: int, transitions: int = 6, interval_sec: float = 0.001):
+        """Contact chatter: toggles the pin `transitions` times, then settles on final_level."""
+        level = self.input(pin)
+        for _ in range(transitions):
+            level = self.HIGH - level
+            self.set_input(pin, level)
+            time.sleep(interval_sec)
+        self.set_input(pin, final_level)
+
+    def _dispatch(self):
+        while True:
+            callback, pin = self._events.get()
+            try:
+                callback(pin)
+            except Exception:
+                logger.exception(f"GPIO callback for pin {pin} failed")
+
+
+def main(argv=None) -> int:
+    """
+    Power-loss fast path check on the simulated backend: drives the PLD pin
+    through chattering edges and reports edge → power-event latency.
+    """
+    from src.eps.power_events import ExternalPowerWatcher, PLD_PIN
+    from src.common.config import EPS_PLD_DEBOUNCE_MS
+
+    parser = argparse.ArgumentParser(description="Simulated PLD edges → debounced power events")
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument("--debounce-ms", type=float, default=EPS_PLD_DEBOUNCE_MS)
+    args = parser.parse_args(argv)
+
+    gpio = SimulatedGPIO({PLD_PIN: 0})
+    events: "queue.Queue" = queue.Queue()
+    watcher = ExternalPowerWatcher(
+        lambda external, ts: events.put((external, time.monotonic())),
+        gpio=gpio, debounce_ms=args.debounce_ms,
+    )
+    watcher.start()
+
+    failures = 0
+    for cycle in range(args.cycles):
+        for level in (1, 0):  # AC lost, then AC restored
+            gpio.bounce(PLD_PIN, level)
+            settled_at = time.monotonic()
+            try:
+                external, received_at = events.get(timeout=1.0)
+            except queue.Empty:
+                print(f"cycle {cycle}: no event for level {level}")
+                failures += 1
+                continue
+            time.sleep(2 * args.debounce_ms / 1000)
+            extra = 0
+            while not events.empty():  # chatter must collapse to one event
+                events.get_nowait()
+                extra += 1
+            ok = external == (level == 0) and extra == 0
+            failures += not ok
+            print(f"cycle {cycle}: external_power={external} "
+                  f"{(received_at - settled_at) * 1000:6.1f} ms after last edge (debounce {args.debounce_ms:g} ms)"
+                  f"{'' if ok else f'  UNEXPECTED ({extra} extra events)'}")
+
+    watcher.stop()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -1,55 +1,130 @@
 import logging
-from src.common import setup_logging
-
-setup_logging(
-    log_level = "INFO",
-    log_file  = "eps.log",
-    console   = True
-)
-
 import time
-import json
-from src.common import get_mqtt_client
+from src.common.startup import timeline, announce, first_publish, BackgroundInit
+from src.common.config_manager import config_manager
+from src.common import setup_logging, get_mqtt_client, codec
 from src.common.config import TOPICS, MQTT_BROKER, MQTT_PORT, MQTT_KEEPALIVE
-from src.eps.power_monitor import EPSMonitor
+from src.common.rate_policy import RatePolicy
+from src.common.publish_filter import PublishFilter
+from src.common.anomaly import AnomalyDetector
 
-logger = logging.getLogger(__name__)
+logger = logging.getLogger("src.eps.main")  # run as -m, where __name__ is "__main__"
 
 class EPSService:
     def __init__(self):
         self.mqtt_client = get_mqtt_client("cubesat-eps")
-        self.monitor = EPSMonitor()  # can be False for testing without GPIO
+        self.mqtt_client.on_connect = self.on_mqtt_connect
+        self.mqtt_client.on_message = self.on_mqtt_message
+
+        self.rate_policy = RatePolicy("eps")
+        self.publish_filter = PublishFilter("eps_status")
+        self.anomaly = AnomalyDetector("eps", self.rate_policy, client=self.mqtt_client)
+        # Fuel gauge, GPIO and the sampler come up in the background after MQTT is up
+        self.monitor = None
+        self.sampler = None
+        self.power_watcher = None
+        self.hardware = BackgroundInit("eps-hardware", self._init_hardware)
+
+    def _init_hardware(self):
+        from src.eps.power_monitor import EPSMonitor
+        from src.eps.sampler import EPSSampler
+        from src.eps.power_events import ExternalPowerWatcher
+        # Retried after a failure: keep whatever already came up
+        if self.monitor is None:
+            self.monitor = EPSMonitor()  # can be False for testing without GPIO
+        if self.sampler is None:
+            self.sampler = EPSSampler(self.monitor, on_sample=self.anomaly.observe)
+            self.sampler.start()
+        if self.power_watcher is None:
+            watcher = ExternalPowerWatcher(self.publish_power_event, gpio=self.monitor.gpio)
+            watcher.start()
+            self.power_watcher = watcher
+
+    def on_mqtt_connect(self, client, userdata, flags, rc, properties=None):
+        if rc != 0:
+            logger.error(f"MQTT connection error → rc = {rc}")
+            return
+
+        logger.info(f"MQTT connected (rc={rc}, client_id={client._client_id.decode()})")
+        client.subscribe(TOPICS["obc_status"], qos=1)
+        timeline.mark("mqtt_connected")
+        announce(client, "eps", "alive")
+        config_manager.attach(client, "eps")
+
+    def on_mqtt_message(self, client, userdata, msg):
+        try:
+            if msg.topic == TOPICS["obc_status"]:
+                self.rate_policy.on_obc_status(codec.decode(msg))
+        except Exception as e:
+            logger.error(f"Error processing message {msg.topic}: {e}")
 
     def publish_status(self):
-        status = self.monitor.get_status()
-        logger.info(f"EPS status: {status}")
+        status = self.sampler.get_status()
+        # Observed by the sampler at 1 Hz; the status is smoothed, so a burst adds the raw reading
+        burst = self.anomaly.process(status, observe=False, burst_extra=lambda: {"raw": self.sampler.latest()})
+        if not self.publish_filter.should_publish(status, force=burst):
+            return
+
+        logger.debug(f"EPS status ({self.publish_filter.reason}): {status}, filter={self.publish_filter.stats()}")
 
-        self.mqtt_client.publish(
-            TOPICS["eps_status"],
-            json.dumps(status),
+        codec.publish(
+            self.mqtt_client,
+            "eps_status",
+            status,
             qos=1,
             retain=True  # always keep the latest status
         )
+        first_publish(self.mqtt_client, "eps")
+
+    def publish_power_event(self, external_power: bool, edge_timestamp: float):
+        """Called from the PLD watcher thread as soon as the power source change has settled."""
+        event = {
+            "timestamp": time.time(),
+            "external_power": external_power,
+            "edge_timestamp": edge_timestamp,
+        }
+        codec.publish(self.mqtt_client, "eps_power_event", event, qos=1)
+        logger.warning(f"External power {'restored' if external_power else 'LOST'} "
+                       f"({(event['timestamp'] - edge_timestamp) * 1000:.0f} ms after edge)")
 
     def run(self):
         self.mqtt_client.connect(MQTT_BROKER, MQTT_PORT, keepalive=MQTT_KEEPALIVE)
         self.mqtt_client.loop_start()
-
+        config_manager.start()
+        self.hardware.start()
         logger.info("EPS service started")
 
         try:
+            self.hardware.wait()
             while True:
                 self.publish_status()
-                time.sleep(30)  # update every 30 seconds — can be reduced to 10–15
+                self.rate_policy.wait()  # 30 s in NOMINAL (anomaly.services.eps during a burst)
         except KeyboardInterrupt:
             logger.info("Stopping EPS service")
         except Exception as e:
             logger.exception("Critical error in main EPS loop")
         finally:
+            config_manager.stop()
+            self.hardware.stop()
+            if self.power_watcher:
+                self.power_watcher.stop()
+            if self.sampler:
+                self.sampler.stop()
             self.mqtt_client.loop_stop()
             self.mqtt_client.disconnect()
             logger.info("EPS service stopped")
 
-if __name__ == "__main__":
+def main():
+    timeline.mark("imports")
+    setup_logging(
+        log_level = "INFO",
+        log_file  = "eps.log",
+        console   = True
+    )
+    timeline.mark("logging")
     service = EPSService()
-    service.run()
\ No newline at end of file
+    timeline.mark("constructed")
+    service.run()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,102 @@
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from src.common.config import EPS_PLD_DEBOUNCE_MS
+
+logger = logging.getLogger(__name__)
+
+PLD_PIN = 6  # GPIO pin connected to the PLD signal from the Geekworm UPS HAT (0 = AC OK, 1 = AC Lost)
+
+
+def pld_external_power(level: int) -> bool:
+    """According to Geekworm documentation: 0 = AC OK (external present), 1 = AC Lost"""
+    return level == 0
+
+
+class ExternalPowerWatcher:
+    """
+    Edge-triggered external power detection on the PLD pin.
+
+    Both edges are reported by the GPIO backend (RPi.GPIO or SimulatedGPIO);
+    a burst of edges is debounced in software: the level is read once no edge
+    arrived for debounce_ms, and on_change(external_power, edge_timestamp) is
+    called only when that settled level differs from the last reported one.
+    edge_timestamp is the wall time of the first edge of the burst.
+    """
+
+    def __init__(self, on_change: Callable[[bool, float], None], gpio,
+                 pin: int = PLD_PIN, debounce_ms: float = EPS_PLD_DEBOUNCE_MS):
+        self.on_change = on_change
+        self.gpio = gpio
+        self.pin = pin
+        self.debounce_sec = max(0.0, debounce_ms) / 1000.0
+        self.external_power: Optional[bool] = None
+        self.edges = 0
+        self.events = 0
+
+        self._cond = threading.Condition()
+        self._last_edge = 0.0
+        self._burst_started: Optional[float] = None
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.external_power = pld_external_power(self.gpio.input(self.pin))
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name="pld-watch", daemon=True)
+        self._thread.start()
+        self.gpio.add_event_detect(self.pin, self.gpio.BOTH, callback=self._on_edge)
+        logger.info(f"PLD edge detection on GPIO {self.pin} "
+                    f"(debounce {self.debounce_sec * 1000:g} ms, external_power={self.external_power})")
+
+    def stop(self):
+        try:
+            self.gpio.remove_event_detect(self.pin)
+        except Exception as e:
+            logger.debug(f"remove_event_detect: {e}")
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def _on_edge(self, pin: int):
+        # GPIO event thread: timestamp and hand over, nothing else
+        with self._cond:
+            self.edges += 1
+            self._last_edge = time.monotonic()
+            if self._burst_started is None:
+                self._burst_started = time.time()
+            self._cond.notify()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._running and self._burst_started is None:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                # Wait until the line has been quiet for the debounce period
+                remaining = self._last_edge + self.debounce_sec - time.monotonic()
+                while self._running and remaining > 0:
+                    self._cond.wait(remaining)
+                    remaining = self._last_edge + self.debounce_sec - time.monotonic()
+                if not self._running:
+                    return
+                edge_timestamp, self._burst_started = self._burst_started, None
+
+            try:
+                external = pld_external_power(self.gpio.input(self.pin))
+            except Exception as e:
+                logger.error(f"GPIO read error: {e}")
+                continue
+            if external == self.external_power:
+                continue  # glitch: settled back to the reported level
+            self.external_power = external
+            self.events += 1
+            try:
+                self.on_change(external, edge_timestamp)
+            except Exception:
+                logger.exception("Power event handler failed")
@@ -1,49 +1,52 @@
-import smbus2
 import time
 import logging
 from typing import Dict, Optional
 import RPi.GPIO as GPIO
 
+from src.common.i2c_bus import get_i2c_bus
+from src.eps.power_events import PLD_PIN, pld_external_power
+
 logger = logging.getLogger(__name__)
 
-I2C_BUS = 1
 BATTERY_I2C_ADDR = 0x36
 REG_VCELL = 0x02
 REG_SOC = 0x04
 
-PLD_PIN = 6  # GPIO pin connected to the PLD signal from the Geekworm UPS HAT (0 = AC OK, 1 = AC Lost)
-
 class EPSMonitor:
-    def __init__(self):
-        self.bus = smbus2.SMBus(I2C_BUS)
+    def __init__(self, gpio=None):
+        self.bus = get_i2c_bus("eps")
+        self.gpio = gpio or GPIO  # RPi.GPIO, or a SimulatedGPIO stand-in
         try:
-            GPIO.setwarnings(False)
-            GPIO.setmode(GPIO.BCM)
-            GPIO.setup(PLD_PIN, GPIO.IN)
-            logger.info(f"RPi.GPIO initialized for PLD_PIN={PLD_PIN}")
+            self.gpio.setwarnings(False)
+            self.gpio.setmode(self.gpio.BCM)
+            self.gpio.setup(PLD_PIN, self.gpio.IN)
+            logger.info(f"GPIO initialized for PLD_PIN={PLD_PIN}")
         except Exception as e:
             logger.error(f"GPIO setup error: {e}")
             raise
 
-    def read_word(self, reg: int) -> int:
+    def read_word(self, reg: int) -> Optional[int]:
+        """
+        Reads a 16-bit MAX17048 register (big-endian) in one I2C transaction,
+        so MSB and LSB always come from the same conversion. None on I2C error.
+        """
         try:
-            msb = self.bus.read_byte_data(BATTERY_I2C_ADDR, reg)
-            lsb = self.bus.read_byte_data(BATTERY_I2C_ADDR, reg + 1)
+            msb, lsb = self.bus.read_i2c_block_data(BATTERY_I2C_ADDR, reg, 2)
             return (msb << 8) | lsb
         except Exception as e:
             logger.error(f"I2C error reading 0x{reg:02X}: {e}")
-            return 0
+            return None
 
     def get_battery_voltage(self) -> Optional[float]:
         raw = self.read_word(REG_VCELL)
-        if raw == 0:
+        if not raw:
             return None
         voltage = (raw >> 4) * 0.00125
         return round(voltage, 3)
 
     def get_battery_percent(self) -> Optional[float]:
         raw = self.read_word(REG_SOC)
-        if raw == 0:
+        if not raw:
             return None
         percent = raw / 256.0
         percent = max(0.0, min(100.0, percent))
@@ -52,9 +55,8 @@ class EPSMonitor:
     def get_external_power(self) -> bool:
         """True = on external power (AC), False = on battery"""
         try:
-            pin_value = GPIO.input(PLD_PIN)
-            # According to Geekworm documentation: 0 = AC OK (external present), 1 = AC Lost
-            is_ac_present = (pin_value == 0)
+            pin_value = self.gpio.input(PLD_PIN)
+            is_ac_present = pld_external_power(pin_value)
             logger.debug(f"PLD_PIN = {pin_value}, external_power = {is_ac_present}")
             return is_ac_present
         except Exception as e:
@@ -73,6 +75,6 @@ class EPSMonitor:
 
     def __del__(self):
         try:
-            GPIO.cleanup()
+            self.gpio.cleanup()
         except Exception as e:
             logger.debug(f"GPIO cleanup not required: {e}")
@@ -0,0 +1,154 @@
+import logging
+import threading
+import time
+from collections import deque
+from statistics import median
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from src.common.config import (
+    EPS_SAMPLE_INTERVAL_SEC, EPS_TREND_WINDOW_SEC, EPS_MEDIAN_SAMPLES, EPS_SOC_EWMA_ALPHA
+)
+
+logger = logging.getLogger(__name__)
+
+# Discharge slower than this (%/h) is treated as "not discharging": no time-to-empty
+MIN_DISCHARGE_PCT_H = 0.05
+
+
+def _slope_per_hour(points: Deque[Tuple[float, float]]) -> Optional[float]:
+    """Least-squares slope of (t_sec, value) points, in units per hour."""
+    n = len(points)
+    if n < 2:
+        return None
+    mean_t = sum(t for t, _ in points) / n
+    mean_v = sum(v for _, v in points) / n
+    var_t = sum((t - mean_t) ** 2 for t, _ in points)
+    if var_t == 0:
+        return None
+    cov = sum((t - mean_t) * (v - mean_v) for t, v in points)
+    return cov / var_t * 3600.0
+
+
+class EPSSampler:
+    """
+    Samples the MAX17048 at ~1 Hz on a background thread and keeps a ring
+    buffer of recent readings, so the published status is smoothed and a
+    single bad I2C read cannot drive OBC mode changes.
+
+    - SOC: median of the last few samples (rejects single-read spikes),
+      then an EWMA.
+    - Voltage: median of the last few samples.
+    - Voltage trend and discharge rate: least-squares slopes over the window.
+    - Time to empty: filtered SOC / discharge rate while discharging.
+
+    on_sample, if given, is called as on_sample(reading, t) for every raw
+    reading ({"voltage", "battery"}) on the sampler thread, with t the
+    time.monotonic() of the read: anomaly detection sees 1 Hz data at its
+    real spacing, not the smoothed status published every 30 s.
+    """
+
+    def __init__(self, monitor,
+                 interval_sec: float = EPS_SAMPLE_INTERVAL_SEC,
+                 window_sec: float = EPS_TREND_WINDOW_SEC,
+                 median_samples: int = EPS_MEDIAN_SAMPLES,
+                 ewma_alpha: float = EPS_SOC_EWMA_ALPHA,
+                 on_sample: Callable[[Dict, float], object] = None):
+        self.monitor = monitor
+        self.on_sample = on_sample
+        self.interval_sec = interval_sec
+        self.window_sec = window_sec
+        self.median_samples = max(1, median_samples)
+        self.ewma_alpha = ewma_alpha
+
+        capacity = max(2, int(window_sec / interval_sec) + 1)
+        self._voltage: Deque[Tuple[float, float]] = deque(maxlen=capacity)
+        self._soc: Deque[Tuple[float, float]] = deque(maxlen=capacity)
+        self._filtered_soc: Deque[Tuple[float, float]] = deque(maxlen=capacity)
+        self._soc_ewma: Optional[float] = None
+        self.read_errors = 0
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.sample()  # first reading before the first publish
+        self._thread = threading.Thread(target=self._loop, name="eps-sampler", daemon=True)
+        self._thread.start()
+        logger.info(f"EPS sampler started ({1 / self.interval_sec:g} Hz, window {self.window_sec:g}s)")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2 * self.interval_sec)
+
+    def _loop(self):
+        next_at = time.monotonic()
+        while True:
+            next_at += self.interval_sec
+            if self._stop.wait(max(0.0, next_at - time.monotonic())):
+                return
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"EPS sample failed: {e}")
+
+    def sample(self):
+        """Takes one VCELL + SOC reading into the ring buffers."""
+        now = time.monotonic()
+        voltage = self.monitor.get_battery_voltage()
+        soc = self.monitor.get_battery_percent()
+
+        with self._lock:
+            if voltage is None or soc is None:
+                self.read_errors += 1
+            if voltage is not None:
+                self._voltage.append((now, voltage))
+            if soc is not None:
+                self._soc.append((now, soc))
+                recent = [v for _, v in list(self._soc)[-self.median_samples:]]
+                soc_median = median(recent)
+                if self._soc_ewma is None:
+                    self._soc_ewma = soc_median
+                else:
+                    self._soc_ewma += self.ewma_alpha * (soc_median - self._soc_ewma)
+                self._filtered_soc.append((now, self._soc_ewma))
+
+        if self.on_sample is not None:
+            self.on_sample({"voltage": voltage, "battery": soc}, now)
+
+    def latest(self) -> Dict:
+        """Last raw (unfiltered) reading."""
+        with self._lock:
+            return {
+                "voltage": self._voltage[-1][1] if self._voltage else None,
+                "battery": self._soc[-1][1] if self._soc else None,
+            }
+
+    def get_status(self) -> Dict:
+        """EPS status from the filtered buffers; same keys as EPSMonitor.get_status() plus estimates."""
+        with self._lock:
+            voltage = None
+            if self._voltage:
+                voltage = median(v for _, v in list(self._voltage)[-self.median_samples:])
+            battery = self._soc_ewma
+            voltage_trend = _slope_per_hour(self._voltage)
+            soc_slope = _slope_per_hour(self._filtered_soc)
+
+        discharge_rate = -soc_slope if soc_slope is not None else None
+        time_to_empty = None
+        if battery is not None and discharge_rate is not None and discharge_rate > MIN_DISCHARGE_PCT_H:
+            time_to_empty = int(battery / discharge_rate * 3600)
+
+        return {
+            "timestamp": time.time(),
+            "battery": round(battery, 2) if battery is not None else None,
+            "voltage": round(voltage, 3) if voltage is not None else None,
+            "external_power": self.monitor.get_external_power(),
+            "discharge_rate_pct_h": round(discharge_rate, 2) if discharge_rate is not None else None,
+            "voltage_trend_v_h": round(voltage_trend, 3) if voltage_trend is not None else None,
+            "time_to_empty_sec": time_to_empty,
+        }
@@ -0,0 +1,235 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from src.common.config import I2C_PRIORITIES, I2C_DEFAULT_PRIORITY, I2C_BATCH_MAX
+from src.common.i2c_bus import I2CBackend, READ_OPS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(order=True)
+class Transaction:
+    """A client's list of ops, executed back-to-back on the bus."""
+    priority: int
+    seq: int
+    service: str = field(compare=False)
+    ops: List[list] = field(compare=False)
+    enqueued_at: float = field(compare=False, default_factory=time.monotonic)
+    results: Optional[list] = field(compare=False, default=None)
+    error: Optional[OSError] = field(compare=False, default=None)
+    done: threading.Event = field(compare=False, default_factory=threading.Event)
+
+    def read_only_key(self):
+        """Hashable key for coalescing identical read-only transactions, else None."""
+        if all(op[0] in READ_OPS for op in self.ops):
+            return tuple(tuple(op) for op in self.ops)
+        return None
+
+
+class DeviceStats:
+    """Counters for one I2C address."""
+    __slots__ = ("transactions", "ops", "errors", "bus_time", "latency_total", "latency_max")
+
+    def __init__(self):
+        self.transactions = 0
+        self.ops = 0
+        self.errors = 0
+        self.bus_time = 0.0        # seconds spent executing ops on this device
+        self.latency_total = 0.0   # enqueue → done, summed over transactions
+        self.latency_max = 0.0
+
+    def snapshot(self) -> Dict:
+        n = self.transactions
+        return {
+            "transactions":   n,
+            "ops":            self.ops,
+            "errors":         self.errors,
+            "error_rate":     round(self.errors / self.ops, 4) if self.ops else 0.0,
+            "avg_latency_ms": round(self.latency_total / n * 1000, 3) if n else None,
+            "max_latency_ms": round(self.latency_max * 1000, 3),
+            "avg_bus_ms":     round(self.bus_time / n * 1000, 3) if n else None,
+        }
+
+
+class I2CArbiter:
+    """
+    Single owner of the I2C bus. Transactions from all services queue here
+    and run one at a time on a worker thread, lowest priority value first
+    (per-service priorities from config: the IMU's ADCS reads go first).
+
+    The worker takes up to batch_max queued transactions per wake-up, in
+    priority order; identical read-only transactions in the same batch
+    (two clients polling the same register) run once and share the result.
+    """
+
+    def __init__(self, backend: I2CBackend, priorities: Dict[str, int] = None,
+                 batch_max: int = I2C_BATCH_MAX):
+        self.backend = backend
+        self.priorities = dict(I2C_PRIORITIES if priorities is None else priorities)
+        self.batch_max = max(1, batch_max)
+
+        self._queue: List[Transaction] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        self._stats_lock = threading.Lock()
+        self._devices: Dict[int, DeviceStats] = {}
+        self._services: Dict[str, Dict[str, int]] = {}
+        self._transactions = 0
+        self._batches = 0
+        self._coalesced = 0
+        self._busy_time = 0.0
+        self._max_queue_depth = 0
+        self._window_started = time.monotonic()
+        self._window_busy = 0.0
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._worker, name="i2c-arbiter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            pending, self._queue = self._queue, []
+            self._cond.notify_all()
+        for txn in pending:
+            txn.error = OSError(108, "I2C arbiter shutting down")
+            txn.done.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        self.backend.close()
+
+    def submit(self, service: str, ops: List[list], priority: Optional[int] = None) -> Transaction:
+        if priority is None:
+            priority = self.priorities.get(service, I2C_DEFAULT_PRIORITY)
+        txn = Transaction(priority, next(self._seq), service, ops)
+        with self._cond:
+            if not self._running:
+                txn.error = OSError(108, "I2C arbiter not running")
+                txn.done.set()
+                return txn
+            heapq.heappush(self._queue, txn)
+            self._max_queue_depth = max(self._max_queue_depth, len(self._queue))
+            self._cond.notify()
+        return txn
+
+    def execute(self, service: str, ops: List[list], priority: Optional[int] = None,
+                timeout: Optional[float] = None) -> list:
+        """Submits and waits; returns results or raises OSError."""
+        txn = self.submit(service, ops, priority)
+        if not txn.done.wait(timeout):
+            with self._cond:
+                queued = txn in self._queue
+                if queued:
+                    self._queue.remove(txn)
+                    heapq.heapify(self._queue)
+            if queued:
+                raise OSError(110, f"I2C transaction timed out after {timeout:g}s in queue")
+            txn.done.wait()  # already on the bus: its writes happen, so report the real outcome
+        if txn.error is not None:
+            raise txn.error
+        return txn.results
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    # ── Worker ──
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._running and not self._queue:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                batch = [heapq.heappop(self._queue) for _ in range(min(self.batch_max, len(self._queue)))]
+
+            shared: Dict[tuple, Transaction] = {}
+            for txn in batch:
+                key = txn.read_only_key()
+                leader = shared.get(key) if key is not None else None
+                if leader is not None:
+                    txn.results, txn.error = leader.results, leader.error
+                    with self._stats_lock:
+                        self._coalesced += 1
+                    self._finish(txn, {})
+                    continue
+                self._run(txn)
+                if key is not None:
+                    shared[key] = txn
+
+            with self._stats_lock:
+                self._batches += 1
+
+    def _run(self, txn: Transaction):
+        results = []
+        bus_time: Dict[int, float] = {}
+        errors: Dict[int, int] = {}
+        for op in txn.ops:
+            addr = op[1]
+            start = time.perf_counter()
+            try:
+                results.append(self.backend.execute(op))
+            except Exception as e:
+                errors[addr] = errors.get(addr, 0) + 1
+                txn.error = e if isinstance(e, OSError) else OSError(22, str(e))
+                break
+            finally:
+                bus_time[addr] = bus_time.get(addr, 0.0) + time.perf_counter() - start
+        else:
+            txn.results = results
+        self._finish(txn, bus_time, errors)
+
+    def _finish(self, txn: Transaction, bus_time: Dict[int, float], errors: Dict[int, int] = None):
+        latency = time.monotonic() - txn.enqueued_at
+        errors = errors or {}
+        with self._stats_lock:
+            self._transactions += 1
+            service = self._services.get(txn.service)
+            if service is None:
+                service = self._services[txn.service] = {"transactions": 0, "errors": 0}
+            service["transactions"] += 1
+            service["errors"] += txn.error is not None
+            for addr in {op[1] for op in txn.ops}:
+                stats = self._devices.get(addr)
+                if stats is None:
+                    stats = self._devices[addr] = DeviceStats()
+                stats.transactions += 1
+                stats.ops += sum(1 for op in txn.ops if op[1] == addr)
+                stats.errors += errors.get(addr, 0)
+                stats.bus_time += bus_time.get(addr, 0.0)
+                stats.latency_total += latency
+                stats.latency_max = max(stats.latency_max, latency)
+            spent = sum(bus_time.values())
+            self._busy_time += spent
+            self._window_busy += spent
+        txn.done.set()
+
+    # ── Stats ──
+    def snapshot(self) -> Dict:
+        """Totals since start plus bus utilization since the previous snapshot."""
+        now = time.monotonic()
+        with self._stats_lock:
+            window = now - self._window_started
+            utilization = self._window_busy / window * 100 if window > 0 else 0.0
+            self._window_started, self._window_busy = now, 0.0
+            snapshot = {
+                "utilization_pct": round(utilization, 2),
+                "transactions":    self._transactions,
+                "batches":         self._batches,
+                "coalesced":       self._coalesced,
+                "max_queue_depth": self._max_queue_depth,
+                "bus_busy_sec":    round(self._busy_time, 3),
+                "devices":         {f"0x{addr:02x}": s.snapshot() for addr, s in sorted(self._devices.items())},
+                "services":        {name: dict(s) for name, s in sorted(self._services.items())},
+            }
+        snapshot["queue_depth"] = self.queue_depth()
+        return snapshot
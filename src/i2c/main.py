@@ -0,0 +1,91 @@
+import logging
+import time
+from src.common.startup import timeline, announce, first_publish
+from src.common.config_manager import config_manager
+from src.common import setup_logging, get_mqtt_client, codec
+from src.common.config import TOPICS, MQTT_BROKER, MQTT_PORT, MQTT_KEEPALIVE, I2C_SOCKET_PATH, I2C_BACKEND
+from src.common.i2c_bus import create_backend
+from src.common.rate_policy import RatePolicy
+from src.i2c.arbiter import I2CArbiter
+from src.i2c.server import I2CSocketServer
+
+logger = logging.getLogger("src.i2c.main")  # run as -m, where __name__ is "__main__"
+
+class I2CService:
+    """Owns /dev/i2c-1 for all services; publishes bus statistics on cubesat/i2c/status."""
+
+    def __init__(self):
+        self.mqtt_client = get_mqtt_client("cubesat-i2c")
+        self.mqtt_client.on_connect = self.on_mqtt_connect
+        self.mqtt_client.on_message = self.on_mqtt_message
+
+        self.rate_policy = RatePolicy("i2c")
+        self.arbiter = I2CArbiter(create_backend(I2C_BACKEND))
+        self.server = I2CSocketServer(self.arbiter, I2C_SOCKET_PATH)
+
+    def on_mqtt_connect(self, client, userdata, flags, rc, properties=None):
+        if rc != 0:
+            logger.error(f"MQTT connection error → rc = {rc}")
+            return
+
+        logger.info(f"MQTT connected (rc={rc}, client_id={client._client_id.decode()})")
+        client.subscribe(TOPICS["obc_status"], qos=1)
+        timeline.mark("mqtt_connected")
+        announce(client, "i2c", "alive")
+        config_manager.attach(client, "i2c")
+
+    def on_mqtt_message(self, client, userdata, msg):
+        try:
+            if msg.topic == TOPICS["obc_status"]:
+                self.rate_policy.on_obc_status(codec.decode(msg))
+        except Exception as e:
+            logger.error(f"Error processing message {msg.topic}: {e}")
+
+    def publish_status(self):
+        status = {"timestamp": time.time(), "clients": self.server.clients, **self.arbiter.snapshot()}
+        logger.info(f"I2C bus: {status['utilization_pct']}% busy, {status['transactions']} transactions, "
+                    f"{status['coalesced']} coalesced, queue max {status['max_queue_depth']}")
+        codec.publish(self.mqtt_client, "i2c_status", status, qos=0)
+        first_publish(self.mqtt_client, "i2c")
+
+    def run(self):
+        # The bus must be served before MQTT comes up: sensor services block on it at startup
+        self.arbiter.start()
+        self.server.start()
+        timeline.mark("hardware_ready")
+        logger.info(f"I2C arbiter started (backend: {I2C_BACKEND})")
+
+        self.mqtt_client.connect(MQTT_BROKER, MQTT_PORT, keepalive=MQTT_KEEPALIVE)
+        self.mqtt_client.loop_start()
+        config_manager.start()
+
+        try:
+            while True:
+                self.rate_policy.wait()  # see publish_intervals.i2c
+                self.publish_status()
+        except KeyboardInterrupt:
+            logger.info("Stopping I2C service")
+        except Exception as e:
+            logger.exception("Critical error in I2C service loop")
+        finally:
+            config_manager.stop()
+            self.server.stop()
+            self.arbiter.stop()
+            self.mqtt_client.loop_stop()
+            self.mqtt_client.disconnect()
+            logger.info("I2C service stopped")
+
+def main():
+    timeline.mark("imports")
+    setup_logging(
+        log_level = "INFO",
+        log_file  = "i2c.log",
+        console   = True
+    )
+    timeline.mark("logging")
+    service = I2CService()
+    timeline.mark("constructed")
+    service.run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import logging
+import os
+import socket
+import threading
+from pathlib import Path
+from typing import Optional
+
+from src.common.config import I2C_QUEUE_TIMEOUT_SEC
+from src.common.i2c_bus import OP_READ_BYTE, OP_WRITE_BYTE, OP_READ_BLOCK, OP_WRITE_BLOCK, OP_READ_RAW, OP_WRITE_RAW
+from src.common.i2c_client import send_frame, recv_frame
+from src.i2c.arbiter import I2CArbiter
+
+logger = logging.getLogger(__name__)
+
+_VALID_OPS = {OP_READ_BYTE, OP_WRITE_BYTE, OP_READ_BLOCK, OP_WRITE_BLOCK, OP_READ_RAW, OP_WRITE_RAW}
+
+
+def _validate(ops) -> Optional[str]:
+    if not isinstance(ops, list) or not ops:
+        return "ops must be a non-empty list"
+    for op in ops:
+        if not isinstance(op, list) or len(op) != 4 or op[0] not in _VALID_OPS:
+            return f"malformed op {op!r}"
+        if not isinstance(op[1], int) or not 0x03 <= op[1] <= 0x77:
+            return f"invalid I2C address {op[1]!r}"
+    return None
+
+
+class I2CSocketServer:
+    """
+    Unix socket front end of the arbiter (framing in src/common/i2c_client.py).
+    One thread per connected client; each request becomes one arbiter transaction.
+    """
+
+    def __init__(self, arbiter: I2CArbiter, socket_path: str):
+        self.arbiter = arbiter
+        self.socket_path = Path(socket_path)
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self.clients = 0
+
+    def start(self):
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            self.socket_path.unlink()  # stale socket from a previous run
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(str(self.socket_path))
+        os.chmod(self.socket_path, 0o660)
+        sock.listen(16)
+        self._sock = sock
+        self._thread = threading.Thread(target=self._accept_loop, name="i2c-accept", daemon=True)
+        self._thread.start()
+        logger.info(f"I2C arbiter listening on {self.socket_path}")
+
+    def stop(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _accept_loop(self):
+        while self._sock is not None:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return  # socket closed by stop()
+            threading.Thread(target=self._serve, args=(conn,), name="i2c-client", daemon=True).start()
+
+    def _serve(self, conn: socket.socket):
+        service = "unknown"
+        self.clients += 1
+        try:
+            hello = recv_frame(conn)
+            service = str(hello.get("service", service))
+            logger.info(f"I2C client connected: {service}")
+            while True:
+                request = recv_frame(conn)
+                response = {"id": request.get("id")}
+                error = _validate(request.get("ops"))
+                if error:
+                    response.update(error=error, errno=22)
+                else:
+                    try:
+                        response["results"] = self.arbiter.execute(
+                            service, request["ops"], request.get("priority"), timeout=I2C_QUEUE_TIMEOUT_SEC
+                        )
+                    except OSError as e:
+                        response.update(error=str(e), errno=e.errno)
+                send_frame(conn, response)
+        except ConnectionError:
+            pass
+        except Exception as e:
+            logger.error(f"I2C client {service}: {e}")
+        finally:
+            self.clients -= 1
+            conn.close()
+            logger.info(f"I2C client disconnected: {service}")
@@ -1,43 +1,177 @@
-import json
 import logging
+import time
+from src.common import codec
+from src.common.command_executor import build_ack
+from src.common.config_manager import config_manager
 
 logger = logging.getLogger(__name__)
 
 class OBCMessageHandlers:
+    # Commands on TOPICS["command"] owned by the OBC; the rest belong to other services
+    COMMANDS = ('science_start', 'science_stop', 'safe_mode', 'recover', 'get_state_journal',
+                'schedule_command', 'cancel_scheduled', 'get_schedule', 'reload_config')
+
     def __init__(self, obc):
         self.obc = obc
+        self.battery = None  # last valid filtered SOC from eps_status, reused by power events
 
-    def handle_eps_status(self, payload):
+    def handle_eps_status(self, data):
         try:
-            data = json.loads(payload)
             battery = data.get('battery', 100)
             external = data.get('external_power', False)
 
-            if battery < 20:
-                self.obc.state_machine.enter_safe_mode()
-            elif battery < 40 and self.obc.state_machine.state not in ['LOW_POWER', 'SAFE']:
-                self.obc.state_machine.enter_low_power()
-            elif external and self.obc.state_machine.state in ['LOW_POWER', 'SAFE']:
-                self.obc.state_machine.recover()
+            if battery is None:
+                # No valid SOC yet (sampler still filling, or gauge unreadable): keep the current mode
+                logger.warning("EPS status without battery level; ignoring")
+                return
+            self.battery = battery
+            self._evaluate_power(battery, external)
         except Exception as e:
             logger.error(f"Error processing EPS status: {e}")
 
-    def handle_command(self, payload):
+    def handle_power_event(self, data):
+        """PLD edge from EPS: re-evaluate at once with the cached battery level."""
+        try:
+            external = data.get('external_power', False)
+            edge = data.get('edge_timestamp')
+            latency = f", {(time.time() - edge) * 1000:.0f} ms after edge" if edge else ""
+            logger.warning(f"Power event: external_power={external}{latency}")
+            if self.battery is None:
+                # No battery level yet: only act on power returning
+                if external and self.obc.state_machine.state in ['LOW_POWER', 'SAFE']:
+                    self.obc.state_machine.recover(cause="external power restored")
+                return
+            self._evaluate_power(self.battery, external)
+        except Exception as e:
+            logger.error(f"Error processing power event: {e}")
+
+    def _evaluate_power(self, battery, external):
+        if battery < 20:
+            self.obc.state_machine.enter_safe_mode(cause=f"battery {battery}%")
+        elif battery < 40 and self.obc.state_machine.state not in ['LOW_POWER', 'SAFE']:
+            self.obc.state_machine.enter_low_power(cause=f"battery {battery}%")
+        elif external and self.obc.state_machine.state in ['LOW_POWER', 'SAFE']:
+            self.obc.state_machine.recover(cause=f"external power, battery {battery}%")
+
+    def handle_command(self, cmd):
         try:
-            cmd = json.loads(payload)
             command = cmd.get('command')
             logger.info(f"Command received: {command}")
 
+            cause = f"command {command}"
             if command == 'science_start':
                 if self.obc.state_machine.state == 'NOMINAL':
-                    self.obc.state_machine.start_science()
+                    self.obc.state_machine.start_science(cause=cause)
             elif command == 'science_stop':
                 if self.obc.state_machine.state == 'SCIENCE':
-                    self.obc.state_machine.end_science()
+                    self.obc.state_machine.end_science(cause=cause)
             elif command == 'safe_mode':
-                self.obc.state_machine.enter_safe_mode()
+                self.obc.state_machine.enter_safe_mode(cause=cause)
             elif command == 'recover':
-                self.obc.state_machine.recover()
+                self.obc.state_machine.recover(cause=cause)
+            elif command == 'get_state_journal':
+                self.publish_journal(cmd)
+            elif command == 'schedule_command':
+                self.schedule(cmd)
+            elif command == 'cancel_scheduled':
+                params = cmd.get('params') or {}
+                cancelled = self.obc.scheduler.cancel(params.get('id'))
+                logger.info(f"Cancelled scheduled commands: {cancelled or 'none'}")
+                self.publish_schedule(cmd)
+            elif command == 'get_schedule':
+                self.publish_schedule(cmd)
+            elif command == 'reload_config':
+                self.reload_config(cmd)
             # Add your own commands
         except Exception as e:
             logger.error(f"Error processing command: {e}")
+
+    def publish_journal(self, cmd):
+        """
+        {"command": "get_state_journal", "request_id": "...", "params": {"since": <unix>, "limit": 50}}
+        → cubesat/obc/journal
+        """
+        params = cmd.get('params') or {}
+        journal = self.obc.journal
+        codec.publish(
+            self.obc.mqtt_client,
+            "obc_journal",
+            {
+                "timestamp":  time.time(),
+                "request_id": cmd.get('request_id'),
+                "state":      self.obc.state_machine.state,
+                "records":    journal.query(params.get('since'), params.get('until'), params.get('limit', 50)),
+            },
+            qos=1
+        )
+
+    def reload_config(self, cmd):
+        """
+        Checks config.yaml and, if valid, asks every service (this one included)
+        to reload it on cubesat/config/reload; each answers on cubesat/config/status.
+        An invalid file is rejected here, so no service sees a half-applied plan.
+        """
+        errors = config_manager.check()
+        if errors:
+            logger.warning(f"reload_config rejected: {'; '.join(errors)}")
+            codec.publish(
+                self.obc.mqtt_client,
+                "command_ack",
+                build_ack(cmd.get('command'), cmd.get('request_id'), "REJECTED", "; ".join(errors[:5])),
+                qos=1
+            )
+            return
+        codec.publish(
+            self.obc.mqtt_client,
+            "config_reload",
+            {"timestamp": time.time(), "request_id": cmd.get('request_id')},
+            qos=1
+        )
+
+    def schedule(self, cmd):
+        """
+        Queues one entry, or a whole plan with params {"entries": [...]}; all or nothing.
+        Entry: {"command": {...}, "at": <unix> | "delay_sec": <s>, "repeat_sec", "count",
+                "expire_at", "states", "id"}
+        """
+        params = cmd.get('params') or {}
+        added = []
+        try:
+            if not isinstance(params, dict):
+                raise ValueError("params must be an object")
+            entries = params.get('entries') or [params]
+            if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+                raise ValueError("entries must be a list of objects")
+            for entry in entries:
+                at = entry.get('at')
+                if at is None:
+                    at = time.time() + float(entry.get('delay_sec', 0))
+                added.append(self.obc.scheduler.add(
+                    entry.get('command'), float(at),
+                    repeat_sec=entry.get('repeat_sec'),
+                    count=entry.get('count'),
+                    expire_at=entry.get('expire_at'),
+                    states=entry.get('states'),
+                    entry_id=entry.get('id'),
+                ).id)
+        except (TypeError, ValueError) as e:
+            for entry_id in added:
+                self.obc.scheduler.cancel(entry_id)
+            logger.warning(f"Schedule request rejected: {e}")
+            codec.publish(
+                self.obc.mqtt_client,
+                "command_ack",
+                build_ack(cmd.get('command'), cmd.get('request_id'), "REJECTED", str(e)),
+                qos=1
+            )
+            return
+        self.publish_schedule(cmd)
+
+    def publish_schedule(self, cmd):
+        """Pending entries and dispatch statistics → cubesat/obc/schedule"""
+        codec.publish(
+            self.obc.mqtt_client,
+            "obc_schedule",
+            {"timestamp": time.time(), "request_id": cmd.get('request_id'), **self.obc.scheduler.snapshot()},
+            qos=1
+        )
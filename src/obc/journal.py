@@ -0,0 +1,129 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.common.config import (
+    OBC_JOURNAL_PATH, OBC_JOURNAL_FSYNC_INTERVAL_SEC, OBC_JOURNAL_SYNC_STATES, OBC_JOURNAL_MAX_ENTRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class StateJournal:
+    """
+    Append-only OBC transition log: one JSON line per state entered
+    {"ts", "state", "source", "trigger", "cause"}.
+
+    Each record is written and flushed to the OS at once, but fsync() is
+    batched: a background thread syncs every fsync_interval_sec, while
+    entering one of sync_states (SAFE, LOW_POWER) syncs before returning,
+    so the states a warm restart must not lose are always durable.
+    A torn last line (power cut mid-write) is dropped when loading.
+    """
+
+    def __init__(self, path: str = OBC_JOURNAL_PATH,
+                 fsync_interval_sec: float = OBC_JOURNAL_FSYNC_INTERVAL_SEC,
+                 sync_states: List[str] = None,
+                 max_entries: int = OBC_JOURNAL_MAX_ENTRIES):
+        self.path = Path(path)
+        self.fsync_interval_sec = fsync_interval_sec
+        self.sync_states = set(OBC_JOURNAL_SYNC_STATES if sync_states is None else sync_states)
+        self.max_entries = max_entries
+
+        self.records: List[Dict] = self._load()
+        if len(self.records) > max_entries:
+            self._compact()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "a", encoding="utf-8")
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sync_loop, name="obc-journal", daemon=True)
+        self._thread.start()
+
+    # ── Startup ──
+    def _load(self) -> List[Dict]:
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        if data and not data.endswith(b"\n"):
+            # Torn last record: cut it off so the next append starts on a fresh line
+            keep = data.rfind(b"\n") + 1
+            logger.warning(f"State journal: dropping incomplete last record ({len(data) - keep} bytes)")
+            with open(self.path, "r+b") as f:
+                f.truncate(keep)
+            data = data[:keep]
+        records = []
+        for n, line in enumerate(data.decode("utf-8", errors="replace").splitlines(), 1):
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"State journal: skipping unreadable line {n} of {self.path}")
+        return records
+
+    def _compact(self):
+        """Rewrites the journal with its last max_entries records (atomic rename)."""
+        self.records = self.records[-self.max_entries:]
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(r, separators=(",", ":")) + "\n" for r in self.records)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def last_state(self) -> Optional[str]:
+        return self.records[-1]["state"] if self.records else None
+
+    def deployed(self) -> bool:
+        """True once the journal shows the craft past BOOT/DEPLOY."""
+        return any(r.get("state") not in ("BOOT", "DEPLOY") for r in self.records)
+
+    # ── Recording ──
+    def record(self, state: str, source: str = None, trigger: str = None, cause: str = None) -> Dict:
+        entry = {"ts": round(time.time(), 3), "state": state, "source": source, "trigger": trigger, "cause": cause}
+        with self._lock:
+            self._f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self._f.flush()
+            self.records.append(entry)
+            if len(self.records) > self.max_entries:
+                del self.records[:len(self.records) - self.max_entries]
+            if state in self.sync_states:
+                os.fsync(self._f.fileno())
+                self._dirty = False
+            else:
+                self._dirty = True
+        return entry
+
+    def sync(self):
+        with self._lock:
+            if self._dirty and not self._f.closed:
+                os.fsync(self._f.fileno())
+                self._dirty = False
+
+    def _sync_loop(self):
+        while not self._stop.wait(self.fsync_interval_sec):
+            try:
+                self.sync()
+            except OSError as e:
+                logger.error(f"State journal fsync failed: {e}")
+
+    def close(self):
+        self._stop.set()
+        self.sync()
+        with self._lock:
+            self._f.close()
+
+    # ── Query ──
+    def query(self, since: float = None, until: float = None, limit: int = 50) -> List[Dict]:
+        """Most recent records (oldest first) with since <= ts <= until."""
+        with self._lock:
+            records = [r for r in self.records
+                       if (since is None or r["ts"] >= since) and (until is None or r["ts"] <= until)]
+        return records[-max(1, int(limit)):]
@@ -1,24 +1,23 @@
 import logging
-from src.common import setup_logging
-
-setup_logging(
-    log_level = "INFO",
-    log_file  = "obc.log",
-    console   = True
-)
-
-import json
 import time
 import sys
 import os
+from src.common.startup import timeline, announce, first_publish
+from src.common.config_manager import config_manager
+from src.common import setup_logging
 from src.obc.state_machine import CubeSatStateMachine
 from src.obc.handlers import OBCMessageHandlers
-from src.common import get_mqtt_client
+from src.obc.journal import StateJournal
+from src.obc.scheduler import CommandScheduler
+from src.common import get_mqtt_client, codec
 from src.common import TOPICS, MQTT_BROKER, MQTT_PORT, MQTT_KEEPALIVE
+from src.common.config import COMMAND_WORKERS
+from src.common.command_executor import CommandAcks, CommandExecutor
+from src.common.rate_policy import RatePolicy
 
-logger = logging.getLogger(__name__)
+logger = logging.getLogger("src.obc.main")  # run as -m, where __name__ is "__main__"
 
-class OBC:
+class OBC(CommandAcks):
     def __init__(self):
         self._mqtt_connected = False
 
@@ -26,8 +25,13 @@ class OBC:
         self.mqtt_client.on_connect = self.on_mqtt_connect
         self.mqtt_client.on_message = self.on_mqtt_message
 
-        self.state_machine = CubeSatStateMachine(self)
+        self.rate_policy   = RatePolicy("obc")
+        self.journal       = StateJournal()
+        self.state_machine = CubeSatStateMachine(self, self.journal)
         self.handlers      = OBCMessageHandlers(self)
+        self.scheduler     = CommandScheduler(self.dispatch_scheduled, lambda: self.state_machine.state)
+        # Single worker: state machine transitions must not run concurrently
+        self.executor      = CommandExecutor("obc", workers=COMMAND_WORKERS.get("obc", 1))
 
     def on_mqtt_connect(self, client, userdata, flags, rc, properties=None):
         if rc != 0:
@@ -38,53 +42,93 @@ class OBC:
         logger.info(f"MQTT connected (rc={rc}, client_id={client._client_id.decode()})")
 
         client.subscribe(TOPICS["eps_status"], qos=1)
+        client.subscribe(TOPICS["eps_power_event"], qos=1)
         client.subscribe(TOPICS["command"],    qos=1)
 
-        self.mqtt_client.publish(
-            TOPICS["obc_status"],
-            json.dumps({"timestamp": time.time(), "status": self.state_machine.state}),
+        codec.publish(
+            self.mqtt_client,
+            "obc_status",
+            {"timestamp": time.time(), "status": self.state_machine.state},
             qos=1,
             retain=True
         )
+        timeline.mark("mqtt_connected")
+        announce(client, "obc", "alive")
+        config_manager.attach(client, "obc")
+        first_publish(client, "obc")
 
     def on_mqtt_message(self, client, userdata, msg):
+        # Runs on paho's network thread: parse and enqueue only
         try:
-            payload = msg.payload.decode('utf-8')
+            data = codec.decode(msg)
             topic = msg.topic
 
-            if topic == TOPICS["eps_status"]:
-                self.handlers.handle_eps_status(payload)
+            if topic == TOPICS["eps_power_event"]:
+                # Queue head: runs before any pending command on the OBC worker
+                self.executor.submit("power_event", self.handlers.handle_power_event, data)
+            elif topic == TOPICS["eps_status"]:
+                self.executor.submit("eps_status", self.handlers.handle_eps_status, data)
             elif topic == TOPICS["command"]:
-                self.handlers.handle_command(payload)
+                command = data.get("command")
+                if command not in self.handlers.COMMANDS:
+                    return
+                self.executor.submit(
+                    command, self.handlers.handle_command, data,
+                    request_id=data.get("request_id"),
+                    on_timeout=self._on_command_timeout,
+                    on_reject=self._on_command_reject,
+                )
             else:
                 logger.debug(f"Unhandled topic: {topic}")
         except Exception as e:
             logger.error(f"Error processing message {msg.topic}: {e}")
 
+    def dispatch_scheduled(self, payload):
+        """Time-tagged command due: goes out like a ground command, to whichever service owns it."""
+        codec.publish(self.mqtt_client, "command", payload, qos=1)
+
     def run(self):
         try:
             self.mqtt_client.connect(MQTT_BROKER, MQTT_PORT, keepalive=MQTT_KEEPALIVE)
             self.mqtt_client.loop_start()
+            config_manager.start()
+            self.scheduler.start()
 
             logger.info(f"OBC started. State: {self.state_machine.state}")
 
             while True:
-                self.mqtt_client.publish(
-                    TOPICS["obc_status"],
-                    json.dumps({"timestamp": time.time(), "status": self.state_machine.state}),
+                codec.publish(
+                    self.mqtt_client,
+                    "obc_status",
+                    {"timestamp": time.time(), "status": self.state_machine.state},
                     retain=True
                 )
-                time.sleep(30)
+                self.rate_policy.wait()  # heartbeat; see publish_intervals.obc
 
         except KeyboardInterrupt:
             logger.info("Stopped by Ctrl+C")
         except Exception as e:
             logger.exception("Critical error in OBC main loop")
         finally:
+            config_manager.stop()
+            self.scheduler.stop()
+            self.executor.shutdown()
+            self.journal.close()
             self.mqtt_client.loop_stop()
             self.mqtt_client.disconnect()
             logger.info("OBC shutdown complete")
 
-if __name__ == "__main__":
+def main():
+    timeline.mark("imports")
+    setup_logging(
+        log_level = "INFO",
+        log_file  = "obc.log",
+        console   = True
+    )
+    timeline.mark("logging")
     obc = OBC()
-    obc.run()
\ No newline at end of file
+    timeline.mark("constructed")
+    obc.run()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,261 @@
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional
+
+from src.common.config import (
+    OBC_SCHEDULE_PATH, OBC_SCHEDULE_DEFAULT_STATES, OBC_SCHEDULE_DEFAULT_EXPIRE_SEC, OBC_SCHEDULE_MAX_ENTRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Scheduler management commands; never accepted as scheduled payloads
+SCHEDULER_COMMANDS = ('schedule_command', 'cancel_scheduled', 'get_schedule')
+
+_MAX_WAIT_SEC = 1.0  # re-read the wall clock at least this often (GPS/NTP time steps)
+
+
+@dataclass(order=True)
+class ScheduledCommand:
+    at:         float                                   # next execution, unix seconds
+    seq:        int                                     # FIFO among equal tags
+    id:         str = field(compare=False)
+    command:    Dict = field(compare=False)             # payload for TOPICS["command"]
+    repeat_sec: Optional[float] = field(default=None, compare=False)
+    count:      Optional[int] = field(default=None, compare=False)   # occurrences in total; None = unlimited
+    expire_at:  Optional[float] = field(default=None, compare=False) # never runs after this time
+    states:     List[str] = field(default_factory=list, compare=False)
+    runs:       int = field(default=0, compare=False)
+    skipped:    int = field(default=0, compare=False)
+
+
+class CommandScheduler:
+    """
+    Time-tagged command queue of the OBC: a heap ordered by execution time,
+    served by one thread that sleeps until the earliest tag and publishes
+    the command on TOPICS["command"] through `dispatch`, where the usual
+    service handlers pick it up.
+
+    An entry runs only while the OBC is in one of its `states`; otherwise
+    that occurrence is skipped. `repeat_sec` reschedules it from its tag (no
+    drift), `count` bounds the number of occurrences and `expire_at` ends
+    it. The queue is rewritten atomically (outside the dispatch lock) on
+    every change and reloaded at start, so uploaded plans survive a
+    restart; occurrences missed while the OBC was down are skipped, except
+    one-shots that have not expired yet.
+    """
+
+    def __init__(self, dispatch: Callable[[Dict], None], get_state: Callable[[], str],
+                 path: str = OBC_SCHEDULE_PATH):
+        self.dispatch = dispatch
+        self.get_state = get_state
+        self.path = Path(path)
+        self.entries: Dict[str, ScheduledCommand] = {}
+        self._heap: List[ScheduledCommand] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._save_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        self.jitter_ms: Deque[float] = deque(maxlen=256)   # dispatch time - tag, recent runs
+        self.dispatched = 0
+        self.skipped_state = 0
+        self.expired = 0
+        self._load()
+
+    # ── Persistence ──
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.error(f"Command schedule unreadable, starting empty: {e}")
+            return
+
+        now = time.time()
+        for item in saved:
+            item.pop("seq", None)
+            try:
+                entry = ScheduledCommand(seq=next(self._seq), **item)
+            except TypeError as e:
+                logger.error(f"Scheduled entry {item.get('id')!r} unreadable, dropped: {e}")
+                continue
+            if entry.count is not None and entry.count < 1:
+                logger.error(f"Scheduled {entry.id}: count {entry.count} is below 1, dropped")
+                continue
+            if entry.repeat_sec and entry.at < now:
+                missed = int((now - entry.at) // entry.repeat_sec) + 1
+                entry.at += missed * entry.repeat_sec
+                entry.skipped += missed
+                logger.warning(f"Scheduled {entry.id}: {missed} run(s) missed while the OBC was down")
+            if entry.count is not None and entry.runs + entry.skipped >= entry.count:
+                continue  # every occurrence has run or was missed
+            if entry.expire_at is not None and max(entry.at, now) > entry.expire_at:
+                continue
+            self.entries[entry.id] = entry
+            heapq.heappush(self._heap, entry)
+        logger.info(f"Command schedule restored: {len(self.entries)} entries")
+        self._save()
+
+    def _save(self):
+        """Atomic rewrite (tmp + fsync + rename); call without holding _cond."""
+        with self._cond:
+            saved = [asdict(e) for e in sorted(self.entries.values())]
+        with self._save_lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(saved, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+
+    # ── Queue management ──
+    def add(self, command: Dict, at: float, repeat_sec: float = None, count: int = None,
+            expire_at: float = None, states: List[str] = None, entry_id: str = None) -> ScheduledCommand:
+        """Validates and queues one entry; raises ValueError for a bad request."""
+        name = command.get("command") if isinstance(command, dict) else None
+        if not name:
+            raise ValueError("scheduled command needs a 'command' field")
+        if name in SCHEDULER_COMMANDS:
+            raise ValueError(f"'{name}' cannot be scheduled")
+        if repeat_sec is not None and repeat_sec <= 0:
+            raise ValueError("repeat_sec must be positive")
+        if count is not None and count < 1:
+            raise ValueError("count must be at least 1")
+        if expire_at is None and not repeat_sec:
+            expire_at = at + OBC_SCHEDULE_DEFAULT_EXPIRE_SEC
+        if expire_at is not None and expire_at < time.time():
+            raise ValueError("entry has already expired")
+
+        with self._cond:
+            if len(self.entries) >= OBC_SCHEDULE_MAX_ENTRIES:
+                raise ValueError(f"schedule full ({OBC_SCHEDULE_MAX_ENTRIES} entries)")
+            seq = next(self._seq)
+            entry_id = str(entry_id or f"s{int(time.time())}-{seq}")
+            if entry_id in self.entries:
+                raise ValueError(f"entry '{entry_id}' already exists")
+            entry = ScheduledCommand(
+                at=float(at), seq=seq, id=entry_id, command=dict(command),
+                repeat_sec=repeat_sec, count=count, expire_at=expire_at,
+                states=list(states if states is not None else OBC_SCHEDULE_DEFAULT_STATES),
+            )
+            self.entries[entry_id] = entry
+            heapq.heappush(self._heap, entry)
+            self._cond.notify()
+        self._save()
+        logger.info(f"Scheduled {entry_id}: '{name}' at {entry.at:.3f}"
+                    + (f", every {repeat_sec} s" if repeat_sec else ""))
+        return entry
+
+    def cancel(self, entry_id: str = None) -> List[str]:
+        """Removes one entry, or every entry when entry_id is None."""
+        with self._cond:
+            ids = list(self.entries) if entry_id is None else [entry_id] if entry_id in self.entries else []
+            for i in ids:
+                del self.entries[i]   # heap copy is skipped lazily when it comes up
+            self._cond.notify()
+        if ids:
+            self._save()
+        return ids
+
+    def snapshot(self) -> Dict:
+        with self._cond:
+            entries = [asdict(e) for e in sorted(self.entries.values())]
+            jitter = sorted(self.jitter_ms)
+        for e in entries:
+            del e["seq"]
+        stats = {"dispatched": self.dispatched, "skipped_state": self.skipped_state, "expired": self.expired}
+        if jitter:
+            stats["jitter_ms"] = {
+                "last": round(self.jitter_ms[-1], 2),
+                "p50":  round(jitter[len(jitter) // 2], 2),
+                "p99":  round(jitter[min(len(jitter) - 1, int(len(jitter) * 0.99))], 2),
+                "max":  round(jitter[-1], 2),
+            }
+        return {"entries": entries, "stats": stats}
+
+    # ── Dispatch thread ──
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name="obc-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def _next_due(self) -> Optional[ScheduledCommand]:
+        """Waits (holding the condition) until the earliest live entry is due."""
+        while self._running:
+            while self._heap and self.entries.get(self._heap[0].id) is not self._heap[0]:
+                heapq.heappop(self._heap)   # cancelled
+            delay = self._heap[0].at - time.time() if self._heap else _MAX_WAIT_SEC
+            if self._heap and delay <= 0:
+                return heapq.heappop(self._heap)
+            self._cond.wait(min(delay, _MAX_WAIT_SEC))
+        return None
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                entry = self._next_due()
+                if entry is None:
+                    return
+            now = time.time()
+            try:
+                self._run(entry, now)
+            except Exception as e:
+                logger.error(f"Scheduled {entry.id} failed: {e}")
+            with self._cond:
+                self._reschedule(entry, now)
+            self._save()
+
+    def _run(self, entry: ScheduledCommand, now: float):
+        if entry.expire_at is not None and now > entry.expire_at:
+            self.expired += 1
+            logger.warning(f"Scheduled {entry.id} expired before dispatch")
+            return
+        state = self.get_state()
+        if entry.states and state not in entry.states:
+            self.skipped_state += 1
+            entry.skipped += 1
+            logger.warning(f"Scheduled {entry.id} skipped: OBC in {state}, allowed {entry.states}")
+            return
+
+        entry.runs += 1
+        payload = dict(entry.command, request_id=f"{entry.id}#{entry.runs}")
+        self.dispatch(payload)
+        jitter = (time.time() - entry.at) * 1000
+        self.jitter_ms.append(jitter)
+        self.dispatched += 1
+        logger.info(f"Scheduled {entry.id}: dispatched '{payload['command']}' ({jitter:+.1f} ms after tag)")
+
+    def _reschedule(self, entry: ScheduledCommand, now: float):
+        """Requeues a repeating entry at its next slot, or drops a finished one."""
+        if self.entries.get(entry.id) is not entry:
+            return  # cancelled while running
+        if entry.repeat_sec and (entry.expire_at is None or now <= entry.expire_at):
+            entry.at += entry.repeat_sec
+            if entry.at <= now:   # fell behind (suspend, clock step): skip to the next slot
+                missed = int((now - entry.at) // entry.repeat_sec) + 1
+                entry.at += missed * entry.repeat_sec
+                entry.skipped += missed
+            done = entry.count is not None and entry.runs + entry.skipped >= entry.count
+            if not done and (entry.expire_at is None or entry.at <= entry.expire_at):
+                heapq.heappush(self._heap, entry)
+                return
+        del self.entries[entry.id]
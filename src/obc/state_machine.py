@@ -1,8 +1,7 @@
 from transitions import Machine
 import logging
-import json
 import time
-from src.common import TOPICS
+from src.common import codec
 
 logger = logging.getLogger(__name__)
 
@@ -37,26 +36,60 @@ class CubeSatStateMachine:
         {'trigger': 'recover', 'source': ['LOW_POWER', 'SAFE'], 'dest': 'NOMINAL'},
     ]
 
-    def __init__(self, obc):
+    def __init__(self, obc, journal=None):
         self.obc = obc  # ссылка на родительский OBC для вызова методов
+        self.journal = journal
+
+        # Warm restart: resume the last journaled state once BOOT/DEPLOY have completed,
+        # so a watchdog reset never re-runs deployment or passes through NOMINAL
+        restored = journal.last_state() if journal and journal.deployed() else None
+
         self.machine = Machine(
             model=self,
             states=CubeSatStateMachine.states,
             transitions=CubeSatStateMachine.transitions,
-            initial='BOOT'
+            initial=restored or 'BOOT',
+            send_event=True,
+            # Journaled before on_enter_* so nested auto-transitions (BOOT → DEPLOY → NOMINAL) stay in order
+            before_state_change='_journal_transition'
         )
 
-        self.on_enter_BOOT()
+        if restored:
+            logger.warning(f"OBC warm restart: restored {restored} from state journal")
+            self._journal_record(restored, trigger='warm_restart', cause='restored from journal')
+            self.publish_state({"restored": True})
+        else:
+            self._journal_record('BOOT', trigger='cold_boot')
+            self.on_enter_BOOT()
+
+    # ────────────── Journal ──────────────
+    def _journal_transition(self, event):
+        if event.transition.source == event.transition.dest:
+            return  # e.g. repeated enter_safe_mode while already SAFE
+        self._journal_record(
+            event.transition.dest,
+            source=event.transition.source,
+            trigger=event.event.name,
+            cause=event.kwargs.get('cause')
+        )
+
+    def _journal_record(self, state, source=None, trigger=None, cause=None):
+        if self.journal is None:
+            return
+        try:
+            self.journal.record(state, source=source, trigger=trigger, cause=cause)
+        except OSError as e:
+            logger.error(f"State journal write failed: {e}")
 
     # ────────────── State entry callbacks ──────────────
-    def on_enter_BOOT(self):
+    def on_enter_BOOT(self, event=None):
         logger.info("OBC → BOOT: starting self-test...")
         self.publish_state({"step": "self_test_started"})
         # Hardware checks can be added here
         # After tests:
         self.auto_deploy()
 
-    def on_enter_DEPLOY(self):
+    def on_enter_DEPLOY(self, event=None):
         logger.info("OBC → DEPLOY: deploying systems...")
         self.publish_state({"step": "antenna_deploying"})
         # Simulation: 5–15 seconds
@@ -64,18 +97,18 @@ class CubeSatStateMachine:
         # After completion:
         self.deployment_complete()
 
-    def on_enter_NOMINAL(self):
+    def on_enter_NOMINAL(self, event=None):
         logger.info("OBC → NOMINAL: nominal mode")
         self.publish_state()
         # self.obc.publish_control("telegram/start", "")   # if needed
         # self.obc.publish_control("wifi/on", "")
         # self.obc.publish_control("payload/on", "")
 
-    def on_enter_SCIENCE(self):
+    def on_enter_SCIENCE(self, event=None):
         logger.info("OBC → SCIENCE: science mode")
         self.publish_state()
 
-    def on_enter_LOW_POWER(self):
+    def on_enter_LOW_POWER(self, event=None):
         logger.warning("OBC → LOW_POWER: power saving mode")
         self.publish_state()
         # self.obc.publish_control("telegram/stop", "")
@@ -83,7 +116,7 @@ class CubeSatStateMachine:
         # self.obc.publish_control("payload/off", "")
         # self.obc.publish_control("adcs/reduce_frequency", "60")  # example
 
-    def on_enter_SAFE(self):
+    def on_enter_SAFE(self, event=None):
         logger.critical("OBC → SAFE: emergency mode!")
         self.publish_state()
         # self.obc.publish_control("all/non_critical/off", "")
@@ -95,14 +128,16 @@ class CubeSatStateMachine:
         Format: {"timestamp": <unix_float>, "status": <state>, ...extra}
         Silently skips if MQTT is not yet connected (e.g. during boot sequence).
         """
+        self.obc.rate_policy.set_state(self.state)
         if not self.obc._mqtt_connected:
             logger.debug(f"MQTT not connected; state publish skipped (state={self.state})")
             return
         payload = {"timestamp": time.time(), "status": self.state}
         if extra:
             payload.update(extra)
-        self.obc.mqtt_client.publish(
-            TOPICS["obc_status"],
-            json.dumps(payload),
+        codec.publish(
+            self.obc.mqtt_client,
+            "obc_status",
+            payload,
             retain=True
         )
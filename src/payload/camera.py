@@ -1,15 +1,14 @@
-from picamera2 import Picamera2
-from picamera2.encoders import JpegEncoder
-from picamera2.outputs import FileOutput
 import time
 import os
 import logging
 from threading import Thread, Event
-from libcamera import Transform
-from src.common.config import PHOTOS_DIR, PHOTO_RESOLUTION
+from src.common.config import PHOTOS_DIR, PHOTO_RESOLUTION, CAMERA_BACKEND, TRIAGE_ENABLED
+from src.common.config_manager import config_manager
 
 logger = logging.getLogger(__name__)
 
+LORES_SIZE = (640, 480)   # YUV420 preview stream: its Y plane is what triage scores
+
 class PayloadCamera:
 
     def __init__(self):
@@ -18,42 +17,96 @@ class PayloadCamera:
         self.timelapse_running = False
         self.timelapse_thread = None
         self.stop_event = Event()
+        # The camera is opened per capture, so a new resolution applies from the next photo
+        self.resolution = PHOTO_RESOLUTION
+        config_manager.subscribe("camera.resolution", self._on_resolution)
+        self.triage = None   # ImageTriage, created with the first capture (numpy import)
+        self._frames = None  # SyntheticFrames when CAMERA_BACKEND is "simulated"
+
+    def _on_resolution(self, resolution):
+        self.resolution = resolution
+        logger.info(f"Photo resolution set to {resolution[0]}x{resolution[1]}")
 
     def _init_camera(self):
+        # Imported on first use: picamera2/libcamera cost seconds at service start-up
+        from picamera2 import Picamera2
+        from libcamera import Transform
         picam2 = Picamera2()
         config = picam2.create_still_configuration(
-            main={"size": PHOTO_RESOLUTION},
-            lores={"size": (640, 480), "format": "YUV420"},
+            main={"size": self.resolution},
+            lores={"size": LORES_SIZE, "format": "YUV420"},
             transform=Transform(hflip=1, vflip=1)
         )
         picam2.configure(config)
         picam2.start()
         return picam2
 
-    def take_photo(self, overlay=False, save_photo=True):
-        """Takes a single photo and returns the file path. If save_photo=False, photo is deleted after sending."""
+    def _assess(self, luma):
+        """TriageResult for a luma frame, or None with triage disabled."""
+        if not TRIAGE_ENABLED:
+            return None
+        if self.triage is None:
+            from src.payload.triage import ImageTriage
+            self.triage = ImageTriage()
+        result = self.triage.assess(luma)
+        logger.info(f"Triage: {result.verdict} score={result.score} "
+                    f"mean={result.mean} std={result.std} reasons={result.reasons}")
+        return result
+
+    def capture(self, force=False):
+        """
+        Takes a single photo and returns (path, TriageResult or None).
+        The lores frame is scored before the main image is written, so a
+        frame triage drops never reaches the SD card: path is then None
+        (unless force). path is also None when the capture failed.
+        """
         timestamp = time.strftime("%Y%m%d_%H%M%S")
-        filename = f"photo_{timestamp}.jpg"
-        path = os.path.join(self.photo_dir, filename)
+        if CAMERA_BACKEND == "simulated":
+            return self._capture_simulated(timestamp, force)
+        path = os.path.join(self.photo_dir, f"photo_{timestamp}.jpg")
         picam2 = None
         try:
             picam2 = self._init_camera()
             request = picam2.capture_request()
-            request.save("main", path)
-            request.release()
+            try:
+                triage = self._assess(request.make_array("lores")[:LORES_SIZE[1]])
+                if triage is not None and triage.verdict == "drop" and not force:
+                    logger.info(f"Photo dropped by triage: {triage.reasons}")
+                    return None, triage
+                request.save("main", path)
+            finally:
+                request.release()
 
             logger.info(f"Photo saved: {path}")
 
-            return path
+            return path, triage
 
         except Exception as e:
             logger.error(f"Photo capture error: {e}")
-            return None
+            return None, None
         finally:
             if picam2:
                 picam2.stop()
                 picam2.close()
 
+    def _capture_simulated(self, timestamp, force):
+        from src.payload.synthetic import SyntheticFrames, write_pgm
+        if self._frames is None:
+            self._frames = SyntheticFrames(size=LORES_SIZE)
+        kind, luma = self._frames.next()
+        triage = self._assess(luma)
+        if triage is not None and triage.verdict == "drop" and not force:
+            logger.info(f"Photo dropped by triage ({kind}): {triage.reasons}")
+            return None, triage
+        path = os.path.join(self.photo_dir, f"photo_{timestamp}.pgm")
+        write_pgm(path, luma)
+        logger.info(f"Photo saved ({kind}): {path}")
+        return path, triage
+
+    def take_photo(self, overlay=False, save_photo=True):
+        """Takes a single photo and returns the file path (None if it failed or triage dropped it)."""
+        return self.capture()[0]
+
     def send_and_cleanup_photo(self, path):
         """Send photo and delete it if not timelapse."""
         # Implement your send logic here (e.g., MQTT, API, etc.)
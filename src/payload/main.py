@@ -1,34 +1,45 @@
 import logging
-from src.common import setup_logging
-
-setup_logging(
-    log_level = "INFO",
-    log_file  = "payload.log",
-    console   = True
-)
-
-import json
 import sys
 import time
 import os
 import base64
 
+from src.common.startup import timeline, announce, first_publish, BackgroundInit
+from src.common.config_manager import config_manager
 from src.payload.camera import PayloadCamera
-from src.payload.science import ScienceCollector
-from src.common import get_mqtt_client
+from src.common import setup_logging, get_mqtt_client, codec
 from src.common import TOPICS, MQTT_BROKER, MQTT_PORT, MQTT_KEEPALIVE
+from src.common.config import COMMAND_WORKERS
+from src.common.command_executor import CommandAcks, CommandExecutor
+from src.common.rate_policy import RatePolicy
+from src.common.publish_filter import PublishFilter
+from src.common.anomaly import AnomalyDetector
 
-logger = logging.getLogger(__name__)
+logger = logging.getLogger("src.payload.main")  # run as -m, where __name__ is "__main__"
 
-class PayloadService:
+class PayloadService(CommandAcks):
     def __init__(self):
         self.mqtt_client = get_mqtt_client("cubesat-payload")
         self.mqtt_client.on_connect = self.on_mqtt_connect
         self.mqtt_client.on_message = self.on_mqtt_message
 
-        self.camera    = PayloadCamera()
-        self.science   = ScienceCollector()
+        self.camera    = PayloadCamera()   # picamera2 is imported and opened per photo
+        self.science   = None              # LPS22HB/SHTC3 reset + checks run in the background
+        self.hardware  = BackgroundInit("payload-science", self._init_hardware)
         self.obc_state = None
+        self.rate_policy = RatePolicy("payload")
+        self.publish_filter = PublishFilter("payload_data")
+        self.anomaly   = AnomalyDetector("payload", self.rate_policy, client=self.mqtt_client)
+        self.executor  = CommandExecutor("payload", workers=COMMAND_WORKERS.get("payload", 2))
+        self.command_handlers = {
+            "take_photo":      self._handle_take_photo,
+            "start_timelapse": self._handle_start_timelapse,
+            "stop_timelapse":  self._handle_stop_timelapse,
+        }
+
+    def _init_hardware(self):
+        from src.payload.science import ScienceCollector
+        self.science = ScienceCollector()
 
     def on_mqtt_connect(self, client, userdata, flags, rc, properties=None):
         if rc != 0:
@@ -40,118 +51,192 @@ class PayloadService:
         client.subscribe(TOPICS["obc_status"], qos=1)
         client.subscribe(TOPICS["command"],    qos=1)
 
-        self.mqtt_client.publish(
-            TOPICS["payload_status"],
-            json.dumps({
+        codec.publish(
+            self.mqtt_client,
+            "payload_status",
+            {
                 "state": "IDLE",
                 "alive": True,
                 "timestamp": time.time()
-            }),
+            },
             qos=1,
             retain=True
         )
+        timeline.mark("mqtt_connected")
+        announce(client, "payload", "alive")
+        config_manager.attach(client, "payload")
 
     def on_mqtt_message(self, client, userdata, msg):
+        # Runs on paho's network thread: parse and enqueue only, never capture here
+        topic = msg.topic
         try:
-            payload_str = msg.payload.decode('utf-8')
-            topic = msg.topic
-            data = json.loads(payload_str)
-            logger.info(f"Received message in {topic}: {data}")
+            data = codec.decode(msg)
+            logger.debug(f"Received message in {topic}: {data}")
 
             # Update OBC status
             if topic == TOPICS["obc_status"]:
                 status = data.get("status", "UNKNOWN")
                 if status:
+                    if status != self.obc_state:
+                        logger.info(f"OBC status updated: {status}")
                     self.obc_state = status
-                    logger.info(f"OBC status updated: {self.obc_state}")
+                    self.rate_policy.set_state(status)
                 return
 
             # Handle commands
             if topic == TOPICS["command"]:
                 command = data.get("command")
+                handler = self.command_handlers.get(command)
+                if handler is None:
+                    return
 
                 if command == "take_photo":
-                    request_id = data.get("request_id", f"req_{int(time.time())}")
+                    data.setdefault("request_id", f"req_{int(time.time())}")
 
-                    # Check OBC state
-                    if self.obc_state != "NOMINAL":
-                        response = {
-                            "status": "ERROR",
-                            "request_id": request_id,
-                            "reason": f"Photo capture not allowed: OBC status is '{self.obc_state}'"
-                        }
-                        self.mqtt_client.publish(
-                            TOPICS["payload_photo"],
-                            json.dumps(response),
-                            qos=1,
-                            retain=True
-                        )
-                        logger.warning(f"Photo request denied: OBC status = {self.obc_state}")
-                        return
-
-                    overlay = data.get("params", {}).get("overlay", False)
-                    path = self.camera.take_photo(overlay=overlay)
-
-                    logger.info(f"take_photo returned path = {path!r}")
-
-                    if path and os.path.exists(path):
-                        logger.info(f"File exists, size = {os.path.getsize(path)} bytes")
-                        try:
-                            with open(path, "rb") as f:
-                                photo_bytes = f.read()
-                                logger.info(f"Read {len(photo_bytes)} bytes from file")
-                                photo_base64 = base64.b64encode(photo_bytes).decode('utf-8')
-
-                            response = {
-                                "status": "SUCCESS",
-                                "request_id": request_id,
-                                "path": path,
-                                "taken_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-                                "size_bytes": len(photo_bytes),
-                                "photo_base64": photo_base64,
-                                "mime_type": "image/jpeg"
-                            }
-
-                            # Publish full response with photo to main topic for bot
-                            self.mqtt_client.publish(
-                                TOPICS["payload_photo"],  # ← main topic for Telegram bot
-                                json.dumps(response),
-                                qos=1,
-                                retain=False              # retain=False for large messages
-                            )
-
-                            logger.info(f"Photo successfully sent to MQTT: {path}, size={response['size_bytes']} bytes")
-
-                            # Delete the photo file after sending to MQTT
-                            try:
-                                os.remove(path)
-                                logger.info(f"Photo file deleted from disk: {path}")
-                            except Exception as e:
-                                logger.warning(f"Failed to delete photo file {path}: {e}")
-                        except Exception as e:
-                            logger.error(f"Error reading/encoding photo {path}: {e}")
-                            self._send_error_response(request_id, "Failed to encode photo")
-                    else:
-                        self._send_error_response(request_id, "Failed to capture photo")
-                        logger.error(f"take_photo returned invalid path or file does not exist: {path}")
-
-                elif command == "start_timelapse":
-                    if self.obc_state != "NOMINAL":
-                        logger.warning(f"Timelapse start denied: OBC status = {self.obc_state}")
-                        return
-                    interval_sec = data.get("params", {}).get("interval_sec", 60)
-                    self.camera.start_timelapse(interval_sec=interval_sec)
-                    logger.info(f"Timelapse started (interval={interval_sec}s)")
-
-                elif command == "stop_timelapse":
-                    self.camera.stop_timelapse()
-                    logger.info("Timelapse stopped")
-
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON in {topic}")
+                self.executor.submit(
+                    command, handler, data,
+                    request_id=data.get("request_id"),
+                    on_timeout=self._on_command_timeout,
+                    on_reject=self._on_command_reject,
+                )
+
+        except (ValueError, TypeError):
+            logger.error(f"Undecodable payload in {topic}")
         except Exception as e:
             logger.error(f"Error processing message {topic}: {e}")
 
+    def _handle_take_photo(self, data):
+        request_id = data.get("request_id")
+
+        # Check OBC state (at execution time: it may have changed while queued)
+        if self.obc_state != "NOMINAL":
+            response = {
+                "status": "ERROR",
+                "request_id": request_id,
+                "reason": f"Photo capture not allowed: OBC status is '{self.obc_state}'"
+            }
+            codec.publish(
+                self.mqtt_client,
+                "payload_photo",
+                response,
+                qos=1,
+                retain=True
+            )
+            logger.warning(f"Photo request denied: OBC status = {self.obc_state}")
+            return
+
+        params = data.get("params", {})
+        path, triage = self.camera.capture(force=bool(params.get("force", False)))
+
+        logger.info(f"take_photo returned path = {path!r}")
+
+        job = self.executor.current_job()
+        if job is not None and job.timed_out:
+            # The requester already got TIMEOUT and an ERROR on payload_photo: no second answer
+            logger.warning(f"Photo {request_id} finished after its timeout: result discarded")
+            if path and os.path.exists(path):
+                os.remove(path)
+            return
+
+        if path is None and triage is not None and triage.verdict == "drop":
+            # Not worth the downlink: the score and reasons go down instead of the image
+            codec.publish(
+                self.mqtt_client,
+                "payload_photo",
+                {
+                    "status": "DROPPED",
+                    "request_id": request_id,
+                    "reason": f"Triage score {triage.score} below threshold: {', '.join(triage.reasons) or 'low quality'}",
+                    "triage": triage.as_dict(),
+                },
+                qos=1,
+                retain=False
+            )
+            return
+
+        if path and os.path.exists(path):
+            logger.info(f"File exists, size = {os.path.getsize(path)} bytes")
+            try:
+                with open(path, "rb") as f:
+                    photo_bytes = f.read()
+                    logger.info(f"Read {len(photo_bytes)} bytes from file")
+                    photo_base64 = base64.b64encode(photo_bytes).decode('utf-8')
+
+                response = {
+                    "status": "SUCCESS",
+                    "request_id": request_id,
+                    "path": path,
+                    "taken_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    "size_bytes": len(photo_bytes),
+                    "photo_base64": photo_base64,
+                    "mime_type": "image/x-portable-graymap" if path.endswith(".pgm") else "image/jpeg",
+                    "triage": triage.as_dict() if triage is not None else None
+                }
+
+                # Low-scoring photos go on their own topic: the downlink sends them after everything else.
+                # The requester still gets its answer on payload_photo, without the image.
+                low = triage is not None and triage.verdict == "deprioritize"
+                response["priority"] = "low" if low else "normal"
+                if low:
+                    codec.publish(
+                        self.mqtt_client,
+                        "payload_photo",
+                        {
+                            "status": "DEPRIORITIZED",
+                            "request_id": request_id,
+                            "priority": "low",
+                            "photo_topic": TOPICS["payload_photo_low"],
+                            "size_bytes": len(photo_bytes),
+                            "triage": response["triage"],
+                        },
+                        qos=1,
+                        retain=False
+                    )
+                codec.publish(
+                    self.mqtt_client,
+                    "payload_photo_low" if low else "payload_photo",  # ← main topic for Telegram bot
+                    response,
+                    qos=1,
+                    retain=False              # retain=False for large messages
+                )
+
+                logger.info(f"Photo successfully sent to MQTT: {path}, size={response['size_bytes']} bytes")
+
+                # Delete the photo file after sending to MQTT
+                try:
+                    os.remove(path)
+                    logger.info(f"Photo file deleted from disk: {path}")
+                except Exception as e:
+                    logger.warning(f"Failed to delete photo file {path}: {e}")
+            except Exception as e:
+                logger.error(f"Error reading/encoding photo {path}: {e}")
+                self._send_error_response(request_id, "Failed to encode photo")
+        else:
+            self._send_error_response(request_id, "Failed to capture photo")
+            logger.error(f"take_photo returned invalid path or file does not exist: {path}")
+
+    def _handle_start_timelapse(self, data):
+        if self.obc_state != "NOMINAL":
+            logger.warning(f"Timelapse start denied: OBC status = {self.obc_state}")
+            return
+        interval_sec = data.get("params", {}).get("interval_sec", 60)
+        self.camera.start_timelapse(interval_sec=interval_sec)
+        logger.info(f"Timelapse started (interval={interval_sec}s)")
+
+    def _handle_stop_timelapse(self, data):
+        self.camera.stop_timelapse()
+        logger.info("Timelapse stopped")
+
+    def _on_command_reject(self, job, reason):
+        super()._on_command_reject(job, reason)
+        if job.command == "take_photo":
+            self._send_error_response(job.request_id, f"Payload busy: {reason}")
+
+    def _on_command_timeout(self, job, reason):
+        super()._on_command_timeout(job, reason)
+        if job.command == "take_photo":
+            self._send_error_response(job.request_id, f"Photo timed out: {reason}")
+
     def _send_error_response(self, request_id, reason):
         """Helper method to send error response"""
         response = {
@@ -159,15 +244,17 @@ class PayloadService:
             "request_id": request_id,
             "reason": reason
         }
-        self.mqtt_client.publish(
-            TOPICS["payload_photo"],
-            json.dumps(response),
+        codec.publish(
+            self.mqtt_client,
+            "payload_photo",
+            response,
             qos=1,
             retain=False
         )
-        self.mqtt_client.publish(
-            TOPICS["payload_status"],
-            json.dumps(response),
+        codec.publish(
+            self.mqtt_client,
+            "payload_status",
+            response,
             qos=1,
             retain=True
         )
@@ -176,29 +263,52 @@ class PayloadService:
     def run(self):
         self.mqtt_client.connect(MQTT_BROKER, MQTT_PORT, keepalive=MQTT_KEEPALIVE)
         self.mqtt_client.loop_start()
+        config_manager.start()
 
+        self.hardware.start()
         logger.info("Payload service started")
 
         try:
+            self.hardware.wait()
             while True:
                 science_data = self.science.collect()
-                self.mqtt_client.publish(
-                    TOPICS["payload_data"],
-                    json.dumps(science_data),
-                    qos=1,
-                    retain=False
-                )
-                time.sleep(60)
+                burst = self.anomaly.process(science_data)
+                if self.publish_filter.should_publish(science_data, force=burst):
+                    codec.publish(
+                        self.mqtt_client,
+                        "payload_data",
+                        science_data,
+                        qos=1,
+                        retain=False
+                    )
+                    first_publish(self.mqtt_client, "payload")
+                    if self.publish_filter.reason == "heartbeat":
+                        logger.info(f"Science publish filter: {self.publish_filter.stats()}")
+                self.rate_policy.wait()  # 60 s in NOMINAL (2 s during an anomaly burst)
         except KeyboardInterrupt:
             logger.info("Payload stopped by Ctrl+C")
         except Exception as e:
             logger.exception("Critical error in Payload subsystem")
         finally:
+            config_manager.stop()
+            self.hardware.stop()
+            self.executor.shutdown()
             self.mqtt_client.loop_stop()
             self.mqtt_client.disconnect()
             self.camera.cleanup()
             logger.info("Payload service stopped")
 
-if __name__ == "__main__":
+def main():
+    timeline.mark("imports")
+    setup_logging(
+        log_level = "INFO",
+        log_file  = "payload.log",
+        console   = True
+    )
+    timeline.mark("logging")
     service = PayloadService()
+    timeline.mark("constructed")
     service.run()
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
 import time
-from smbus2 import SMBus as smbus
 import logging
-import lgpio as sbc
 from typing import Dict, Optional
 
+from src.common.i2c_bus import get_i2c_bus, OP_READ_BYTE
+
 # ─── LPS22HB (pressure + temperature) ──────────────────────────────────────
 LPS22HB_I2C_ADDRESS = 0x5C
 LPS_CTRL_REG1    = 0x10
@@ -35,14 +35,15 @@ class ScienceCollector:
     """
 
     def __init__(self):
-        # LPS22HB (smbus)
-        self.lps_bus = smbus(1)
+        # Both sensors share the payload's handle to the I2C bus (arbiter or direct)
+        self.bus = get_i2c_bus("payload")
+
+        # LPS22HB (register access)
+        self.lps_bus = self.bus
         self.lps_addr = LPS22HB_I2C_ADDRESS
         self._lps_init()
 
-        # SHTC3 (lgpio)
-        self.sbc = sbc
-        self.shtc_fd = self.sbc.i2c_open(1, SHTC3_I2C_ADDRESS, 0)
+        # SHTC3 (raw command transfers)
         self._shtc_init()
 
     def _lps_init(self):
@@ -77,9 +78,12 @@ class ScienceCollector:
             time.sleep(0.08)  # typical conversion time ~25-50 ms
             status = self.lps_bus.read_byte_data(self.lps_addr, LPS_STATUS)
             if status & 0x01:
-                xl = self.lps_bus.read_byte_data(self.lps_addr, LPS_PRESS_OUT_XL)
-                l  = self.lps_bus.read_byte_data(self.lps_addr, LPS_PRESS_OUT_L)
-                h  = self.lps_bus.read_byte_data(self.lps_addr, LPS_PRESS_OUT_H)
+                # One transaction: the three output bytes are read without other traffic in between
+                xl, l, h = self.lps_bus.transaction([
+                    (OP_READ_BYTE, self.lps_addr, LPS_PRESS_OUT_XL, None),
+                    (OP_READ_BYTE, self.lps_addr, LPS_PRESS_OUT_L,  None),
+                    (OP_READ_BYTE, self.lps_addr, LPS_PRESS_OUT_H,  None),
+                ])
                 raw = (h << 16) | (l << 8) | xl
                 return round(raw / 4096.0, 2)   # hPa
         except Exception:
@@ -92,8 +96,10 @@ class ScienceCollector:
             time.sleep(0.08)
             status = self.lps_bus.read_byte_data(self.lps_addr, LPS_STATUS)
             if status & 0x02:
-                l = self.lps_bus.read_byte_data(self.lps_addr, LPS_TEMP_OUT_L)
-                h = self.lps_bus.read_byte_data(self.lps_addr, LPS_TEMP_OUT_H)
+                l, h = self.lps_bus.transaction([
+                    (OP_READ_BYTE, self.lps_addr, LPS_TEMP_OUT_L, None),
+                    (OP_READ_BYTE, self.lps_addr, LPS_TEMP_OUT_H, None),
+                ])
                 raw = (h << 8) | l
                 return round(raw / 100.0, 2)
         except Exception:
@@ -102,11 +108,10 @@ class ScienceCollector:
 
     # ─── SHTC3 helpers ──────────────────────────────────────────────────────────
     def _shtc_write(self, cmd: int):
-        self.sbc.i2c_write_byte_data(self.shtc_fd, cmd >> 8, cmd & 0xFF)
+        self.bus.write_device(SHTC3_I2C_ADDRESS, [cmd >> 8, cmd & 0xFF])
 
     def _shtc_read(self, nbytes: int) -> bytes:
-        _, data = self.sbc.i2c_read_device(self.shtc_fd, nbytes)
-        return data
+        return bytes(self.bus.read_device(SHTC3_I2C_ADDRESS, nbytes))
 
     @staticmethod
     def _crc8(data: bytes, length: int, crc_check: int) -> bool:
@@ -171,6 +176,6 @@ class ScienceCollector:
     def __del__(self):
         """Close resources when the object is destroyed"""
         try:
-            self.sbc.i2c_close(self.shtc_fd)
+            self.bus.close()
         except Exception:
             pass
\ No newline at end of file
@@ -0,0 +1,77 @@
+from typing import Iterator, Sequence, Tuple
+
+import numpy as np
+
+# Scripted sequence of the simulated camera: one good scene, a near-duplicate,
+# a panned view, then the frames triage exists to catch
+DEFAULT_SEQUENCE = ("earth", "duplicate", "pan", "eclipse", "saturated", "flat")
+
+
+class SyntheticFrames:
+    """
+    Luma frames (uint8, height x width) standing in for the camera's lores
+    stream, for camera.backend: simulated and benchmarks/triage.py.
+
+    "earth" is a textured scene (smooth cloud-like structure over a limb
+    gradient, sensor noise); "duplicate" is the previous scene with fresh
+    noise; "pan" shifts it by a quarter frame; "eclipse" is near-black
+    noise, "saturated" near-white, "flat" a featureless grey.
+    """
+
+    def __init__(self, size: Tuple[int, int] = (640, 480), sequence: Sequence[str] = DEFAULT_SEQUENCE, seed: int = 1):
+        self.width, self.height = size
+        self.sequence = tuple(sequence)
+        self.rng = np.random.default_rng(seed)
+        self._scene = self._make_scene()
+        self._index = 0
+
+    def _make_scene(self) -> np.ndarray:
+        h, w = self.height, self.width
+        # Coarse random field, upsampled: clouds/landmasses at a few scales
+        scene = np.zeros((h, w), dtype=np.float32)
+        for cells, weight in ((4, 60.0), (12, 35.0), (40, 15.0)):
+            coarse = self.rng.standard_normal((cells, cells)).astype(np.float32)
+            rows = np.linspace(0, cells - 1, h).astype(int)
+            cols = np.linspace(0, cells - 1, w).astype(int)
+            scene += weight * coarse[rows][:, cols]
+        limb = np.linspace(0.6, 1.0, w, dtype=np.float32)[None, :]
+        return (110 + scene) * limb
+
+    def _noisy(self, base: np.ndarray, sigma: float = 3.0) -> np.ndarray:
+        noise = self.rng.normal(0.0, sigma, base.shape).astype(np.float32)
+        return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+    def frame(self, kind: str) -> np.ndarray:
+        shape = (self.height, self.width)
+        if kind == "earth":
+            self._scene = self._make_scene()
+            return self._noisy(self._scene)
+        if kind == "duplicate":
+            return self._noisy(self._scene)
+        if kind == "pan":
+            self._scene = np.roll(self._scene, self.width // 4, axis=1)
+            return self._noisy(self._scene)
+        if kind == "eclipse":
+            return self._noisy(np.full(shape, 4.0, dtype=np.float32), sigma=2.0)
+        if kind == "saturated":
+            return self._noisy(np.full(shape, 252.0, dtype=np.float32), sigma=2.0)
+        if kind == "flat":
+            return self._noisy(np.full(shape, 120.0, dtype=np.float32), sigma=1.0)
+        raise ValueError(f"unknown synthetic frame kind '{kind}'")
+
+    def next(self) -> Tuple[str, np.ndarray]:
+        kind = self.sequence[self._index % len(self.sequence)]
+        self._index += 1
+        return kind, self.frame(kind)
+
+    def __iter__(self) -> Iterator[Tuple[str, np.ndarray]]:
+        while True:
+            yield self.next()
+
+
+def write_pgm(path: str, luma: np.ndarray):
+    """Binary PGM (P5): the simulated camera's stand-in for a JPEG, no imaging library needed."""
+    h, w = luma.shape
+    with open(path, "wb") as f:
+        f.write(f"P5\n{w} {h}\n255\n".encode("ascii"))
+        f.write(np.ascontiguousarray(luma, dtype=np.uint8).tobytes())
@@ -0,0 +1,123 @@
+import logging
+import threading
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.common.config import (
+    TRIAGE_DROP_BELOW, TRIAGE_DEPRIORITIZE_BELOW, TRIAGE_TARGET_MEAN, TRIAGE_EXPOSURE_TOLERANCE,
+    TRIAGE_CONTRAST_REF, TRIAGE_DARK_LEVEL, TRIAGE_BRIGHT_LEVEL, TRIAGE_DUPLICATE_HAMMING,
+    TRIAGE_DUPLICATE_FACTOR,
+)
+
+logger = logging.getLogger(__name__)
+
+_HASH_SIZE = 32     # frame is reduced to 32x32 block means before the DCT
+_HASH_LOW = 8       # 8x8 lowest frequencies → 64-bit hash
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    return np.cos(np.pi * (2 * i + 1) * k / (2 * n)).astype(np.float32)
+
+
+_DCT = _dct_matrix(_HASH_SIZE)
+
+
+def perceptual_hash(luma: np.ndarray) -> int:
+    """64-bit pHash: signs of the 8x8 lowest DCT coefficients of the 32x32-reduced frame against their median."""
+    h, w = luma.shape
+    bh, bw = h // _HASH_SIZE, w // _HASH_SIZE
+    small = (luma[:bh * _HASH_SIZE, :bw * _HASH_SIZE]
+             .reshape(_HASH_SIZE, bh, _HASH_SIZE, bw)
+             .mean(axis=(1, 3), dtype=np.float32))
+    low = (_DCT @ small @ _DCT.T)[:_HASH_LOW, :_HASH_LOW].ravel()
+    bits = low > np.median(low[1:])   # DC excluded from the median: it only tracks brightness
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+@dataclass
+class TriageResult:
+    score: float                 # 0 (worthless) … 1
+    verdict: str                 # keep | deprioritize | drop
+    mean: float
+    std: float
+    dark_fraction: float
+    bright_fraction: float
+    phash: str                   # hex
+    distance: Optional[int]      # pHash distance to the previous frame; None for the first one
+    reasons: List[str] = field(default_factory=list)
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+class ImageTriage:
+    """
+    Scores a frame from its luma plane (the camera's lores YUV420 stream)
+    before the full-resolution image is stored or sent:
+
+        score = exposure × contrast × unclipped × novelty
+
+    exposure falls off quadratically as the mean leaves target_mean;
+    contrast is std / contrast_ref (capped at 1); unclipped is the share of
+    pixels not in the black / white histogram tails; novelty is
+    duplicate_factor when the perceptual hash is within duplicate_hamming
+    bits of the previous frame. Statistics use every second pixel and row,
+    which is plenty for a 640x480 frame and keeps a call near a millisecond.
+    """
+
+    def __init__(self):
+        self._previous_hash: Optional[int] = None
+        self._lock = threading.Lock()   # timelapse and take_photo may capture concurrently
+        self.counts = {"keep": 0, "deprioritize": 0, "drop": 0}
+
+    def assess(self, luma: np.ndarray) -> TriageResult:
+        sample = luma[::2, ::2]
+        mean = float(sample.mean(dtype=np.float32))
+        std = float(sample.std(dtype=np.float32))
+        hist = np.bincount(sample.ravel(), minlength=256)
+        total = float(sample.size)
+        dark = float(hist[:TRIAGE_DARK_LEVEL + 1].sum()) / total
+        bright = float(hist[TRIAGE_BRIGHT_LEVEL:].sum()) / total
+        phash = perceptual_hash(luma)
+
+        reasons = []
+        exposure = max(0.0, 1.0 - ((mean - TRIAGE_TARGET_MEAN) / TRIAGE_EXPOSURE_TOLERANCE) ** 2)
+        if exposure == 0.0:
+            reasons.append("dark" if mean < TRIAGE_TARGET_MEAN else "saturated")
+        contrast = min(1.0, std / TRIAGE_CONTRAST_REF)
+        if contrast < 0.25:
+            reasons.append("low_contrast")
+        unclipped = max(0.0, 1.0 - dark - bright)
+        if unclipped < 0.5:
+            reasons.append("clipped")
+
+        with self._lock:
+            distance = hamming(phash, self._previous_hash) if self._previous_hash is not None else None
+            self._previous_hash = phash
+            novelty = 1.0
+            if distance is not None and distance <= TRIAGE_DUPLICATE_HAMMING:
+                novelty = TRIAGE_DUPLICATE_FACTOR
+                reasons.append("duplicate")
+
+            score = exposure * contrast * unclipped * novelty
+            if score < TRIAGE_DROP_BELOW:
+                verdict = "drop"
+            elif score < TRIAGE_DEPRIORITIZE_BELOW:
+                verdict = "deprioritize"
+            else:
+                verdict = "keep"
+            self.counts[verdict] += 1
+
+        return TriageResult(
+            score=round(score, 3), verdict=verdict, mean=round(mean, 1), std=round(std, 1),
+            dark_fraction=round(dark, 3), bright_fraction=round(bright, 3),
+            phash=f"{phash:016x}", distance=distance, reasons=reasons,
+        )
@@ -1,37 +1,84 @@
 import logging
 import json
+import base64
 import time
 import sqlite3
+import threading
 from datetime import datetime
-import psutil
-import requests
 
-from src.common import get_mqtt_client
-from src.common.config import DB_PATH, TOPICS, MQTT_BROKER, MQTT_PORT, MQTT_KEEPALIVE, TELEMETRY_API_KEY, TELEMETRY_API_URL, TELEMETRY_SEND_INTERVAL_SEC, TELEMETRY_SEND_ENABLED
+from src.common import get_mqtt_client, codec
+from src.common.startup import timeline, announce, first_publish
+from src.common.config_manager import config_manager
+from src.common.config import DB_PATH, TOPICS, MQTT_BROKER, MQTT_PORT, MQTT_KEEPALIVE, TELEMETRY_API_KEY, TELEMETRY_API_URL, TELEMETRY_SEND_ENABLED, TELEMETRY_REMOTE_CHECK_SEC
 from src.common.system_metrics import SystemMetricsCollector
+from src.common.config import COMMAND_WORKERS, TELEMETRY_HISTORY_MAX_POINTS, SERIES_PRECISION
+from src.common.config import DOWNLINK_ENABLED, DOWNLINK_SINK, DOWNLINK_TOPIC_CLASSES, TELEMETRY_STORAGE, TELEMETRY_RECORD_ENABLED
+from src.common.command_executor import CommandAcks, CommandExecutor, build_ack
+from src.common.rate_policy import RatePolicy
+from src.telemetry.history import TelemetryHistory, HISTORY_FIELDS, STATE_FIELD, epoch_to_iso, iso_to_epoch, extract_field
+from src.telemetry.packet import PacketAssembler
+from src.telemetry.series import SeriesStore
+from src.telemetry.recorder import MessageRecorder, SNAPSHOT_FIELDS
+from src.telemetry.retention import RetentionManager
+from src.telemetry.gorilla import encode_points
+from src.telemetry.downlink import DownlinkScheduler, RadioSink, HttpSink
 
 logger = logging.getLogger(__name__)
 
-class TelemetryAggregator:
+# TOPICS keys the aggregator itself consumes; other subscribed topics are only downlinked
+_LOCAL_KEYS = ("obc_status", "eps_status", "adcs_status", "payload_data", "i2c_status", "command")
+
+class TelemetryAggregator(CommandAcks):
     def __init__(self):
         self.mqtt_client = get_mqtt_client("cubesat-telemetry")
         self.mqtt_client.on_connect = self.on_mqtt_connect
         self.mqtt_client.on_message = self.on_mqtt_message
 
-        # Cache for latest subsystem data (updated via MQTT)
-        self.latest = {
-            "obc": {},       # from OBC (On-Board Computer)
-            "eps": {},       # from EPS
-            "adcs": {},      # from ADCS
-            "payload": {},   # from Payload (science data)
-            # add others if needed
-        }
+        # Latest obc / eps / adcs / payload message with receive time and cached JSON (updated via MQTT)
+        self.sections = PacketAssembler()
 
         self.system_collector = SystemMetricsCollector()
+        self.executor = CommandExecutor("telemetry", workers=COMMAND_WORKERS.get("telemetry", 1))
+        self.rate_policy = RatePolicy("telemetry")
+        self.command_handlers = {
+            "get_telemetry":         self._handle_get_telemetry,
+            "get_telemetry_history": self._handle_get_telemetry_history,
+        }
 
-        # Initialize database
+        # Initialize database (shared by the main loop and command workers)
         self.conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        self.db_lock = threading.Lock()
+        # Bounded by age, size and disk pressure (before the tables: sets auto_vacuum on a new file)
+        self.retention = RetentionManager(self.conn, self.db_lock)
         self._create_table()
+        # Compressed per-field blocks; telemetry.storage picks them, the telemetry_log rows, or both
+        self.series = SeriesStore(self.conn, self.db_lock) if TELEMETRY_STORAGE in ("series", "both") else None
+        self.store_rows = TELEMETRY_STORAGE in ("rows", "both") or self.series is None
+        # Every subsystem message, not only the latest one per packet, goes to the series blocks
+        self.recorder = None
+        if TELEMETRY_RECORD_ENABLED:
+            if self.series is not None:
+                self.recorder = MessageRecorder(self.series)
+            else:
+                logger.info("telemetry.record needs storage series or both: storing packets only")
+
+        # Recent packets in every OBC state; SQLite only serves older ranges
+        self.history = TelemetryHistory(fallback=self._query_series if self.series is not None else self._query_db_history)
+        self.remote_enabled = False  # set by the background reachability check in run()
+        self._stopping = threading.Event()
+
+        # Everything bound for the ground shares one link budget (downlink section in config)
+        self.downlink = None
+        if DOWNLINK_ENABLED:
+            if DOWNLINK_SINK == "http":
+                sink = HttpSink(self._post_packet, lambda: bool(TELEMETRY_SEND_ENABLED and self.remote_enabled))
+            else:
+                sink = RadioSink()
+            self.downlink = DownlinkScheduler(sink)
+            self.command_handlers["get_downlink_status"] = self._handle_get_downlink_status
+            self.command_handlers["set_pass_windows"] = self._handle_set_pass_windows
+        # The simulated radio never reaches the remote API: unless the sink is http, packets are POSTed directly
+        self.post_direct = self.downlink is None or DOWNLINK_SINK != "http"
 
     def _create_table(self):
         cursor = self.conn.cursor()
@@ -57,6 +104,7 @@ class TelemetryAggregator:
                 raw_json TEXT
             )
         ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_telemetry_log_timestamp ON telemetry_log(timestamp)")
         self.conn.commit()
 
     def on_mqtt_connect(self, client, userdata, flags, reason_code, properties=None):
@@ -70,58 +118,191 @@ class TelemetryAggregator:
         client.subscribe(TOPICS["eps_status"], qos=1)
         client.subscribe(TOPICS["adcs_status"], qos=1)
         client.subscribe(TOPICS["payload_data"], qos=1)
+        client.subscribe(TOPICS["i2c_status"], qos=0)
         client.subscribe(TOPICS["command"], qos=1)
+        if self.downlink is not None:
+            for key in DOWNLINK_TOPIC_CLASSES:
+                if key not in _LOCAL_KEYS:
+                    client.subscribe(TOPICS[key], qos=1)
+        timeline.mark("mqtt_connected")
+        announce(client, "telemetry", "alive")
+        config_manager.attach(client, "telemetry")
 
     def on_mqtt_message(self, client, userdata, msg):
         try:
             topic = msg.topic
-            payload = msg.payload.decode('utf-8')
-            data = json.loads(payload)
+            key = codec.topic_key(topic)
+            if self.downlink is not None and key in DOWNLINK_TOPIC_CLASSES:
+                # Downlinked as received: no re-encoding, and photos are never decoded here
+                props = getattr(msg, "properties", None)
+                self.downlink.submit(key, msg.payload, getattr(props, "ContentType", None))
+                if key not in _LOCAL_KEYS:
+                    return
+            data = codec.decode(msg)
 
             if topic == TOPICS["obc_status"]:
-                self.latest["obc"] = data
+                self._on_section("obc", data)
+                self.rate_policy.on_obc_status(data)
             elif topic == TOPICS["eps_status"]:
-                self.latest["eps"] = data
+                self._on_section("eps", data)
             elif topic == TOPICS["adcs_status"]:
-                self.latest["adcs"] = data
+                self._on_section("adcs", data)
             elif topic == TOPICS["payload_data"]:
-                self.latest["payload"] = data
+                self._on_section("payload", data)
+            elif topic == TOPICS["i2c_status"]:
+                self.system_collector.on_i2c_status(data)
             elif topic == TOPICS["command"]:
-                if data.get("command") == "get_telemetry":
-                    packet = self.build_telemetry_packet()
-                    packet["request_id"] = data.get("request_id")
-                    self.mqtt_client.publish(
-                        TOPICS["telemetry_data"],
-                        json.dumps(packet),
-                        qos=1,
-                        retain=True
+                # Packet build reads /proc and SQLite: never on paho's network thread
+                command = data.get("command")
+                handler = self.command_handlers.get(command)
+                if handler:
+                    self.executor.submit(
+                        command, handler, data,
+                        request_id=data.get("request_id"),
+                        on_timeout=self._on_command_timeout,
+                        on_reject=self._on_command_reject,
                     )
 
             logger.debug(f"Updated data from {topic}")
         except Exception as e:
             logger.error(f"Error processing MQTT {topic}: {e}")
 
-    def build_telemetry_packet(self):
+    def _on_section(self, name, data):
+        received_at = time.time()
+        self.sections.update(name, data, received_at)
+        if self.recorder is not None:
+            self.recorder.record(name, data, received_at)
+
+    def _handle_get_telemetry(self, data):
+        packet, payload = self.build_packet(extra={"request_id": data.get("request_id")})
+        codec.publish(
+            self.mqtt_client,
+            "telemetry_data",
+            packet,
+            qos=1,
+            retain=True,
+            json_payload=payload
+        )
+
+    def _handle_get_telemetry_history(self, data):
+        """
+        {"command": "get_telemetry_history", "start": -600, "end": null,
+         "fields": ["battery", "voltage"], "max_points": 200, "encoding": "gorilla"}
+        start/end: epoch seconds, or <= 0 for seconds relative to now (end defaults to now).
+        encoding "gorilla" replaces timestamps/values with one base64 block per numeric field.
+        """
+        now = time.time()
+        response = {"timestamp": now, "request_id": data.get("request_id")}
+        try:
+            start = float(data.get("start", -600))
+            end = now if data.get("end") is None else float(data["end"])
+            response["start"] = now + start if start <= 0 else start
+            response["end"] = now + end if end <= 0 else end
+            response.update(self.history.query(
+                response["start"], response["end"], data.get("fields"),
+                data.get("max_points", TELEMETRY_HISTORY_MAX_POINTS),
+            ))
+            if data.get("encoding") == "gorilla":
+                self._encode_history(response)
+        except (TypeError, ValueError) as e:
+            response["error"] = str(e)
+        codec.publish(self.mqtt_client, "telemetry_history", response, qos=1)
+        logger.info(f"History {data.get('request_id')}: {response.get('points', 0)} points "
+                    f"from {response.get('source', '-')} in {(time.time() - now) * 1000:.1f} ms")
+
+    @staticmethod
+    def _encode_history(response):
+        """Bulk transfer: each numeric field becomes one Gorilla block (base64); obc_state stays a list."""
+        timestamps = response.pop("timestamps")
+        values = response.pop("values")
+        response["encoding"] = "gorilla"
+        response["blocks"] = {}
+        for name, column in values.items():
+            if name == STATE_FIELD:
+                response["values"] = {name: column}
+                continue
+            block = encode_points(timestamps, column, SERIES_PRECISION.get(name))
+            response["blocks"][name] = base64.b64encode(block).decode("ascii")
+
+    def _handle_get_downlink_status(self, data):
+        status = self.downlink.snapshot()
+        status.update(timestamp=time.time(), request_id=data.get("request_id"))
+        codec.publish(self.mqtt_client, "downlink_status", status, qos=1)
+
+    def _handle_set_pass_windows(self, data):
+        """
+        {"command": "set_pass_windows", "params": {"windows": [[start, end], ...]}}
+        Unix times; an empty list keeps the link always open. Answers with the downlink status.
+        """
+        try:
+            windows = [(float(start), float(end)) for start, end in (data.get("params") or {}).get("windows", [])]
+            if any(end <= start for start, end in windows):
+                raise ValueError("a pass window must end after it starts")
+        except (TypeError, ValueError) as e:
+            codec.publish(
+                self.mqtt_client,
+                "command_ack",
+                build_ack(data.get("command"), data.get("request_id"), "REJECTED", str(e)),
+                qos=1
+            )
+            return
+        self.downlink.set_windows(windows)
+        self._handle_get_downlink_status(data)
+
+    def _query_db_history(self, start, end, fields):
+        """History fallback: telemetry_log rows with start <= timestamp < end."""
+        columns = [f for f in fields if f in HISTORY_FIELDS or f == STATE_FIELD]  # column names are whitelisted
+        select = ", ".join(["timestamp"] + columns)
+        with self.db_lock:
+            rows = self.conn.execute(
+                f"SELECT {select} FROM telemetry_log WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp",
+                (epoch_to_iso(start), epoch_to_iso(end)),
+            ).fetchall()
+        return [(iso_to_epoch(row[0]), dict(zip(columns, row[1:]))) for row in rows]
+
+    def _query_series(self, start, end, fields):
+        """History fallback from the compressed blocks, same rows as _query_db_history."""
+        return self.series.query(start, end, fields)
+
+    def build_packet(self, extra=None):
+        """Telemetry packet as (dict, JSON bytes); only subsystems with new messages are re-encoded."""
         now = datetime.utcnow().isoformat() + "Z"
-        system = self.system_collector.collect(with_interval=0.8)
-        packet = {
-            "timestamp": now,
-            "obc_state": self.latest.get("obc", {}).get("status", "UNKNOWN"),
-            "eps": self.latest.get("eps", {}),
-            "adcs": self.latest.get("adcs", {}),
-            "payload": self.latest.get("payload", {}),
-            "system": system,
-        }
-        return packet
+        system = self.system_collector.collect()
+        return self.sections.build(now, system, extra)
+
+    def build_telemetry_packet(self):
+        return self.build_packet()[0]
+
+    def aggregate(self, log_to_db: bool = True):
+        """
+        Builds the tick's telemetry packet once and stores it in the history
+        ring (and SQLite); returns (packet, JSON) for the downlink / remote API.
+        """
+        packet, payload = self.build_packet()
+        self.history.append(packet)
+        self.retention.observe_disk(packet["system"].get("disk_percent"))
+        if log_to_db:
+            self._log_to_db(packet, payload)
 
-    def aggregate(self):
-        """Collects a full telemetry packet"""
-        packet = self.build_telemetry_packet()
-        self._log_to_db(packet)
+        stale = [name for name, f in packet["freshness"].items() if f["stale"]]
+        logger.debug(f"Telemetry aggregated: {packet['timestamp']}" + (f" (stale: {', '.join(stale)})" if stale else ""))
+        return packet, payload
 
-        logger.debug(f"Telemetry aggregated: {packet['timestamp']}")
+    def _log_to_db(self, packet, payload: bytes = None):
+        if self.series is not None:
+            if self.recorder is not None:
+                # Subsystem fields and obc_state are already stored message by message
+                values = {name: extract_field(packet, path) for name, path in SNAPSHOT_FIELDS.items()}
+            else:
+                values = {name: extract_field(packet, path) for name, path in HISTORY_FIELDS.items()}
+                values[STATE_FIELD] = packet.get(STATE_FIELD)
+            self.series.append(iso_to_epoch(packet["timestamp"]), values)
+            self.series.flush()
+        if self.store_rows:
+            with self.db_lock:
+                self._insert_packet(packet, payload)
 
-    def _log_to_db(self, packet):
+    def _insert_packet(self, packet, payload: bytes = None):
         cursor = self.conn.cursor()
         adcs   = packet.get("adcs", {})
         accel  = adcs.get("accel_g", {})
@@ -163,12 +344,12 @@ class TelemetryAggregator:
                     packet["system"].get("uptime_seconds", None),
                     packet["system"].get("cpu_temperature", None),
                     packet.get("obc_state", None),
-                    json.dumps(packet, ensure_ascii=False)
+                    payload.decode("utf-8") if payload is not None else json.dumps(packet, ensure_ascii=False)
                 ))
         self.conn.commit()
 
-    def send_to_remote_api(self, packet):
-        """Send telemetry packet to remote API server."""
+    def send_to_remote_api(self, packet, payload: bytes = None):
+        """Send telemetry packet (or its prebuilt JSON) to remote API server."""
         if not TELEMETRY_API_KEY:
             logger.warning("Remote telemetry API key not set; skipping send.")
             return
@@ -177,8 +358,12 @@ class TelemetryAggregator:
             "Content-Type": "application/json",
             "X-API-Key": TELEMETRY_API_KEY
         }
+        import requests
         try:
-            response = requests.post(url, headers=headers, json=packet, timeout=5)
+            if payload is not None:
+                response = requests.post(url, headers=headers, data=payload, timeout=5)
+            else:
+                response = requests.post(url, headers=headers, json=packet, timeout=5)
             if response.status_code == 201:
                 logger.info(f"Telemetry sent to remote API: {packet['timestamp']}")
             else:
@@ -186,44 +371,77 @@ class TelemetryAggregator:
         except Exception as e:
             logger.error(f"Failed to send telemetry to remote API: {e}")
 
+    def _post_packet(self, payload: bytes):
+        """HttpSink transport: a telemetry packet reassembled from downlink frames."""
+        self.send_to_remote_api(json.loads(payload), payload)
+
     def internet_available(self):
         """Check if internet is available (simple ping to API server)."""
         try:
+            import requests
             requests.get(f"{TELEMETRY_API_URL}/api/cubesat/telemetry/latest", timeout=3)
             return True
         except Exception:
             return False
 
+    def _check_remote(self):
+        """Probes the API every TELEMETRY_REMOTE_CHECK_SEC, so sending follows it going down and coming back."""
+        first = True
+        while not self._stopping.is_set():
+            available = self.internet_available()
+            if first or available != self.remote_enabled:
+                if available:
+                    logger.info("Remote telemetry API available; sending enabled.")
+                else:
+                    logger.warning("Remote telemetry API unavailable; sending disabled.")
+            self.remote_enabled = available
+            first = False
+            self._stopping.wait(TELEMETRY_REMOTE_CHECK_SEC)
+
     def run(self):
         self.mqtt_client.connect(MQTT_BROKER, MQTT_PORT, keepalive=MQTT_KEEPALIVE)
         self.mqtt_client.loop_start()
+        config_manager.start()
+        if self.downlink is not None:
+            self.downlink.start()
+        self.retention.start()
+        if self.recorder is not None:
+            self.recorder.start()
 
         logger.info("Telemetry Aggregator started")
 
         try:
-            remote_enabled = self.internet_available()
-            if remote_enabled:
-                logger.info("Remote telemetry API available; sending enabled.")
-            else:
-                logger.warning("Remote telemetry API unavailable; sending disabled.")
+            # Up to 3 s per probe on a dead link: never in front of a packet
+            if TELEMETRY_SEND_ENABLED:
+                threading.Thread(target=self._check_remote, name="telemetry-remote-check", daemon=True).start()
 
-            # Option flag from config
+            # One packet per tick, in every OBC state, shared by the history ring, SQLite and the ground link
             while True:
-                obc_state = self.latest.get("obc", {}).get("status", "")
-                if obc_state == "SCIENCE":
-                    self.aggregate()
+                packet, payload = self.aggregate()
+                first_publish(self.mqtt_client, "telemetry")
 
+                if self.downlink is not None:
+                    self.downlink.submit("telemetry_data", payload, codec.JSON_CONTENT_TYPE)
                 # Send to remote API if enabled in config and internet is available
-                if TELEMETRY_SEND_ENABLED and remote_enabled:
-                    packet = self.build_telemetry_packet()
-                    self.send_to_remote_api(packet)
-                time.sleep(TELEMETRY_SEND_INTERVAL_SEC)
+                if self.post_direct and TELEMETRY_SEND_ENABLED and self.remote_enabled:
+                    self.send_to_remote_api(packet, payload)
+                self.rate_policy.wait()  # telemetry.interval_sec; low_power_interval_sec in LOW_POWER
         except KeyboardInterrupt:
             logger.info("Telemetry Aggregator stopped by Ctrl+C")
         except Exception as e:
             logger.exception("Critical error in main Telemetry Aggregator loop")
         finally:
+            self._stopping.set()
+            config_manager.stop()
+            if self.downlink is not None:
+                self.downlink.stop()
+            self.executor.shutdown()
             self.mqtt_client.loop_stop()
             self.mqtt_client.disconnect()
+            self.retention.stop()
+            if self.recorder is not None:
+                self.recorder.stop()
+            if self.series is not None:
+                self.series.flush(force=True)
             self.conn.close()
             logger.info("Telemetry Aggregator stopped")
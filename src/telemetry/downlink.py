@@ -0,0 +1,347 @@
+import itertools
+import logging
+import struct
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from src.common.config import (
+    DOWNLINK_CLASSES, DOWNLINK_TOPIC_CLASSES, DOWNLINK_RATE_BYTES_PER_SEC, DOWNLINK_BURST_BYTES, DOWNLINK_MTU,
+    DOWNLINK_QUEUE_BYTES, DOWNLINK_PASS_WINDOWS,
+)
+from src.common.utils import crc16_ccitt
+
+logger = logging.getLogger(__name__)
+
+# Frame: header | data | CRC-16-CCITT over header + data
+#   magic, class index, message id, fragment index, fragment count, data length
+FRAME_HEADER = struct.Struct(">BBHHHH")
+FRAME_CRC = struct.Struct(">H")
+FRAME_MAGIC = 0xC5
+FRAME_OVERHEAD = FRAME_HEADER.size + FRAME_CRC.size
+
+_THROUGHPUT_WINDOW_SEC = 60.0
+
+
+def encode_frame(class_index: int, msg_id: int, index: int, count: int, data: bytes) -> bytes:
+    header = FRAME_HEADER.pack(FRAME_MAGIC, class_index, msg_id, index, count, len(data))
+    return header + data + FRAME_CRC.pack(crc16_ccitt(header + data))
+
+
+@dataclass
+class DownlinkItem:
+    """One message to downlink; fragment 0 starts with "<topic_key> <content type>\\n"."""
+    msg_id: int
+    class_name: str
+    topic_key: str
+    data: bytes
+    submitted: float = field(default_factory=time.monotonic)
+    offset: int = 0          # bytes of data already framed
+    fragments: int = 1
+
+    @property
+    def started(self) -> bool:
+        return self.offset > 0
+
+
+class Reassembler:
+    """
+    Ground side of the frame format: checks CRCs and rebuilds messages.
+    Used by the simulated radio sink (as a loopback ground station) and by
+    the HTTP sink; ground tools can use it on a real link.
+    """
+
+    def __init__(self):
+        self._partial: Dict[int, Dict[int, bytes]] = {}
+        self.crc_errors = 0
+        self.completed = 0
+
+    def feed(self, frame: bytes) -> Optional[Tuple[str, Optional[str], bytes, int]]:
+        """Returns (topic_key, content_type, payload, class index) when a message is complete."""
+        if len(frame) < FRAME_OVERHEAD:
+            self.crc_errors += 1
+            return None
+        magic, class_index, msg_id, index, count, length = FRAME_HEADER.unpack_from(frame)
+        if len(frame) < FRAME_OVERHEAD + length:
+            # Truncated, or a corrupted length field: counted like a bad CRC
+            self.crc_errors += 1
+            return None
+        body = frame[:FRAME_HEADER.size + length]
+        (crc,) = FRAME_CRC.unpack_from(frame, FRAME_HEADER.size + length)
+        if magic != FRAME_MAGIC or crc != crc16_ccitt(body):
+            self.crc_errors += 1
+            return None
+
+        parts = self._partial.setdefault(msg_id, {})
+        parts[index] = body[FRAME_HEADER.size:]
+        if len(parts) < count:
+            return None
+        del self._partial[msg_id]
+        data = b"".join(parts[i] for i in range(count))
+        prefix, _, payload = data.partition(b"\n")
+        topic_key, _, content_type = prefix.decode("utf-8").partition(" ")
+        self.completed += 1
+        return topic_key, content_type or None, payload, class_index
+
+
+class RadioSink:
+    """
+    Simulated radio: frames go to a loopback Reassembler standing in for the
+    ground station, and delivered messages are counted per class with their
+    queue-to-ground latency. The token bucket already paces it to the link rate.
+    """
+    name = "radio"
+
+    def __init__(self, on_message: Callable[[str, Optional[str], bytes], None] = None):
+        self.ground = Reassembler()
+        self.on_message = on_message
+        self.delivered: Dict[str, int] = {c: 0 for c in DOWNLINK_CLASSES}
+
+    def available(self) -> bool:
+        return True
+
+    def send(self, frame: bytes) -> bool:
+        message = self.ground.feed(frame)
+        if message is not None:
+            topic_key, content_type, payload, class_index = message
+            self.delivered[DOWNLINK_CLASSES[class_index]] += 1
+            logger.debug(f"Radio: {topic_key} delivered ({len(payload)} B)")
+            if self.on_message:
+                self.on_message(topic_key, content_type, payload)
+        return True
+
+
+class HttpSink:
+    """
+    Remote API transport: frames are reassembled locally and complete
+    telemetry packets are POSTed with `post(payload)` (send_to_remote_api).
+    The API has no endpoint for other topics; those are counted as unrouted.
+    """
+    name = "http"
+
+    def __init__(self, post: Callable[[bytes], None], available: Callable[[], bool]):
+        self.post = post
+        self._available = available
+        self.ground = Reassembler()
+        self.unrouted = 0
+
+    def available(self) -> bool:
+        return self._available()
+
+    def send(self, frame: bytes) -> bool:
+        message = self.ground.feed(frame)
+        if message is not None:
+            topic_key, _, payload, _ = message
+            if topic_key == "telemetry_data":
+                self.post(payload)
+            else:
+                self.unrouted += 1
+        return True
+
+
+class DownlinkScheduler:
+    """
+    Everything that leaves the satellite goes through this queue, at the
+    link budget: a token bucket of rate_bytes_per_sec (burst_bytes deep),
+    only inside pass windows, and only while the sink is available.
+
+    Messages wait in one FIFO per priority class (DOWNLINK_CLASSES order:
+    health, ack, science, photo) and are cut into frames of at most `mtu`
+    data bytes. The next frame always comes from the highest class with
+    something queued, so a health packet submitted in the middle of a
+    photo goes out after at most one photo frame. A class over its byte
+    bound drops its oldest messages that have not started sending.
+    """
+
+    def __init__(self, sink, rate_bytes_per_sec: float = DOWNLINK_RATE_BYTES_PER_SEC,
+                 burst_bytes: int = DOWNLINK_BURST_BYTES, mtu: int = DOWNLINK_MTU,
+                 windows: List[Tuple[float, float]] = None):
+        self.sink = sink
+        self.rate = float(rate_bytes_per_sec)
+        self.mtu = max(16, int(mtu))
+        self.burst = max(float(burst_bytes), self.mtu + FRAME_OVERHEAD)
+        self.windows = sorted((float(s), float(e)) for s, e in (DOWNLINK_PASS_WINDOWS if windows is None else windows))
+
+        self._queues: Dict[str, Deque[DownlinkItem]] = {c: deque() for c in DOWNLINK_CLASSES}
+        self._queued_bytes: Dict[str, int] = {c: 0 for c in DOWNLINK_CLASSES}
+        self._msg_ids = itertools.count()
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats: Dict[str, Dict[str, float]] = {
+            c: {"submitted": 0, "sent_items": 0, "sent_bytes": 0, "dropped": 0, "latency_sec_sum": 0.0}
+            for c in DOWNLINK_CLASSES
+        }
+        self._sent_log: Dict[str, Deque[Tuple[float, int]]] = {c: deque() for c in DOWNLINK_CLASSES}
+
+    # ── Producers ──
+    def class_for(self, topic_key: str) -> Optional[str]:
+        return DOWNLINK_TOPIC_CLASSES.get(topic_key)
+
+    def submit(self, topic_key: str, payload: bytes, content_type: str = None, class_name: str = None) -> bool:
+        """Queues one message; False if it has no class or can never fit its class bound."""
+        class_name = class_name or self.class_for(topic_key)
+        if class_name not in self._queues:
+            return False
+        prefix = f"{topic_key} {content_type}" if content_type else topic_key
+        data = prefix.encode("utf-8") + b"\n" + payload
+        limit = DOWNLINK_QUEUE_BYTES.get(class_name)
+        with self._cond:
+            stats = self.stats[class_name]
+            stats["submitted"] += 1
+            if limit is not None and len(data) > limit:
+                stats["dropped"] += 1
+                logger.warning(f"Downlink: {topic_key} ({len(data)} B) exceeds the {class_name} queue bound")
+                return False
+            item = DownlinkItem(next(self._msg_ids) & 0xFFFF, class_name, topic_key, data,
+                                fragments=max(1, -(-len(data) // self.mtu)))
+            queue = self._queues[class_name]
+            queue.append(item)
+            self._queued_bytes[class_name] += len(data)
+            while limit is not None and self._queued_bytes[class_name] > limit:
+                victim = next((i for i in queue if not i.started and i is not item), None)
+                if victim is None:
+                    break
+                queue.remove(victim)
+                self._queued_bytes[class_name] -= len(victim.data) - victim.offset
+                stats["dropped"] += 1
+                logger.info(f"Downlink: {class_name} queue full, dropped {victim.topic_key} message")
+            self._cond.notify()
+        return True
+
+    def set_windows(self, windows: List[Tuple[float, float]]):
+        with self._cond:
+            self.windows = sorted((float(s), float(e)) for s, e in windows)
+            self._cond.notify()
+        logger.info(f"Downlink pass windows: {self.windows or 'always open'}")
+
+    # ── Scheduling ──
+    def _window_wait(self, now: float) -> Optional[float]:
+        """0 inside a pass window, else seconds to the next one (None: no window left)."""
+        if not self.windows:
+            return 0.0
+        for start, end in self.windows:
+            if start <= now < end:
+                return 0.0
+            if start > now:
+                return start - now
+        return None
+
+    def _next_frame(self) -> Optional[Tuple[bytes, DownlinkItem, bool]]:
+        """Cuts the next frame from the highest-priority class with data; call holding _cond."""
+        for class_index, class_name in enumerate(DOWNLINK_CLASSES):
+            queue = self._queues[class_name]
+            if not queue:
+                continue
+            item = queue[0]
+            chunk = item.data[item.offset:item.offset + self.mtu]
+            index = item.offset // self.mtu
+            frame = encode_frame(class_index, item.msg_id, index, item.fragments, chunk)
+            item.offset += len(chunk)
+            self._queued_bytes[class_name] -= len(chunk)
+            last = item.offset >= len(item.data)
+            if last:
+                queue.popleft()
+            return frame, item, last
+        return None
+
+    def _take_tokens(self, size: int) -> float:
+        """Seconds to wait until `size` bytes are in the bucket (0 = taken)."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+        if self._tokens >= size:
+            self._tokens -= size
+            return 0.0
+        return (size - self._tokens) / self.rate
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    wait = self._window_wait(time.time())
+                    if wait is None or wait > 0 or not self.sink.available():
+                        self._cond.wait(1.0 if wait is None else min(max(wait, 0.05), 1.0))
+                        continue
+                    if not any(self._queues.values()):
+                        self._cond.wait(1.0)
+                        continue
+                    # Budget for a full frame first, so a burst of urgent data can still preempt
+                    delay = self._take_tokens(self.mtu + FRAME_OVERHEAD)
+                    if delay > 0:
+                        self._cond.wait(delay)
+                        continue
+                    break
+                if not self._running:
+                    return
+                frame, item, last = self._next_frame()
+                self._tokens += self.mtu + FRAME_OVERHEAD - len(frame)   # refund a short last fragment
+
+            try:
+                self.sink.send(frame)
+            except Exception as e:
+                logger.error(f"Downlink sink {self.sink.name} failed: {e}")
+            self._account(item, len(frame), last)
+
+    def _account(self, item: DownlinkItem, size: int, last: bool):
+        now = time.monotonic()
+        with self._cond:
+            stats = self.stats[item.class_name]
+            stats["sent_bytes"] += size
+            log = self._sent_log[item.class_name]
+            log.append((now, size))
+            while log and now - log[0][0] > _THROUGHPUT_WINDOW_SEC:
+                log.popleft()
+            if last:
+                stats["sent_items"] += 1
+                stats["latency_sec_sum"] += now - item.submitted
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name="downlink", daemon=True)
+        self._thread.start()
+        logger.info(f"Downlink scheduler started: sink {self.sink.name}, {self.rate:g} B/s, "
+                    f"MTU {self.mtu} B, windows {self.windows or 'always open'}")
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    # ── Reporting ──
+    def snapshot(self) -> Dict:
+        """Queue depth, throughput and latency per class (payload of TOPICS["downlink_status"])."""
+        now = time.monotonic()
+        with self._cond:
+            classes = {}
+            for class_name in DOWNLINK_CLASSES:
+                stats = self.stats[class_name]
+                recent = sum(size for t, size in self._sent_log[class_name] if now - t <= _THROUGHPUT_WINDOW_SEC)
+                classes[class_name] = {
+                    "queued_items":   len(self._queues[class_name]),
+                    "queued_bytes":   self._queued_bytes[class_name],
+                    "submitted":      stats["submitted"],
+                    "sent_items":     stats["sent_items"],
+                    "sent_bytes":     stats["sent_bytes"],
+                    "dropped":        stats["dropped"],
+                    "throughput_bps": round(recent * 8 / _THROUGHPUT_WINDOW_SEC, 1),
+                    "avg_latency_sec": round(stats["latency_sec_sum"] / stats["sent_items"], 2)
+                                       if stats["sent_items"] else None,
+                }
+            wait = self._window_wait(time.time())
+        return {
+            "sink": self.sink.name,
+            "rate_bytes_per_sec": self.rate,
+            "mtu": self.mtu,
+            "in_pass": wait == 0.0 and self.sink.available(),
+            "next_pass_in_sec": None if wait is None else round(wait, 1),
+            "windows": self.windows,
+            "classes": classes,
+        }
@@ -0,0 +1,231 @@
+import math
+import struct
+from typing import Iterator, Optional, Sequence, Tuple
+
+# Block layout: header, then one bit stream of (timestamp, value) pairs
+#   header  ">BbIq": version, precision (-1 = raw doubles), sample count, first timestamp (ms)
+#   time    delta-of-delta in ms: '0' | '10'+7 bits | '110'+9 | '1110'+12 | '1111'+32 (two's complement)
+#   value   XOR with the previous value's bits: '0' same | '10' + meaningful bits in the previous
+#           window | '11' + 5 bits leading zeros + 6 bits length (0 = 64) + meaningful bits
+#   The first value is 64 raw bits; the first delta is encoded as a delta-of-delta from 0.
+VERSION = 1
+HEADER = struct.Struct(">BbIq")
+MAX_POINTS = 0xFFFFFFFF
+
+_DOD_BUCKETS = ((7, 0b10, 2), (9, 0b110, 3), (12, 0b1110, 4))
+_MASK64 = (1 << 64) - 1
+_DOUBLE = struct.Struct(">d")
+_UINT64 = struct.Struct(">Q")
+_NAN_BITS = _UINT64.unpack(_DOUBLE.pack(math.nan))[0]
+
+
+def _float_bits(value: float) -> int:
+    return _UINT64.unpack(_DOUBLE.pack(value))[0]
+
+
+def _bits_float(bits: int) -> float:
+    return _DOUBLE.unpack(_UINT64.pack(bits))[0]
+
+
+class BitWriter:
+    __slots__ = ("buf", "_acc", "_nbits")
+
+    def __init__(self):
+        self.buf = bytearray()
+        self._acc = 0      # pending bits, right-aligned
+        self._nbits = 0
+
+    def write(self, value: int, nbits: int):
+        self._acc = (self._acc << nbits) | (value & ((1 << nbits) - 1))
+        self._nbits += nbits
+        if self._nbits >= 8:
+            whole = self._nbits >> 3
+            rest = self._nbits & 7
+            self.buf += (self._acc >> rest).to_bytes(whole, "big")
+            self._acc &= (1 << rest) - 1
+            self._nbits = rest
+
+    def getvalue(self) -> bytes:
+        """Bytes written so far, the last one zero-padded; writing can continue afterwards."""
+        if not self._nbits:
+            return bytes(self.buf)
+        return bytes(self.buf) + bytes([(self._acc << (8 - self._nbits)) & 0xFF])
+
+    def bit_length(self) -> int:
+        return len(self.buf) * 8 + self._nbits
+
+
+class BitReader:
+    __slots__ = ("data", "pos")
+
+    def __init__(self, data: bytes, pos: int = 0):
+        self.data = data
+        self.pos = pos     # in bits
+
+    def read(self, nbits: int) -> int:
+        start, end = self.pos >> 3, (self.pos + nbits + 7) >> 3
+        if end > len(self.data):
+            raise ValueError("truncated block")
+        chunk = int.from_bytes(self.data[start:end], "big")
+        shift = (end << 3) - self.pos - nbits
+        self.pos += nbits
+        return (chunk >> shift) & ((1 << nbits) - 1)
+
+    def bit(self) -> int:
+        byte = self.data[self.pos >> 3]
+        bit = (byte >> (7 - (self.pos & 7))) & 1
+        self.pos += 1
+        return bit
+
+
+class BlockEncoder:
+    """
+    Append-only Gorilla encoder for one series (Pelkonen et al., VLDB 2015):
+    delta-of-delta millisecond timestamps and XOR-compressed float64 values.
+    Samples that barely change cost a few bits each.
+
+    precision (decimal places the producer rounds to) stores round(v * 10^p)
+    instead of v: scaled integers differ in far fewer bits than decimal
+    fractions, and decoding divides back to the same double. None, NaN,
+    infinities and values too large to scale are stored as NaN and decoded
+    as None, so a bad reading cannot fail the append half-way through a batch.
+
+    getvalue() returns a complete, decodable block at any time, so an open
+    block can be persisted periodically and appended to afterwards.
+    """
+
+    def __init__(self, precision: Optional[int] = None):
+        self.precision = -1 if precision is None else int(precision)
+        self._scale = 10 ** self.precision if self.precision >= 0 else None
+        self._bits = BitWriter()
+        self.count = 0
+        self.first_ts: Optional[int] = None   # ms
+        self.last_ts: Optional[int] = None
+        self._delta = 0
+        self._value = 0                       # bits of the previous value
+        self._leading = -1                    # previous XOR window; -1 = none yet
+        self._trailing = 0
+
+    def append(self, ts: float, value: Optional[float]):
+        """Timestamps (epoch seconds) must not go backwards."""
+        t = int(round(ts * 1000))
+        if self.count >= MAX_POINTS:
+            raise OverflowError("block is full")
+        if value is not None and self._scale is not None:
+            value = value * self._scale
+        if value is None or not math.isfinite(value):
+            bits = _NAN_BITS
+        elif self._scale is not None:
+            bits = _float_bits(float(round(value)))
+        else:
+            bits = _float_bits(float(value))
+
+        w = self._bits
+        if self.count == 0:
+            self.first_ts = self.last_ts = t
+            w.write(bits, 64)
+            self._value = bits
+            self.count = 1
+            return
+
+        delta = t - self.last_ts
+        if delta < 0:
+            raise ValueError("timestamps must be non-decreasing")
+        dod = delta - self._delta
+        if dod == 0:
+            w.write(0, 1)
+        else:
+            for nbits, prefix, plen in _DOD_BUCKETS:
+                if -(1 << (nbits - 1)) < dod <= (1 << (nbits - 1)):
+                    w.write(prefix, plen)
+                    w.write(dod, nbits)
+                    break
+            else:
+                if not -(1 << 31) <= dod < (1 << 31):
+                    raise OverflowError("timestamp gap too large for one block")
+                w.write(0b1111, 4)
+                w.write(dod, 32)
+        self._delta = delta
+        self.last_ts = t
+
+        xor = bits ^ self._value
+        if xor == 0:
+            w.write(0, 1)
+        else:
+            leading = min(64 - xor.bit_length(), 31)
+            trailing = (xor & -xor).bit_length() - 1
+            if self._leading >= 0 and leading >= self._leading and trailing >= self._trailing:
+                w.write(0b10, 2)
+                w.write(xor >> self._trailing, 64 - self._leading - self._trailing)
+            else:
+                length = 64 - leading - trailing
+                w.write(0b11, 2)
+                w.write(leading, 5)
+                w.write(length & 63, 6)
+                w.write(xor >> trailing, length)
+                self._leading, self._trailing = leading, trailing
+        self._value = bits
+        self.count += 1
+
+    def getvalue(self) -> bytes:
+        header = HEADER.pack(VERSION, self.precision, self.count, self.first_ts or 0)
+        return header + self._bits.getvalue()
+
+    @property
+    def nbytes(self) -> int:
+        return HEADER.size + (self._bits.bit_length() + 7) // 8
+
+
+def decode_block(data: bytes) -> Iterator[Tuple[float, Optional[float]]]:
+    """Streams (epoch seconds, value or None) from a block without materialising it."""
+    version, precision, count, t = HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ValueError(f"unsupported block version {version}")
+    if count == 0:
+        return
+    scale = 10 ** precision if precision >= 0 else None
+    r = BitReader(data, HEADER.size * 8)
+
+    def value_of(bits: int) -> Optional[float]:
+        v = _bits_float(bits)
+        if v != v:
+            return None
+        return v / scale if scale is not None else v
+
+    bits = r.read(64)
+    yield t / 1000.0, value_of(bits)
+    delta, leading, trailing = 0, 0, 0
+    for _ in range(count - 1):
+        if r.bit() == 0:
+            dod = 0
+        else:
+            for nbits, _, plen in _DOD_BUCKETS:
+                if r.bit() == 0:
+                    break
+            else:
+                nbits = 32
+            dod = r.read(nbits)
+            if dod >= 1 << (nbits - 1):
+                dod -= 1 << nbits
+            # Buckets are (-2^(n-1), 2^(n-1)]: the top value reads back as the most negative
+            if nbits != 32 and dod == -(1 << (nbits - 1)):
+                dod = 1 << (nbits - 1)
+        delta += dod
+        t += delta
+
+        if r.bit():
+            if r.bit():
+                leading = r.read(5)
+                length = r.read(6) or 64
+                trailing = 64 - leading - length
+            bits ^= r.read(64 - leading - trailing) << trailing
+        yield t / 1000.0, value_of(bits)
+
+
+def encode_points(timestamps: Sequence[float], values: Sequence[Optional[float]],
+                  precision: Optional[int] = None) -> bytes:
+    """One block from parallel sequences (bulk history transfers)."""
+    encoder = BlockEncoder(precision)
+    for ts, value in zip(timestamps, values):
+        encoder.append(ts, value)
+    return encoder.getvalue()
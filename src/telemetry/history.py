@@ -0,0 +1,193 @@
+import math
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.common.config import TELEMETRY_HISTORY_SIZE, TELEMETRY_HISTORY_MAX_POINTS
+
+# Ring fields, named like the telemetry_log columns, and where they live in a packet
+HISTORY_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "battery":         ("eps", "battery"),
+    "voltage":         ("eps", "voltage"),
+    "external_power":  ("eps", "external_power"),
+    "roll":            ("adcs", "roll"),
+    "pitch":           ("adcs", "pitch"),
+    "yaw":             ("adcs", "yaw"),
+    "imu_temp":        ("adcs", "imu_temp"),
+    "accel_x":         ("adcs", "accel_g", "x"),
+    "accel_y":         ("adcs", "accel_g", "y"),
+    "accel_z":         ("adcs", "accel_g", "z"),
+    "gyro_x":          ("adcs", "gyro_dps", "x"),
+    "gyro_y":          ("adcs", "gyro_dps", "y"),
+    "gyro_z":          ("adcs", "gyro_dps", "z"),
+    "temperature":     ("payload", "temperature"),
+    "humidity":        ("payload", "humidity"),
+    "pressure":        ("payload", "pressure"),
+    "cpu_percent":     ("system", "cpu_percent"),
+    "ram_percent":     ("system", "ram_percent"),
+    "swap_percent":    ("system", "swap_percent"),
+    "disk_percent":    ("system", "disk_percent"),
+    "cpu_temperature": ("system", "cpu_temperature"),
+}
+STATE_FIELD = "obc_state"   # categorical: stored as an index into _states, downsampled to the last value
+
+_NAN = float("nan")
+
+# (start, end, fields) → rows of (epoch timestamp, {field: value}) from long-term storage
+Fallback = Callable[[float, float, List[str]], List[Tuple[float, Dict[str, Optional[float]]]]]
+
+
+def epoch_to_iso(ts: float) -> str:
+    """Epoch seconds → the aggregator's packet timestamp format (UTC, 'Z' suffix)."""
+    return datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None).isoformat() + "Z"
+
+
+def iso_to_epoch(value: str) -> float:
+    return datetime.fromisoformat(value.rstrip("Z")).replace(tzinfo=timezone.utc).timestamp()
+
+
+def extract_field(packet: Dict, path: Tuple[str, ...]) -> float:
+    value = packet
+    for key in path:
+        if not isinstance(value, dict):
+            return _NAN
+        value = value.get(key)
+    if value is None or isinstance(value, str):
+        return _NAN
+    return float(value)
+
+
+class TelemetryHistory:
+    """
+    Fixed-memory ring of recent telemetry packets: one array('d') per field
+    (8 bytes/sample, NaN = missing) plus a timestamp array, preallocated to
+    `capacity` so memory never grows. Packets are appended in time order, so
+    range lookups are binary searches over the ring.
+
+    query() serves [start, end] from the ring and asks `fallback` (SQLite)
+    only for the part older than the oldest ring entry.
+    """
+
+    def __init__(self, capacity: int = TELEMETRY_HISTORY_SIZE, fallback: Optional[Fallback] = None):
+        self.capacity = max(1, capacity)
+        self.fallback = fallback
+        self._timestamps = array("d", [_NAN]) * self.capacity
+        self._columns: Dict[str, array] = {name: array("d", [_NAN]) * self.capacity for name in HISTORY_FIELDS}
+        self._state_codes = array("b", [-1]) * self.capacity
+        self._states: List[str] = []
+        self._head = 0      # next write position
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, packet: Dict, ts: Optional[float] = None):
+        """Adds one packet; ts defaults to now (epoch seconds)."""
+        ts = time.time() if ts is None else ts
+        values = {name: extract_field(packet, path) for name, path in HISTORY_FIELDS.items()}
+        state = packet.get(STATE_FIELD)
+        with self._lock:
+            if state not in self._states and state is not None:
+                self._states.append(state)
+            i = self._head
+            self._timestamps[i] = ts
+            for name, value in values.items():
+                self._columns[name][i] = value
+            self._state_codes[i] = self._states.index(state) if state is not None else -1
+            self._head = (i + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def oldest(self) -> Optional[float]:
+        with self._lock:
+            return self._timestamps[self._physical(0)] if self._count else None
+
+    # ── Query ──
+    def query(self, start: float, end: float, fields: Sequence[str] = None,
+              max_points: int = TELEMETRY_HISTORY_MAX_POINTS) -> Dict:
+        """
+        Samples with start <= timestamp <= end, downsampled to at most
+        max_points by averaging equal-size groups (obc_state: last value).
+        Returns {"fields", "timestamps", "values": {field: [...]}, "source", "points", "raw_points"}.
+        """
+        fields = list(fields) if fields else list(HISTORY_FIELDS) + [STATE_FIELD]
+        unknown = [f for f in fields if f not in HISTORY_FIELDS and f != STATE_FIELD]
+        if unknown:
+            raise ValueError(f"Unknown history fields: {', '.join(unknown)}")
+        max_points = max(1, min(int(max_points), TELEMETRY_HISTORY_MAX_POINTS))
+
+        timestamps, columns, ring_oldest = self._slice(start, end, fields)
+        source = "ring"
+        if self.fallback is not None and (ring_oldest is None or start < ring_oldest):
+            older_end = end if ring_oldest is None else min(end, ring_oldest)
+            rows = self.fallback(start, older_end, fields)
+            rows = [row for row in rows if ring_oldest is None or row[0] < ring_oldest]
+            if rows:
+                source = "sqlite" if not timestamps else "sqlite+ring"
+                timestamps = [ts for ts, _ in rows] + timestamps
+                for name in fields:
+                    columns[name] = [values.get(name) for _, values in rows] + columns[name]
+
+        raw_points = len(timestamps)
+        timestamps, columns = _downsample(timestamps, columns, max_points)
+        return {
+            "fields":     fields,
+            "timestamps": timestamps,
+            "values":     columns,
+            "source":     source,
+            "points":     len(timestamps),
+            "raw_points": raw_points,
+        }
+
+    def _physical(self, logical: int) -> int:
+        return (self._head - self._count + logical) % self.capacity
+
+    def _bisect(self, ts: float, right: bool) -> int:
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = self._timestamps[self._physical(mid)]
+            if value < ts or (right and value == ts):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _slice(self, start: float, end: float, fields: List[str]):
+        with self._lock:
+            if not self._count:
+                return [], {name: [] for name in fields}, None
+            ring_oldest = self._timestamps[self._physical(0)]
+            first, last = self._bisect(start, False), self._bisect(end, True)
+            indices = [self._physical(i) for i in range(first, last)]
+            timestamps = [self._timestamps[i] for i in indices]
+            columns = {}
+            for name in fields:
+                if name == STATE_FIELD:
+                    states = self._states
+                    columns[name] = [states[c] if c >= 0 else None for c in (self._state_codes[i] for i in indices)]
+                else:
+                    column = self._columns[name]
+                    columns[name] = [None if math.isnan(column[i]) else column[i] for i in indices]
+        return timestamps, columns, ring_oldest
+
+
+def _downsample(timestamps: List[float], columns: Dict[str, list], max_points: int):
+    n = len(timestamps)
+    if n <= max_points:
+        return timestamps, columns
+    bounds = [n * k // max_points for k in range(max_points + 1)]
+    out_ts = [round(sum(timestamps[a:b]) / (b - a), 3) for a, b in zip(bounds, bounds[1:])]
+    out = {}
+    for name, values in columns.items():
+        if name == STATE_FIELD:
+            out[name] = [values[b - 1] for b in bounds[1:]]
+            continue
+        reduced = []
+        for a, b in zip(bounds, bounds[1:]):
+            group = [v for v in values[a:b] if v is not None]
+            reduced.append(round(sum(group) / len(group), 4) if group else None)
+        out[name] = reduced
+    return out_ts, out
@@ -1,16 +1,21 @@
 import logging
-from src.common import setup_logging
-
-setup_logging(
-    log_level = "INFO",
-    log_file  = "telemetry.log",
-    console   = True
-)
-
 import sys
 
+from src.common.startup import timeline
+from src.common import setup_logging
 from src.telemetry.aggregator import TelemetryAggregator
 
-if __name__ == "__main__":
+def main():
+    timeline.mark("imports")
+    setup_logging(
+        log_level = "INFO",
+        log_file  = "telemetry.log",
+        console   = True
+    )
+    timeline.mark("logging")
     agg = TelemetryAggregator()
-    agg.run()
\ No newline at end of file
+    timeline.mark("constructed")
+    agg.run()
+
+if __name__ == "__main__":
+    main()
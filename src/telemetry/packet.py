@@ -0,0 +1,127 @@
+import json
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from src.common.config import TELEMETRY_STALE_AFTER_SEC
+
+# Packet sections fed by MQTT; obc contributes only its status as "obc_state"
+SUBSYSTEMS = ("obc", "eps", "adcs", "payload")
+_EMBEDDED = ("eps", "adcs", "payload")
+
+_encode = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+
+def _encode_freshness(freshness: Dict[str, Dict]) -> bytes:
+    # Fixed shape, rebuilt for every packet: formatted directly, ~4x cheaper than the generic encoder
+    items = []
+    for name, f in freshness.items():
+        age = "null" if f["age_sec"] is None else repr(f["age_sec"])
+        items.append(f'"{name}":{{"age_sec":{age},"stale":{"true" if f["stale"] else "false"}}}')
+    return ("{" + ",".join(items) + "}").encode("utf-8")
+
+
+class _Section:
+    __slots__ = ("data", "received_at", "received_mono", "encoded")
+
+    def __init__(self):
+        self.data: Dict = {}
+        self.received_at: Optional[float] = None     # unix time, for reporting
+        self.received_mono: Optional[float] = None   # monotonic, for ages (immune to clock steps)
+        self.encoded: Optional[bytes] = b"{}"        # JSON of data; None until the next build needs it
+
+
+class PacketAssembler:
+    """
+    Last message per subsystem, kept with its receive time and its JSON
+    encoding, from which telemetry packets are spliced.
+
+    update() only stores the decoded message; it is encoded once, by the
+    first build() after it arrived, and the bytes are reused by every
+    packet until the next message. A build therefore encodes only the
+    sections that changed, plus the small system and freshness sections.
+
+    Each packet carries "freshness": per subsystem, the age of its last
+    message and whether it is older than telemetry.stale_after_sec (a
+    subsystem never heard from is stale with age null).
+    """
+
+    def __init__(self, stale_after_sec: Dict[str, float] = None):
+        self.stale_after_sec = dict(TELEMETRY_STALE_AFTER_SEC if stale_after_sec is None else stale_after_sec)
+        self._sections: Dict[str, _Section] = {name: _Section() for name in SUBSYSTEMS}
+        self._lock = threading.Lock()
+        self.encoded_sections = 0   # sections encoded by build() …
+        self.reused_sections = 0    # … and reused from cache
+
+    def update(self, name: str, data: Dict, received_at: float = None):
+        """Stores a subsystem's latest message (MQTT thread: no encoding here)."""
+        section = _Section()
+        section.data = data
+        section.received_at = time.time() if received_at is None else received_at
+        section.received_mono = time.monotonic() - (time.time() - section.received_at)
+        section.encoded = None
+        with self._lock:
+            self._sections[name] = section
+
+    def get(self, name: str) -> Dict:
+        return self._sections[name].data
+
+    def freshness(self, now_mono: float = None) -> Dict[str, Dict]:
+        now_mono = time.monotonic() if now_mono is None else now_mono
+        with self._lock:
+            sections = dict(self._sections)
+        result = {}
+        for name, section in sections.items():
+            if section.received_mono is None:
+                result[name] = {"age_sec": None, "stale": True}
+                continue
+            age = max(0.0, now_mono - section.received_mono)
+            limit = self.stale_after_sec.get(name)
+            result[name] = {"age_sec": round(age, 1), "stale": limit is not None and age > limit}
+        return result
+
+    def build(self, timestamp: str, system: Dict, extra: Dict = None) -> Tuple[Dict, bytes]:
+        """
+        One packet as (dict, JSON bytes). Both share the cached sections;
+        `extra` fields (e.g. request_id) go after the standard ones.
+        """
+        now_mono = time.monotonic()
+        with self._lock:
+            sections = dict(self._sections)
+        for name in _EMBEDDED:
+            section = sections[name]
+            if section.encoded is None:
+                # Benign race: two builds may both encode a fresh section, with the same result
+                section.encoded = _encode(section.data).encode("utf-8")
+                self.encoded_sections += 1
+            else:
+                self.reused_sections += 1
+        freshness = self.freshness(now_mono)
+        obc_state = sections["obc"].data.get("status", "UNKNOWN")
+
+        packet = {
+            "timestamp": timestamp,
+            "obc_state": obc_state,
+            "eps":       sections["eps"].data,
+            "adcs":      sections["adcs"].data,
+            "payload":   sections["payload"].data,
+            "system":    system,
+            "freshness": freshness,
+        }
+        parts = [
+            b'{"timestamp":', _encode(timestamp).encode("utf-8"),
+            b',"obc_state":', _encode(obc_state).encode("utf-8"),
+            b',"eps":', sections["eps"].encoded,
+            b',"adcs":', sections["adcs"].encoded,
+            b',"payload":', sections["payload"].encoded,
+            b',"system":', _encode(system).encode("utf-8"),
+            b',"freshness":', _encode_freshness(freshness),
+        ]
+        for key, value in (extra or {}).items():
+            packet[key] = value
+            parts += [b",", _encode(key).encode("utf-8"), b":", _encode(value).encode("utf-8")]
+        parts.append(b"}")
+        return packet, b"".join(parts)
+
+    def stats(self) -> Dict[str, int]:
+        return {"encoded_sections": self.encoded_sections, "reused_sections": self.reused_sections}
@@ -0,0 +1,102 @@
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from src.common.config import TELEMETRY_RECORD_BATCH_MAX, TELEMETRY_RECORD_BATCH_SEC
+from src.telemetry.history import HISTORY_FIELDS, STATE_FIELD, extract_field
+
+logger = logging.getLogger(__name__)
+
+# Series fed by each subsystem's messages (path inside the message); obc messages feed obc_state
+SECTION_FIELDS: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    section: {name: path[1:] for name, path in HISTORY_FIELDS.items() if path[0] == section}
+    for section in ("eps", "adcs", "payload")
+}
+
+# Series only the telemetry packet provides (system metrics are sampled when it is built)
+SNAPSHOT_FIELDS: Dict[str, Tuple[str, ...]] = {
+    name: path for name, path in HISTORY_FIELDS.items() if path[0] not in SECTION_FIELDS
+}
+
+
+class MessageRecorder:
+    """
+    Records every obc / eps / adcs / payload message in the series store at
+    its receive time (telemetry.record in config.yaml). A telemetry packet
+    holds only the latest message per subsystem, so without this the
+    messages between two packets (ADCS at 10 Hz in SCIENCE) are never stored.
+
+    record() runs on the MQTT thread and only appends the message's field
+    values to the pending batch. A writer thread moves the batch into the
+    open series blocks under one lock hold, every batch_sec or as soon as
+    batch_max messages wait; stop() writes what is left.
+    """
+
+    def __init__(self, series, batch_sec: float = TELEMETRY_RECORD_BATCH_SEC,
+                 batch_max: int = TELEMETRY_RECORD_BATCH_MAX):
+        self.series = series
+        self.batch_sec = batch_sec
+        self.batch_max = max(1, batch_max)
+        self._pending: List[Tuple[float, Dict[str, object]]] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.recorded = 0
+        self.batches = 0
+        self.largest_batch = 0
+
+    def record(self, section: str, data: Dict, received_at: float):
+        if section == "obc":
+            state = data.get("status")
+            if state is None:
+                return
+            values = {STATE_FIELD: state}
+        else:
+            fields = SECTION_FIELDS.get(section)
+            if not fields:
+                return
+            values = {name: extract_field(data, path) for name, path in fields.items()}
+        with self._lock:
+            self._pending.append((received_at, values))
+            full = len(self._pending) >= self.batch_max
+        if full:
+            self._wake.set()
+
+    def write(self) -> int:
+        """Moves the pending batch into the series blocks; returns the messages written."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+        self.series.append_many(batch)
+        self.recorded += len(batch)
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        return len(batch)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.batch_sec)
+            self._wake.clear()
+            try:
+                self.write()
+            except Exception as e:
+                logger.error(f"Recording telemetry messages failed: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="telemetry-recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        self.write()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {"recorded": self.recorded, "pending": pending, "batches": self.batches,
+                "largest_batch": self.largest_batch}
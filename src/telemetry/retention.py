@@ -0,0 +1,218 @@
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from src.common.config import RETENTION_POLICY
+from src.common.config_manager import config_manager
+from src.telemetry.history import epoch_to_iso, iso_to_epoch
+
+logger = logging.getLogger(__name__)
+
+_AUTO_VACUUM_INCREMENTAL = 2
+_MIB = 1024 * 1024
+
+
+class RetentionManager:
+    """
+    Keeps telemetry.db bounded (telemetry.retention in config.yaml).
+
+    Every check_interval_sec a background pass:
+      1. deletes telemetry_log rows and series_blocks older than max_age_days,
+      2. deletes the oldest data until the live pages fit in max_db_mb,
+      3. returns the freed pages to the filesystem with incremental_vacuum.
+
+    Deletes run in transactions of batch_rows rows and vacuuming in steps of
+    vacuum_pages; the shared lock is released (and batch_pause_sec waited)
+    between them, so the aggregator's writes never queue behind a long pass.
+
+    observe_disk() follows the root filesystem's disk_percent: above a
+    disk_pressure threshold only that share of max_age_days / max_db_mb is
+    kept, and a tighter share starts a pass at once.
+
+    A database created without auto_vacuum=INCREMENTAL is converted by one
+    full VACUUM in the first pass (SQLite can only switch modes that way).
+    """
+
+    def __init__(self, conn, lock: threading.Lock, policy: Dict = None):
+        self.conn = conn
+        self.lock = lock
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.disk_percent: Optional[float] = None
+        self.share = 1.0
+        self.deleted_rows = 0
+        self.deleted_blocks = 0
+        self.vacuumed_pages = 0
+        self._needs_vacuum = self._enable_incremental_vacuum()
+        self._apply(RETENTION_POLICY if policy is None else policy)
+        if policy is None:
+            config_manager.subscribe("telemetry.retention", self._apply)
+
+    def _enable_incremental_vacuum(self) -> bool:
+        """Sets auto_vacuum=INCREMENTAL; True when an existing database still needs its VACUUM."""
+        with self.lock:
+            if self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == _AUTO_VACUUM_INCREMENTAL:
+                return False
+            self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            # Before the first table is created the pragma alone is enough
+            return self.conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] > 0
+
+    def _apply(self, policy: Dict):
+        self.policy = policy
+        self._wake.set()
+
+    def observe_disk(self, disk_percent: Optional[float]):
+        """Feed the root filesystem usage (packet system.disk_percent)."""
+        if disk_percent is None:
+            return
+        self.disk_percent = disk_percent
+        share = next((s for percent, s in self.policy["disk_pressure"] if disk_percent >= percent), 1.0)
+        if share != self.share:
+            if share < self.share:
+                logger.warning(f"Disk at {disk_percent:g}%: keeping {share:.0%} of the retention limits")
+                self._wake.set()
+            else:
+                logger.info(f"Disk at {disk_percent:g}%: keeping {share:.0%} of the retention limits")
+            self.share = share
+
+    def limits(self):
+        """(max age in seconds, max live bytes) after disk pressure."""
+        return (self.policy["max_age_days"] * 86400 * self.share,
+                self.policy["max_db_mb"] * _MIB * self.share)
+
+    # ── Database helpers (each takes the lock for one short statement group) ──
+    def _has_table(self, name: str) -> bool:
+        with self.lock:
+            return self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+    def _pages(self):
+        with self.lock:
+            page_count = self.conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+            page_size = self.conn.execute("PRAGMA page_size").fetchone()[0]
+        return page_count, freelist, page_size
+
+    def live_bytes(self) -> int:
+        page_count, freelist, page_size = self._pages()
+        return (page_count - freelist) * page_size
+
+    def _delete_batches(self, sql: str, args: tuple) -> int:
+        """Runs a DELETE ... LIMIT ? statement one batch per transaction until it runs dry."""
+        batch = self.policy["batch_rows"]
+        total = 0
+        while not self._stop.is_set():
+            with self.lock:
+                deleted = self.conn.execute(sql, args + (batch,)).rowcount
+                self.conn.commit()
+            total += deleted
+            if deleted < batch:
+                break
+            self._stop.wait(self.policy["batch_pause_sec"])
+        return total
+
+    def _delete_oldest(self, series: bool):
+        """One batch from whichever table holds the oldest data; (rows, blocks) deleted."""
+        batch = self.policy["batch_rows"]
+        with self.lock:
+            oldest_row = self.conn.execute("SELECT MIN(timestamp) FROM telemetry_log").fetchone()[0]
+            oldest_block = self.conn.execute("SELECT MIN(start_ts) FROM series_blocks").fetchone()[0] if series else None
+            if oldest_block is not None and (oldest_row is None or oldest_block < iso_to_epoch(oldest_row)):
+                # Blocks that started no later than the oldest one (series sampled together close together)
+                deleted = self.conn.execute(
+                    "DELETE FROM series_blocks WHERE rowid IN "
+                    "(SELECT rowid FROM series_blocks WHERE start_ts <= ? LIMIT ?)", (oldest_block, batch)).rowcount
+                result = (0, deleted)
+            elif oldest_row is not None:
+                deleted = self.conn.execute(
+                    "DELETE FROM telemetry_log WHERE id IN "
+                    "(SELECT id FROM telemetry_log ORDER BY id LIMIT ?)", (batch,)).rowcount
+                result = (deleted, 0)
+            else:
+                result = (0, 0)
+            self.conn.commit()
+        return result
+
+    def _vacuum(self) -> int:
+        """incremental_vacuum in vacuum_pages steps until the free list is empty; pages returned."""
+        step = self.policy["vacuum_pages"]
+        freed = 0
+        while not self._stop.is_set():
+            _, freelist, _ = self._pages()
+            if not freelist:
+                break
+            with self.lock:
+                # execute() would stop after the statement's first step (one page); executescript runs it through
+                self.conn.executescript(f"PRAGMA incremental_vacuum({int(step)});")
+            freed += min(step, freelist)
+            self._stop.wait(self.policy["batch_pause_sec"])
+        return freed
+
+    def _convert(self):
+        start = time.monotonic()
+        with self.lock:
+            self.conn.commit()
+            self.conn.execute("VACUUM")
+        self._needs_vacuum = False
+        logger.info(f"telemetry.db converted to auto_vacuum=INCREMENTAL in {time.monotonic() - start:.1f} s")
+
+    def run_once(self, now: float = None) -> Dict:
+        """One retention pass; returns what it did."""
+        if not self.policy["enabled"]:
+            return {}
+        if self._needs_vacuum:
+            self._convert()
+        now = time.time() if now is None else now
+        max_age, max_bytes = self.limits()
+        series = self._has_table("series_blocks")
+        start = time.monotonic()
+
+        rows = self._delete_batches(
+            "DELETE FROM telemetry_log WHERE id IN (SELECT id FROM telemetry_log WHERE timestamp < ? LIMIT ?)",
+            (epoch_to_iso(now - max_age),))
+        blocks = self._delete_batches(
+            "DELETE FROM series_blocks WHERE rowid IN (SELECT rowid FROM series_blocks WHERE end_ts < ? LIMIT ?)",
+            (now - max_age,)) if series else 0
+
+        while not self._stop.is_set() and self.live_bytes() > max_bytes:
+            more_rows, more_blocks = self._delete_oldest(series)
+            if not more_rows and not more_blocks:
+                break
+            rows += more_rows
+            blocks += more_blocks
+            self._stop.wait(self.policy["batch_pause_sec"])
+
+        pages = self._vacuum()
+        self.deleted_rows += rows
+        self.deleted_blocks += blocks
+        self.vacuumed_pages += pages
+        result = {"deleted_rows": rows, "deleted_blocks": blocks, "vacuumed_pages": pages,
+                  "db_bytes": self.live_bytes(), "share": self.share,
+                  "duration_sec": round(time.monotonic() - start, 3)}
+        if rows or blocks or pages:
+            logger.info(f"Retention: deleted {rows} rows and {blocks} series blocks, returned {pages} pages, "
+                        f"{result['db_bytes'] / _MIB:.1f} MB live (limits {max_age / 86400:g} days, "
+                        f"{max_bytes / _MIB:g} MB) in {result['duration_sec']} s")
+        return result
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.run_once()
+            except sqlite3.Error as e:
+                logger.error(f"Retention pass failed: {e}")
+            self._wake.wait(self.policy["check_interval_sec"])
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="telemetry-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=2)
@@ -0,0 +1,171 @@
+import logging
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.common.config import SERIES_BLOCK_POINTS, SERIES_BLOCK_SEC, SERIES_FLUSH_SEC, SERIES_PRECISION
+from src.telemetry.gorilla import BlockEncoder, decode_block
+
+logger = logging.getLogger(__name__)
+
+
+class SeriesStore:
+    """
+    Per-field time series in SQLite, as Gorilla-compressed blocks
+    (src/telemetry/gorilla.py) in table series_blocks, one row per
+    (series, start_ts).
+
+    append() adds one sample per series to its open block, kept in memory
+    (append_many() a batch of them); series need not be sampled together.
+    A block is closed after block_points samples or block_sec seconds; the
+    open block is also rewritten (INSERT OR REPLACE on its key) every
+    flush_sec, so a power cut loses at most that much. After a restart new
+    blocks are opened; older ones are never rewritten.
+
+    String values (obc_state) are stored as codes from series_labels and
+    read back as strings.
+
+    The connection and its lock are shared with the aggregator.
+    """
+
+    def __init__(self, conn, lock: threading.Lock,
+                 block_points: int = SERIES_BLOCK_POINTS, block_sec: float = SERIES_BLOCK_SEC,
+                 flush_sec: float = SERIES_FLUSH_SEC, precision: Dict[str, int] = None):
+        self.conn = conn
+        self.lock = lock
+        self.block_points = max(1, block_points)
+        self.block_sec = block_sec
+        self.flush_sec = flush_sec
+        self.precision = dict(SERIES_PRECISION if precision is None else precision)
+        self._open: Dict[str, BlockEncoder] = {}
+        self._labels: Dict[str, Dict[str, int]] = {}
+        self._label_names: Dict[str, Dict[int, str]] = {}
+        self._dirty = False
+        self._flushed_at = time.monotonic()
+        self.blocks_written = 0
+        self._create_tables()
+
+    def _create_tables(self):
+        with self.lock:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS series_blocks (
+                    series   TEXT    NOT NULL,
+                    start_ts REAL    NOT NULL,
+                    end_ts   REAL    NOT NULL,
+                    count    INTEGER NOT NULL,
+                    data     BLOB    NOT NULL,
+                    PRIMARY KEY (series, start_ts)
+                )
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS series_labels (
+                    series TEXT    NOT NULL,
+                    code   INTEGER NOT NULL,
+                    label  TEXT    NOT NULL,
+                    PRIMARY KEY (series, code)
+                )
+            ''')
+            for series, code, label in self.conn.execute("SELECT series, code, label FROM series_labels"):
+                self._labels.setdefault(series, {})[label] = code
+                self._label_names.setdefault(series, {})[code] = label
+            self.conn.commit()
+
+    def _code(self, series: str, label: str) -> int:
+        # Caller holds the lock
+        codes = self._labels.setdefault(series, {})
+        if label not in codes:
+            codes[label] = len(codes)
+            self._label_names.setdefault(series, {})[codes[label]] = label
+            self.conn.execute("INSERT OR REPLACE INTO series_labels (series, code, label) VALUES (?, ?, ?)",
+                              (series, codes[label], label))
+        return codes[label]
+
+    def append(self, ts: float, values: Dict[str, object]):
+        """One sample per series at epoch time ts (non-decreasing); None = missing."""
+        self.append_many([(ts, values)])
+
+    def append_many(self, samples: Sequence[Tuple[float, Dict[str, object]]]):
+        """append() for a batch in time order: one lock hold, one commit for the blocks it closes."""
+        closed = []
+        with self.lock:
+            for ts, values in samples:
+                for series, value in values.items():
+                    if isinstance(value, str):
+                        value = self._code(series, value)
+                    elif isinstance(value, bool):
+                        value = int(value)
+                    block = self._open.get(series)
+                    if block is not None and (block.count >= self.block_points or
+                                              ts - block.first_ts / 1000.0 >= self.block_sec or
+                                              ts * 1000 < block.last_ts):
+                        closed.append((series, block))
+                        block = None
+                    if block is None:
+                        block = self._open[series] = BlockEncoder(self.precision.get(series))
+                    block.append(ts, value)
+            self._dirty = True
+            if closed:
+                self._write(closed)
+                self.conn.commit()
+
+    def _write(self, blocks: List[Tuple[str, BlockEncoder]]):
+        # Caller holds the lock
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO series_blocks (series, start_ts, end_ts, count, data) VALUES (?, ?, ?, ?, ?)",
+            [(series, b.first_ts / 1000.0, b.last_ts / 1000.0, b.count, b.getvalue()) for series, b in blocks],
+        )
+        self.blocks_written += len(blocks)
+
+    def flush(self, force: bool = False):
+        """Persists the open blocks when flush_sec has passed since the last flush (or at once with force)."""
+        now = time.monotonic()
+        if not force and now - self._flushed_at < self.flush_sec:
+            return
+        with self.lock:
+            if self._dirty:
+                self._write(list(self._open.items()))
+                self.conn.commit()
+                self._dirty = False
+        self._flushed_at = now
+
+    def read(self, series: str, start: float, end: float) -> Iterator[Tuple[float, Optional[object]]]:
+        """Streams (ts, value) with start <= ts < end, block by block (the open block from memory)."""
+        # Compared at the blocks' millisecond resolution
+        start, end = round(start * 1000) / 1000.0, round(end * 1000) / 1000.0
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT start_ts, data FROM series_blocks WHERE series = ? AND start_ts < ? AND end_ts >= ? "
+                "ORDER BY start_ts", (series, end, start)).fetchall()
+            block = self._open.get(series)
+            blocks = [data for _, data in rows]
+            # The open block's stored copy (if flushed) is superseded by the in-memory one
+            if block is not None and block.count:
+                blocks = [data for start_ts, data in rows if start_ts != block.first_ts / 1000.0]
+                if block.first_ts / 1000.0 < end and block.last_ts / 1000.0 >= start:
+                    blocks.append(block.getvalue())
+            names = dict(self._label_names.get(series, {}))
+        for data in blocks:
+            for ts, value in decode_block(data):
+                if ts < start:
+                    continue
+                if ts >= end:
+                    break
+                if names and value is not None:
+                    value = names.get(int(value))
+                yield ts, value
+
+    def query(self, start: float, end: float, fields: Sequence[str]) -> List[Tuple[float, Dict[str, object]]]:
+        """Rows of (ts, {field: value}) with start <= ts < end, series joined on their timestamps."""
+        rows: Dict[float, Dict[str, object]] = {}
+        for name in fields:
+            for ts, value in self.read(name, start, end):
+                rows.setdefault(ts, {})[name] = value
+        return sorted(rows.items())
+
+    def stats(self) -> Dict:
+        with self.lock:
+            count, nbytes = self.conn.execute(
+                "SELECT COALESCE(SUM(count), 0), COALESCE(SUM(LENGTH(data)), 0) FROM series_blocks").fetchone()
+            open_bytes = sum(b.nbytes for b in self._open.values())
+        return {"stored_samples": count, "stored_bytes": nbytes, "open_blocks": len(self._open),
+                "open_bytes": open_bytes, "blocks_written": self.blocks_written}